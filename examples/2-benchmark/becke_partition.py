@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+'''
+Cost of the Becke partition for water clusters of increasing size. The
+partition with the switching function of Stratmann only needs the atoms in the
+vicinity of each grid, while the original Becke partition has to evaluate the
+cell functions of all atoms.
+
+Usage:
+    python becke_partition.py [n ...]
+'''
+
+import sys
+import time
+from pyscf import gto
+from pyscf.dft import gen_grid, radi
+
+def water_cluster(n):
+    atoms = []
+    for i in range(n):
+        for j in range(n):
+            for k in range(n):
+                x, y, z = i*2.9, j*2.9, k*2.9
+                atoms.append(('O', (x, y, z)))
+                atoms.append(('H', (x+.96, y, z)))
+                atoms.append(('H', (x-.24, y+.93, z)))
+    return atoms
+
+if __name__ == '__main__':
+    sizes = [int(x) for x in sys.argv[1:]] or [2, 3]
+    print('%-10s %6s %10s %16s %16s' % ('system', 'natm', 'ngrids',
+                                        'stratmann (s)', 'becke (s)'))
+    for n in sizes:
+        mol = gto.M(atom=water_cluster(n), basis='sto3g', verbose=0)
+        grids = gen_grid.Grids(mol)
+        atom_grids_tab = grids.gen_atomic_grids(mol, level=1)
+        timings = []
+        for scheme in (gen_grid.stratmann, gen_grid.original_becke):
+            t0 = time.perf_counter()
+            coords, weights = gen_grid.get_partition(
+                mol, atom_grids_tab, radi.treutler_atomic_radii_adjust,
+                radi.BRAGG_RADII, scheme)
+            timings.append(time.perf_counter() - t0)
+        print('%-10s %6d %10d %16.2f %16.2f' % ('water-%d' % n**3, mol.natm,
+                                                weights.size, *timings))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+'''
+Coulomb matrix of the continuous fast multipole method (CFMM) against the
+exact direct J build for water chains of increasing size. The errors are the
+maximum error in the J matrix and the error in the Coulomb energy
+1/2 tr(D J). "near" is the fraction of the shell pair interactions which are
+evaluated with exact integrals.
+
+Usage:
+    python cfmm_coulomb.py [n ...]
+'''
+
+import sys
+import time
+import numpy
+from pyscf import gto, scf
+from pyscf.scf import cfmm
+
+def water_chain(n):
+    atoms = []
+    for i in range(n):
+        x = i * 2.9
+        atoms.append(('O', (x, 0, 0)))
+        atoms.append(('H', (x+.96, 0, 0)))
+        atoms.append(('H', (x-.24, .93, 0)))
+    return atoms
+
+if __name__ == '__main__':
+    sizes = [int(x) for x in sys.argv[1:]] or [20, 40, 80]
+    print('%-10s %6s %10s %10s %8s %10s %10s' %
+          ('system', 'nao', 'exact (s)', 'CFMM (s)', 'near', 'max err', 'E_J err'))
+    for n in sizes:
+        mol = gto.M(atom=water_chain(n), basis='sto3g', verbose=0)
+        dm = scf.RHF(mol).get_init_guess(key='minao')
+        vhfopt = scf.RHF(mol).init_direct_scf()
+        t0 = time.perf_counter()
+        vj_ref = scf.hf.get_jk(mol, dm, vhfopt=vhfopt, with_k=False)[0]
+        t_exact = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with_cfmm = cfmm.CFMM(mol).build()
+        vj = with_cfmm.get_j(dm)
+        t_cfmm = time.perf_counter() - t0
+        err = abs(vj - vj_ref).max()
+        e_err = numpy.einsum('ij,ji->', dm, vj - vj_ref) * .5
+        print('%-10s %6d %10.2f %10.2f %8.3f %10.2e %10.2e' %
+              ('water-%d' % n, mol.nao, t_exact, t_cfmm,
+               with_cfmm.near_field_ratio, err, e_err))
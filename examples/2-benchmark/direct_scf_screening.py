@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+'''
+Cost of the direct J/K build for linear alkanes and water chains of increasing
+size. The direct SCF driver loops over the significant AO block pairs only
+(by the Schwarz bounds). The cost of the screening alone is shown by the
+timing for a zero density matrix.
+
+Usage:
+    python direct_scf_screening.py [n ...]
+'''
+
+import sys
+import time
+import numpy
+from pyscf import gto, scf
+
+def alkane(n):
+    atoms = []
+    for i in range(n):
+        x, y = i * 1.27, .44 * (-1)**i
+        atoms.append(('C', (x, y, 0)))
+        atoms.append(('H', (x, y+.63*(-1)**i,  .89)))
+        atoms.append(('H', (x, y+.63*(-1)**i, -.89)))
+    atoms.append(('H', (-.9, .74, 0)))
+    atoms.append(('H', ((n-1)*1.27+.9, .44*(-1)**(n-1), 0)))
+    return atoms
+
+def water_chain(n):
+    atoms = []
+    for i in range(n):
+        x = i * 2.9
+        atoms.append(('O', (x, 0, 0)))
+        atoms.append(('H', (x+.96, 0, 0)))
+        atoms.append(('H', (x-.24, .93, 0)))
+    return atoms
+
+def timing(mol, dm):
+    vhfopt = scf.RHF(mol).init_direct_scf()
+    t0 = time.perf_counter()
+    scf.hf.get_jk(mol, dm, vhfopt=vhfopt)
+    return time.perf_counter() - t0
+
+if __name__ == '__main__':
+    sizes = [int(x) for x in sys.argv[1:]] or [10, 20, 40]
+    print('%-12s %6s %14s %16s' % ('system', 'nao', 'J/K (s)', 'screening (s)'))
+    for name, fgeom in (('alkane', alkane), ('water', water_chain)):
+        for n in sizes:
+            mol = gto.M(atom=fgeom(n), basis='sto3g', verbose=0)
+            dm = scf.RHF(mol).get_init_guess()
+            t_jk = timing(mol, dm)
+            t_screen = timing(mol, numpy.zeros_like(dm))
+            print('%-12s %6d %14.2f %16.3f' % ('%s-%d' % (name, n), mol.nao, t_jk, t_screen))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+
+'''
+Startup cost of pyscf. Each subpackage is imported in a fresh Python
+interpreter. The wall time of the import is reported together with the time
+of the first small calculation, which includes the remaining imports and the
+deferred loading of the shared libraries.
+
+Usage:
+    python import_time.py [subpackage ...]
+'''
+
+import sys
+import subprocess
+
+SUBPACKAGES = ('pyscf', 'pyscf.lib', 'pyscf.gto', 'pyscf.scf', 'pyscf.ao2mo',
+               'pyscf.df', 'pyscf.dft', 'pyscf.grad', 'pyscf.mp', 'pyscf.cc',
+               'pyscf.mcscf', 'pyscf.tdscf', 'pyscf.pbc.gto', 'pyscf.pbc.scf',
+               'pyscf.pbc.dft')
+
+SCRIPT = '''
+import time
+t0 = time.perf_counter()
+import {mod}
+t1 = time.perf_counter()
+from pyscf import gto, scf
+mol = gto.M(atom='H 0 0 0; H 0 0 .74', basis='sto3g', verbose=0)
+scf.RHF(mol).kernel()
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+'''
+
+def import_time(mod, repeat=3):
+    timings = []
+    for i in range(repeat):
+        out = subprocess.check_output([sys.executable, '-c', SCRIPT.format(mod=mod)])
+        timings.append([float(x) for x in out.split()])
+    return min(timings)
+
+if __name__ == '__main__':
+    mods = sys.argv[1:] or SUBPACKAGES
+    print('%-16s %12s %22s' % ('module', 'import (s)', 'first H2 RHF (s)'))
+    for mod in mods:
+        t_import, t_first_calc = import_time(mod)
+        print('%-16s %12.3f %22.3f' % (mod, t_import, t_first_calc))
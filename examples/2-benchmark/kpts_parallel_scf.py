@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+'''
+Speedup of the k-point parallel KSCF driver on one node. The diagonalization,
+the density matrices and the k-pair loops of the GDF exchange matrix are
+distributed over a local process pool. The timings of the GDF integrals are
+excluded.
+
+Usage:
+    python kpts_parallel_scf.py [nproc ...]
+'''
+
+import sys
+import time
+import numpy
+from pyscf import lib
+from pyscf.pbc import gto, scf
+
+def timing(mf, dm, ncycle=2):
+    t0 = time.perf_counter()
+    for i in range(ncycle):
+        fock = mf.get_fock(dm=dm)
+        mo_energy, mo_coeff = mf.eig(fock, mf.get_ovlp())
+        mo_occ = mf.get_occ(mo_energy, mo_coeff)
+        dm = mf.make_rdm1(mo_coeff, mo_occ)
+    return (time.perf_counter() - t0) / ncycle
+
+if __name__ == '__main__':
+    nprocs = [int(x) for x in sys.argv[1:]] or [1, 2, 4, 8]
+    cell = gto.M(
+        a = numpy.eye(3) * 3.5668,
+        atom = '''C     0.      0.      0.
+                  C     0.8917  0.8917  0.8917
+                  C     1.7834  1.7834  0.
+                  C     2.6751  2.6751  0.8917
+                  C     1.7834  0.      1.7834
+                  C     2.6751  0.8917  2.6751
+                  C     0.      1.7834  1.7834
+                  C     0.8917  2.6751  2.6751''',
+        basis = 'gth-szv', pseudo = 'gth-pade', verbose = 0)
+    kpts = cell.make_kpts([3,3,3])
+    mf = scf.KRHF(cell, kpts).density_fit()
+    mf.with_df.build()
+    dm = mf.get_init_guess()
+
+    print('nkpts = %d  nao = %d  OpenMP threads = %d' %
+          (len(kpts), cell.nao, lib.num_threads()))
+    print('%6s %16s %8s' % ('nproc', 'SCF cycle (s)', 'speedup'))
+    t_ref = None
+    for nproc in nprocs:
+        mf1 = mf.kpts_parallel(nproc=nproc)
+        with mf1.kpts_executor:
+            timing(mf1, dm, 1)  # warm up the process pool
+            t = timing(mf1, dm)
+        if t_ref is None:
+            t_ref = t * nprocs[0]
+        print('%6d %16.2f %8.2f' % (nproc, t, t_ref / t))
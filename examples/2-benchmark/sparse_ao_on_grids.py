@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+'''
+Electron density and XC potential matrix of linear alkanes on DFT grids, with
+the AO values stored densely or in the block-sparse SparseAO representation
+(NumInt.block_loop(..., sparse_ao=True)). SparseAO keeps only the shells that
+are not screened out on a grid block.
+
+Usage:
+    python sparse_ao_on_grids.py [n ...]
+'''
+
+import sys
+import time
+import numpy
+from pyscf import gto, dft
+from pyscf.dft import numint
+
+def alkane(n):
+    atoms = []
+    for i in range(n):
+        x, y = i * 1.27, .44 * (-1)**i
+        atoms.append(('C', (x, y, 0)))
+        atoms.append(('H', (x, y+.63*(-1)**i,  .89)))
+        atoms.append(('H', (x, y+.63*(-1)**i, -.89)))
+    atoms.append(('H', (-.9, .74, 0)))
+    atoms.append(('H', ((n-1)*1.27+.9, .44*(-1)**(n-1), 0)))
+    return atoms
+
+def timing(ni, mol, grids, dm, sparse_ao):
+    t0 = time.perf_counter()
+    vmat = 0
+    for ao, mask, weight, coords in ni.block_loop(mol, grids, mol.nao, 1,
+                                                  sparse_ao=sparse_ao):
+        rho = numint.eval_rho(mol, ao, dm, mask, xctype='GGA', hermi=1)
+        vxc = ni.eval_xc('pbe', rho, deriv=1)[1]
+        vmat += numint.eval_mat(mol, ao, weight, rho, vxc, mask, xctype='GGA')
+    return time.perf_counter() - t0, vmat
+
+if __name__ == '__main__':
+    sizes = [int(x) for x in sys.argv[1:]] or [10, 20, 30]
+    print('%-10s %6s %10s %12s %12s %10s' %
+          ('system', 'nao', 'ngrids', 'dense (s)', 'sparse (s)', 'max diff'))
+    ni = numint.NumInt()
+    for n in sizes:
+        mol = gto.M(atom=alkane(n), basis='631g', verbose=0)
+        grids = dft.Grids(mol)
+        grids.level = 1
+        grids.build(with_non0tab=True)
+        dm = dft.RKS(mol).get_init_guess()
+        t_dense, v_dense = timing(ni, mol, grids, dm, False)
+        t_sparse, v_sparse = timing(ni, mol, grids, dm, True)
+        print('%-10s %6d %10d %12.2f %12.2f %10.2e' %
+              ('C%dH%d' % (n, 2*n+2), mol.nao, grids.weights.size,
+               t_dense, t_sparse, abs(v_dense - v_sparse).max()))
@@ -94,10 +94,6 @@ if numpy.__version__[:5] in ('1.16.', '1.17.'):
     _internal._get_void_ptr = _get_void_ptr
 
 from pyscf import __config__
-from pyscf import lib
-from pyscf import gto
-from pyscf import scf
-from pyscf import ao2mo
 
 # Whether to enable debug mode. When this flag is set, some modules may run
 # extra debug code.
@@ -109,6 +105,20 @@ def M(**kwargs):
     if kwargs.get('a') is not None:  # a is crystal lattice parameter
         return __all__.pbc.gto.M(**kwargs)
     else:  # Molecule
+        from pyscf import gto
         return gto.M(**kwargs)
 
+def __getattr__(name):
+    '''Import submodules (pyscf.lib, pyscf.gto, pyscf.scf, ...) on first
+    access, so that "import pyscf" does not load the entire package.'''
+    if name.startswith('_'):
+        raise AttributeError(f"module 'pyscf' has no attribute '{name}'")
+    import importlib
+    try:
+        return importlib.import_module('pyscf.' + name)
+    except ModuleNotFoundError as e:
+        if e.name != 'pyscf.' + name:
+            raise
+    raise AttributeError(f"module 'pyscf' has no attribute '{name}'")
+
 del os, sys
@@ -75,6 +75,12 @@ class DF(lib.StreamObject):
         blockdim : int
             When reading DF integrals from disk the chunk size to load.  It is
             used to improve IO performance.
+        local_k_tol : float
+            If set, the exchange matrix is built with the Cholesky orbitals
+            of the density matrix. The AO domains of the orbitals are
+            truncated with this threshold, so that the cost of K grows
+            linearly with the number of occupied orbitals for large
+            insulators. Default is None (dense K build).
 
     Intermediate Attributes (These attributes are generated during calculations
     and should not be modified. Additionally, they may not be compatible between
@@ -94,6 +100,7 @@ class DF(lib.StreamObject):
     '''
 
     blockdim = getattr(__config__, 'df_df_DF_blockdim', 240)
+    local_k_tol = getattr(__config__, 'df_df_DF_local_k_tol', None)
 
     # Store DF tensor in a format compatible to pyscf-1.1 - pyscf-1.6
     _compatible_format = getattr(__config__, 'df_df_DF_compatible_format', False)
@@ -329,11 +329,40 @@ def get_jk(dfobj, dm, hermi=0, with_j=True, with_k=True, direct_scf_tol=1e-13):
         dmtril = lib.pack_tril(dms + dms.conj().transpose(0,2,1))
         dmtril[:,idx*(idx+1)//2+idx] *= .5
 
+    local_k_tol = getattr(dfobj, 'local_k_tol', None)
+    if with_k and local_k_tol and hermi == 1:
+        orbs = [_cholesky_orbitals(x) for x in dms]
+        if any(c is None for c in orbs):
+            log.debug('DM not positive semidefinite. local_k_tol is ignored')
+            local_k_tol = None
+    else:
+        local_k_tol = None
+
     if not with_k:
         for eri1 in dfobj.loop():
             # uses numpy.matmul
             vj += dmtril.dot(eri1.T).dot(eri1)
 
+    elif local_k_tol:
+        domains = [_local_k_domains(dfobj.mol, c, local_k_tol) for c in orbs]
+        max_memory = dfobj.max_memory - lib.current_memory()[0]
+        blksize = max(4, int(min(dfobj.blockdim, max_memory*.22e6/8/nao**2)))
+        buf = numpy.empty((blksize,nao,nao))
+        for eri1 in dfobj.loop(blksize):
+            naux, nao_pair = eri1.shape
+            assert (nao_pair == nao*(nao+1)//2)
+            if with_j:
+                # uses numpy.matmul
+                vj += dmtril.dot(eri1.T).dot(eri1)
+
+            eri1 = lib.unpack_tril(eri1, out=buf[:naux])
+            for k in range(nset):
+                for c, (m0, m1), (n0, n1) in domains[k]:
+                    #:tmp = numpy.einsum('pmn,im->pin', eri1[:,m0:m1,n0:n1], c)
+                    tmp = numpy.matmul(c, eri1[:,m0:m1,n0:n1]).reshape(-1,n1-n0)
+                    vk[k,n0:n1,n0:n1] += lib.dot(tmp.T, tmp)
+            t1 = log.timer_debug1('jk', *t1)
+
     elif getattr(dm, 'mo_coeff', None) is not None:
         #TODO: test whether dm.mo_coeff matching dm
         mo_coeff = numpy.asarray(dm.mo_coeff, order='F')
@@ -410,6 +439,52 @@ def get_jk(dfobj, dm, hermi=0, with_j=True, with_k=True, direct_scf_tol=1e-13):
     logger.timer(dfobj, 'df vj and vk', *t0)
     return vj, vk
 
+def _cholesky_orbitals(dm, tol=1e-12):
+    '''Factorize the density matrix dm = c.dot(c.T) with pivoted Cholesky
+    decomposition. The Cholesky orbitals are localized for insulators.
+    None is returned if dm is not positive semidefinite.
+    '''
+    nao = dm.shape[0]
+    low, piv, rank = lib.pivoted_cholesky(dm, tol=tol, lower=True)
+    c = numpy.empty((nao, rank))
+    c[piv] = low[:,:rank]
+    if abs(c.dot(c.T) - dm).max() > 1e-8:
+        return None
+    return c
+
+def _local_k_domains(mol, orbs, tol):
+    '''Group the localized orbitals by the atom where they are centered. For
+    each group, returns the orbital coefficients on the AOs which support the
+    orbitals, the AO range of the support (m0,m1) and the AO range (n0,n1)
+    which has significant overlap to the support. The exchange matrix
+    elements K[n0:n1,n0:n1] are the only ones affected by the group of
+    orbitals. AOs are ordered by atoms. The ranges are compact if the atoms
+    are ordered by their spatial positions.
+    '''
+    ao_loc = mol.ao_loc_nr()
+    ovlp = numpy.exp(-mol.get_overlap_cond())
+    ao_atm = numpy.empty(ao_loc[-1], dtype=int)
+    for ia, (s0, s1, p0, p1) in enumerate(mol.aoslice_by_atom(ao_loc)):
+        ao_atm[p0:p1] = ia
+    nshl_ao = ao_loc[1:] - ao_loc[:-1]
+
+    centers = ao_atm[abs(orbs).argmax(axis=0)]
+    domains = []
+    for ia in numpy.unique(centers):
+        c = orbs[:,centers == ia]
+        c_shl = lib.condense('absmax', c, ao_loc, [0, c.shape[1]])[:,0]
+        mu_shl = c_shl > tol
+        if not mu_shl.any():
+            # The contributions of these orbitals are below tol
+            continue
+        nu_shl = (ovlp[mu_shl] * c_shl[mu_shl,None]).max(axis=0) > tol
+        mu_idx = numpy.where(numpy.repeat(mu_shl, nshl_ao))[0]
+        nu_idx = numpy.where(numpy.repeat(nu_shl, nshl_ao))[0]
+        m0, m1 = mu_idx[0], mu_idx[-1] + 1
+        n0, n1 = nu_idx[0], nu_idx[-1] + 1
+        domains.append((numpy.asarray(c[m0:m1].T, order='C'), (m0, m1), (n0, n1)))
+    return domains
+
 def get_j(dfobj, dm, hermi=0, direct_scf_tol=1e-13):
     from pyscf.scf import _vhf
     from pyscf.scf import jk
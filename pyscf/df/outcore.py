@@ -32,6 +32,13 @@ from pyscf.df.addons import make_auxmol
 from pyscf import __config__
 
 MAX_MEMORY = getattr(__config__, 'df_outcore_max_memory', 2000)  # 2GB
+# HDF5 compression filter for the DF tensor, can be None, 'gzip' or 'lzf'
+COMPRESSION = getattr(__config__, 'df_outcore_compression', None)
+# Number of significand bits (out of 52) to keep for the DF tensor on disk.
+# None to keep the full double precision.
+MANTISSA_BITS = getattr(__config__, 'df_outcore_mantissa_bits', None)
+# Number of elements in each HDF5 chunk when the DF tensor is compressed
+CHUNK_SIZE = 2**19
 
 #
 # for auxe1 (P|ij)
@@ -39,8 +46,18 @@ MAX_MEMORY = getattr(__config__, 'df_outcore_max_memory', 2000)  # 2GB
 
 def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='j3c', tmpdir=None,
                  int3c='int3c2e', aosym='s2ij', int2c='int2c2e', comp=1,
-                 max_memory=MAX_MEMORY, auxmol=None, verbose=logger.NOTE):
+                 max_memory=MAX_MEMORY, auxmol=None, verbose=logger.NOTE,
+                 compression=COMPRESSION, mantissa_bits=MANTISSA_BITS):
     '''3-index density-fitting tensor.
+
+    Kwargs:
+        compression : str
+            HDF5 compression filter ('gzip' or 'lzf') for the DF tensor.
+        mantissa_bits : int
+            If specified, the DF tensor is rounded to this number of
+            significand bits before being written. The relative error of each
+            element is bounded by 2**-(mantissa_bits+1). Rounding off the
+            trailing bits makes the tensor highly compressible.
     '''
     assert (aosym in ('s1', 's2ij'))
     assert (comp == 1)
@@ -58,8 +75,11 @@ def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='j3c', tmpdir=No
     if tmpdir is None:
         tmpdir = lib.param.TMPDIR
     swapfile = tempfile.NamedTemporaryFile(dir=tmpdir)
+    # The swap file is read only once. It is kept uncompressed and in full
+    # precision. The DF tensor is rounded when it is written to erifile.
     cholesky_eri_b(mol, swapfile.name, auxbasis, dataname,
-                   int3c, aosym, int2c, comp, max_memory, auxmol, verbose=log)
+                   int3c, aosym, int2c, comp, max_memory, auxmol, verbose=log,
+                   compression=None, mantissa_bits=None)
     fswap = h5py.File(swapfile.name, 'r')
     time1 = log.timer('generate (ij|L) 1 pass', *time0)
 
@@ -73,10 +93,13 @@ def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='j3c', tmpdir=No
     feri = _create_h5file(erifile, dataname)
     if comp == 1:
         naoaux = fswap['%s/0'%dataname].shape[0]
-        h5d_eri = feri.create_dataset(dataname, (naoaux,nao_pair), 'f8')
+        shape = (naoaux,nao_pair)
     else:
         naoaux = fswap['%s/0'%dataname].shape[1]
-        h5d_eri = feri.create_dataset(dataname, (comp,naoaux,nao_pair), 'f8')
+        shape = (comp,naoaux,nao_pair)
+    h5d_eri = feri.create_dataset(
+        dataname, shape, 'f8',
+        **_dataset_options(shape, compression, mantissa_bits))
 
     iolen = min(max(int(max_memory*.45e6/8/nao_pair), 28), naoaux)
     totstep = (naoaux+iolen-1)//iolen
@@ -89,6 +112,7 @@ def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='j3c', tmpdir=No
     for istep, dat in enumerate(lib.map_with_prefetch(load, slices)):
         row0, row1 = slices[istep]
         nrow = row1 - row0
+        dat = _round_mantissa(dat, mantissa_bits)
         if comp == 1:
             h5d_eri[row0:row1] = dat
         else:
@@ -110,7 +134,8 @@ def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='j3c', tmpdir=No
 def cholesky_eri_b(mol, erifile, auxbasis='weigend+etb', dataname='j3c',
                    int3c='int3c2e', aosym='s2ij', int2c='int2c2e', comp=1,
                    max_memory=MAX_MEMORY, auxmol=None, decompose_j2c='CD',
-                   lindep=LINEAR_DEP_THR, verbose=logger.NOTE):
+                   lindep=LINEAR_DEP_THR, verbose=logger.NOTE,
+                   compression=COMPRESSION, mantissa_bits=MANTISSA_BITS):
     '''3-center 2-electron DF tensor. Similar to cholesky_eri while this
     function stores DF tensor in blocks.
 
@@ -123,6 +148,11 @@ def cholesky_eri_b(mol, erifile, auxbasis='weigend+etb', dataname='j3c',
         lindep : float
             The threshold to discard linearly dependent basis when decompose_j2c
             is set to ED.
+        compression : str
+            HDF5 compression filter ('gzip' or 'lzf') for the DF tensor.
+        mantissa_bits : int
+            If specified, the DF tensor is rounded to this number of
+            significand bits before being written.
     '''
     assert (aosym in ('s1', 's2ij'))
     log = logger.new_logger(mol, verbose)
@@ -215,12 +245,17 @@ def cholesky_eri_b(mol, erifile, auxbasis='weigend+etb', dataname='j3c',
         sh_range = shranges[istep]
         label = '%s/%d'%(dataname,istep)
         if comp == 1:
-            feri[label] = dat
+            dat = _round_mantissa(dat, mantissa_bits)
+            feri.create_dataset(
+                label, data=dat,
+                **_dataset_options(dat.shape, compression, mantissa_bits))
         else:
             shape = (len(dat),) + dat[0].shape
-            fdat = feri.create_dataset(label, shape, dat[0].dtype.char)
+            fdat = feri.create_dataset(
+                label, shape, dat[0].dtype.char,
+                **_dataset_options(shape, compression, mantissa_bits))
             for i, b in enumerate(dat):
-                fdat[i] = b
+                fdat[i] = _round_mantissa(b, mantissa_bits)
         dat = None
         log.debug('int3c2e [%d/%d], AO [%d:%d], nrow = %d',
                   istep+1, len(shranges), *sh_range)
@@ -307,6 +342,34 @@ def _guess_shell_ranges(mol, buflen, aosym, start=0, stop=None):
         nao = ao_loc_long[-1]
         return balance_partition(ao_loc_long*nao, buflen, start, stop)
 
+def _dataset_options(shape, compression=None, mantissa_bits=None,
+                     chunk_size=CHUNK_SIZE):
+    '''HDF5 dataset options. The chunks are laid out for reading the DF
+    tensor by rows of auxiliary basis. The shuffle filter is applied to
+    the rounded tensor to group the zero bytes.'''
+    if not compression:
+        return {}
+    nrow, ncol = shape[-2:]
+    ncol_chunk = max(1, min(ncol, chunk_size))
+    nrow_chunk = max(1, min(nrow, chunk_size // ncol_chunk))
+    chunks = (1,) * (len(shape) - 2) + (nrow_chunk, ncol_chunk)
+    return {'compression': compression, 'chunks': chunks,
+            'shuffle': mantissa_bits is not None and mantissa_bits < 52}
+
+def _round_mantissa(a, mantissa_bits=None):
+    '''Round the float64 array to the given number of significand bits (in
+    place). The trailing zero bits of the significand are compressed
+    efficiently by the HDF5 filters.'''
+    if mantissa_bits is None or mantissa_bits >= 52:
+        return a
+    assert a.dtype == numpy.double
+    a = numpy.ascontiguousarray(a)
+    shift = 52 - mantissa_bits
+    ai = a.view(numpy.uint64)
+    ai += numpy.uint64(1 << (shift - 1))
+    ai &= numpy.uint64(2**64 - 2**shift)
+    return a
+
 def _create_h5file(erifile, dataname):
     if isinstance(getattr(erifile, 'name', None), str):
         # The TemporaryFile and H5Tmpfile
@@ -194,6 +194,39 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(abs(vj0-vj1).max(), 0, 12)
         self.assertAlmostEqual(lib.fp(vj0), -194.15910890730052, 9)
 
+    def test_local_k(self):
+        mol1 = gto.M(atom=';'.join('O %g 0 0; H %g .757 .587; H %g -.757 .587' % ((3*i,)*3)
+                                   for i in range(3)), basis='6-31g')
+        mf = mol1.RHF().density_fit(auxbasis='weigend').run()
+        e_ref = mf.e_tot
+        dm = mf.make_rdm1()
+        vj0, vk0 = mf.with_df.get_jk(dm)
+        mf.with_df.local_k_tol = 1e-8
+        vj1, vk1 = mf.with_df.get_jk(dm)
+        self.assertAlmostEqual(abs(vj1-vj0).max(), 0, 12)
+        self.assertAlmostEqual(abs(vk1-vk0).max(), 0, 7)
+        self.assertAlmostEqual(mf.kernel(dm), e_ref, 8)
+
+        # Not positive semidefinite, fall back to the dense algorithm
+        dm1 = dm - numpy.eye(dm.shape[0]) * .1
+        vk1 = mf.with_df.get_jk(dm1)[1]
+        mf.with_df.local_k_tol = None
+        vk0 = mf.with_df.get_jk(dm1)[1]
+        self.assertAlmostEqual(abs(vk1-vk0).max(), 0, 12)
+
+        # All orbitals of an atom are below local_k_tol
+        h2o = 'O 0 0 0; H 0 .757 .587; H 0 -.757 .587'
+        mol1 = gto.M(atom=h2o + '; He 20 0 0', basis='6-31g')
+        mf = mol1.RHF().density_fit(auxbasis='weigend')
+        nao_he = 2
+        dm = numpy.zeros((mol1.nao, mol1.nao))
+        dm[:-nao_he,:-nao_he] = gto.M(atom=h2o, basis='6-31g').RHF().run().make_rdm1()
+        dm[-nao_he:,-nao_he:] = numpy.eye(nao_he) * 1e-9
+        vk0 = mf.get_jk(mol1, dm)[1]
+        mf.with_df.local_k_tol = 1e-4
+        vk1 = mf.get_jk(mol1, dm)[1]
+        self.assertAlmostEqual(abs(vk1-vk0).max(), 0, 7)
+
     def test_df_jk_complex_dm(self):
         mol = gto.M(atom='H 0 0 0; H 0 0 1')
         mf = mol.RHF().run()
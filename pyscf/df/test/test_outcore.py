@@ -110,6 +110,34 @@ class KnownValues(unittest.TestCase):
         eri1 = numpy.dot(cderi1.T, cderi1)
         self.assertAlmostEqual(abs(eri0-eri1).max(), 0, 9)
 
+    def test_compression(self):
+        ftmp = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+        cderi0 = df.incore.cholesky_eri(mol)
+        df.outcore.cholesky_eri(mol, ftmp.name, max_memory=.05, compression='gzip')
+        with h5py.File(ftmp.name, 'r') as feri:
+            self.assertEqual(feri['j3c'].compression, 'gzip')
+            self.assertAlmostEqual(abs(feri['j3c'][:] - cderi0).max(), 0, 12)
+
+        swap_kwargs = []
+        def cholesky_eri_b(*args, **kwargs):
+            swap_kwargs.append(kwargs)
+            return cholesky_eri_b_orig(*args, **kwargs)
+        cholesky_eri_b_orig = df.outcore.cholesky_eri_b
+        with lib.temporary_env(df.outcore, cholesky_eri_b=cholesky_eri_b):
+            df.outcore.cholesky_eri(mol, ftmp.name, compression='lzf', mantissa_bits=20)
+        self.assertTrue(swap_kwargs[0]['compression'] is None)
+        self.assertTrue(swap_kwargs[0]['mantissa_bits'] is None)
+        with h5py.File(ftmp.name, 'r') as feri:
+            cderi1 = feri['j3c'][:]
+        self.assertTrue(abs(cderi1 - cderi0).max() < abs(cderi0).max() * 2**-20)
+        self.assertTrue(numpy.all(cderi1.view(numpy.uint64) & (2**32-1) == 0))
+
+        df.outcore.cholesky_eri_b(mol, ftmp.name, auxmol=auxmol, compression='gzip')
+        mf = mol.RHF().density_fit(auxbasis='weigend')
+        mf.with_df._cderi = ftmp.name
+        e_ref = mol.RHF().density_fit(auxbasis='weigend').kernel()
+        self.assertAlmostEqual(mf.kernel(), e_ref, 10)
+
 #    def test_int3c2e_ip(self):
 #        ftmp = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
 #        df.outcore.cholesky_eri(mol, ftmp.name, int3c='int3c2e_ip1',
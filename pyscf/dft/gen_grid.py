@@ -27,6 +27,7 @@ Reference for Lebedev-Laikov grid:
 
 import sys
 import ctypes
+import collections
 import numpy
 from pyscf import lib
 from pyscf.lib import logger
@@ -43,6 +44,11 @@ GROUP_BOUNDARY_PENALTY = 4.2
 # Padding grids to make the AO value generated by eval_gto aligned in memory
 ALIGNMENT_UNIT = 8
 NELEC_ERROR_TOL = getattr(__config__, 'dft_rks_prune_error_tol', 0.02)
+# Drop grids if weight * max(|AO|^2) on the grid is smaller than this value
+AO_WEIGHT_CUTOFF = getattr(__config__, 'dft_gen_grid_Grids_ao_weight_cutoff', 0)
+# Number of geometries for which Grids keeps the generated grids to reuse them
+# when the grids are rebuilt at the same geometry (e.g. in scanner mode)
+GRIDS_CACHE_SIZE = getattr(__config__, 'dft_gen_grid_Grids_cache_size', 1)
 
 # SG0
 # S. Chien and P. Gill,  J. Comput. Chem. 27 (2006) 730-739.
@@ -161,9 +167,11 @@ def treutler_prune(nuc, rads, n_ang, radii=None):
 # Becke partitioning
 
 # Stratmann, Scuseria, Frisch. CPL, 257, 213 (1996), eq.11
+STRATMANN_A = .64  # for eq. 14
+
 def stratmann(g):
     '''Stratmann, Scuseria, Frisch. CPL, 257, 213 (1996); DOI:10.1016/0009-2614(96)00600-8'''
-    a = .64  # for eq. 14
+    a = STRATMANN_A
     g = numpy.asarray(g)
     ma = g/a
     ma2 = ma * ma
@@ -288,11 +296,13 @@ def get_partition(mol, atom_grids_tab,
         f_radii_adjust = None
     atm_coords = numpy.asarray(mol.atom_coords() , order='C')
     atm_dist = gto.inter_distance(mol)
-    if (becke_scheme is original_becke and
-        (radii_adjust is radi.treutler_atomic_radii_adjust or
-         radii_adjust is radi.becke_atomic_radii_adjust or
-         f_radii_adjust is None)):
+    # The radii adjustment of these functions can be tabulated for C kernels
+    c_radii_adjust = (radii_adjust is radi.treutler_atomic_radii_adjust or
+                      radii_adjust is radi.becke_atomic_radii_adjust or
+                      f_radii_adjust is None)
+    if c_radii_adjust:
         if f_radii_adjust is None:
+            f_radii_table = None
             p_radii_table = lib.c_null_ptr()
         else:
             f_radii_table = numpy.asarray([f_radii_adjust(i, j, 0)
@@ -300,6 +310,7 @@ def get_partition(mol, atom_grids_tab,
                                            for j in range(mol.natm)])
             p_radii_table = f_radii_table.ctypes.data_as(ctypes.c_void_p)
 
+    if becke_scheme is original_becke and c_radii_adjust:
         def gen_grid_partition(coords):
             coords = numpy.asarray(coords, order='F')
             ngrids = coords.shape[0]
@@ -310,6 +321,37 @@ def get_partition(mol, atom_grids_tab,
                                p_radii_table,
                                ctypes.c_int(mol.natm), ctypes.c_int(ngrids))
             return pbecke
+
+    elif becke_scheme is stratmann and c_radii_adjust:
+        # The switching function of Stratmann vanishes for mu >= a. Only the
+        # atoms in the vicinity of a grid are needed for its Becke weight.
+        a = STRATMANN_A
+        alpha = 0 if f_radii_table is None else -min(f_radii_table.min(), 0)
+        if alpha > 0:
+            # the largest mu at which mu + alpha*(1-mu^2) = a
+            mu_max = (numpy.sqrt(1 + 4*alpha*(alpha+a)) - 1) / (2*alpha)
+        else:
+            mu_max = a
+        K = (1 + mu_max) / (1 - mu_max)
+
+        def gen_becke_weights(coords, ia):
+            coords = numpy.asarray(coords, order='F')
+            ngrids = coords.shape[0]
+            dist = atm_dist[ia].copy()
+            dist[ia] = -1
+            order = numpy.asarray(numpy.argsort(dist, kind='stable'), dtype=numpy.int32)
+            dist = numpy.asarray(atm_dist[ia][order], order='C')
+            weights = numpy.empty(ngrids)
+            libdft.VXCgen_grid_stratmann(
+                weights.ctypes.data_as(ctypes.c_void_p),
+                coords.ctypes.data_as(ctypes.c_void_p),
+                atm_coords.ctypes.data_as(ctypes.c_void_p), p_radii_table,
+                order.ctypes.data_as(ctypes.c_void_p),
+                dist.ctypes.data_as(ctypes.c_void_p),
+                ctypes.c_int(mol.natm), ctypes.c_int(ngrids),
+                ctypes.c_double(a), ctypes.c_double(K))
+            return weights
+
     else:
         def gen_grid_partition(coords):
             ngrids = coords.shape[0]
@@ -328,13 +370,17 @@ def get_partition(mol, atom_grids_tab,
                     pbecke[j] *= .5 * (1+g)
             return pbecke
 
+    if not (becke_scheme is stratmann and c_radii_adjust):
+        def gen_becke_weights(coords, ia):
+            pbecke = gen_grid_partition(coords)
+            return pbecke[ia] * (1./pbecke.sum(axis=0))
+
     coords_all = []
     weights_all = []
     for ia in range(mol.natm):
         coords, vol = atom_grids_tab[mol.atom_symbol(ia)]
         coords = coords + atm_coords[ia]
-        pbecke = gen_grid_partition(coords)
-        weights = vol * pbecke[ia] * (1./pbecke.sum(axis=0))
+        weights = vol * gen_becke_weights(coords, ia)
         coords_all.append(coords)
         weights_all.append(weights)
 
@@ -395,6 +441,75 @@ def arg_group_grids(mol, coords, box_size=GROUP_BOX_SIZE):
                                    return_counts=True)[1:3]
     return rev_idx.ravel().argsort(kind='stable')
 
+def ao_weight_mask(mol, coords, weights, cutoff=AO_WEIGHT_CUTOFF, blksize=4096):
+    '''Mask of the grids on which weight * max(|AO|^2) is larger than cutoff.
+    The AO pair products on the other grids contribute less than cutoff to
+    any element of the integrals.
+    '''
+    eval_name = 'GTOval_cart' if mol.cart else 'GTOval_sph'
+    ngrids = weights.size
+    mask = numpy.empty(ngrids, dtype=bool)
+    for p0, p1 in lib.prange(0, ngrids, blksize):
+        ao = mol.eval_gto(eval_name, coords[p0:p1])
+        ao_max = abs(ao).max(axis=1)
+        mask[p0:p1] = abs(weights[p0:p1]) * ao_max**2 > cutoff
+    return mask
+
+def adaptive_atom_grid(grids, rho_evaluator, tol=1e-5, min_level=0):
+    '''Lower the grid level for each element as long as the Becke-partitioned
+    atomic populations change less than tol, compared to the populations on
+    the grids of grids.level.
+
+    Args:
+        grids : an instance of :class:`Grids`
+        rho_evaluator : function(grids) => rho
+            Electron density on the given grids.
+
+    Returns:
+        A dict {atom: (n_rad, n_ang)} for the elements which can be
+        integrated on grids coarser than grids.level. Elements which are
+        specified in grids.atom_grid are not changed.
+    '''
+    mol = grids.mol
+    atom_grid = grids.atom_grid
+    if isinstance(atom_grid, (list, tuple)) or 'default' in atom_grid:
+        return {}
+
+    def atomic_populations(level, atom_grid):
+        g = grids.copy()
+        g.non0tab = g.screen_index = None
+        g.atom_grid = atom_grid
+        g.level = level
+        g.ao_weight_cutoff = 0
+        g.alignment = 0
+        g.build(with_non0tab=False, sort_grids=False)
+        rho = rho_evaluator(g)
+        return numpy.bincount(g.atm_idx, weights=rho*g.weights,
+                              minlength=mol.natm)
+
+    symbs = [mol.atom_symbol(ia) for ia in range(mol.natm)]
+    pop_ref = atomic_populations(grids.level, atom_grid)
+    adapted = {}
+    candidates = set(symbs).difference(atom_grid)
+    symbs = numpy.array(symbs)
+    for level in range(grids.level-1, min_level-1, -1):
+        trial = {symb: (int(_default_rad(gto.charge(symb), level)),
+                        int(_default_ang(gto.charge(symb), level)))
+                 for symb in candidates}
+        trial.update(adapted)
+        trial.update(atom_grid)
+        err = abs(atomic_populations(level, trial) - pop_ref)
+        for symb in list(candidates):
+            if err[symbs == symb].max() < tol:
+                adapted[symb] = trial[symb]
+            else:
+                candidates.remove(symb)
+        logger.debug(grids, 'level %d, population errors %s', level, err)
+        if not candidates:
+            break
+    logger.info(grids, 'Adaptive atom grids %s', adapted)
+    return adapted
+
 def _load_conf(mod, name, default):
     var = getattr(__config__, name, None)
     if var is None:
@@ -461,6 +576,16 @@ class Grids(lib.StreamObject):
             Eg, grids.atom_grid = {'H': (20,110)} will generate 20 radial
             grids and 110 angular grids for H atom.
 
+        ao_weight_cutoff : float
+            Drop the grids on which weight * max(|AO|^2) is smaller than
+            this value. Default is 0 (no screening).
+
+        cache_size : int
+            Number of geometries for which the generated grids are kept.
+            Building grids again for a cached geometry and the same settings
+            (e.g. in scanner mode) reuses the cached grids. The atomic grids
+            are cached independently of the geometry.
+
     Saved results:
         coords : ndarray
             Coordinates of the integration grids.
@@ -500,12 +625,17 @@ class Grids(lib.StreamObject):
 
     alignment = ALIGNMENT_UNIT
     cutoff = CUTOFF
+    ao_weight_cutoff = AO_WEIGHT_CUTOFF
+    cache_size = GRIDS_CACHE_SIZE
+    _atom_grids_cache = (None, None)
+    _grids_cache = None
 
     _keys = {
         'atomic_radii', 'radii_adjust', 'radi_method', 'becke_scheme',
         'prune', 'level', 'alignment', 'cutoff', 'mol', 'symmetry',
         'atom_grid', 'non0tab', 'screen_index', 'coords', 'weights',
-        'atm_idx', 'quadrature_weights',
+        'atm_idx', 'quadrature_weights', 'ao_weight_cutoff', 'cache_size',
+        'adapted_atom_grid',
     }
 
     def __init__(self, mol):
@@ -529,6 +659,9 @@ class Grids(lib.StreamObject):
         # Volume of each grid not scaled by the Becke partition. This
         # information is required by the grid response code
         self.quadrature_weights = None
+        # The (n_rad, n_ang) of the elements selected by adaptive_atom_grid
+        # for the current geometry. atom_grid takes precedence.
+        self.adapted_atom_grid = None
 
     @property
     def size(self):
@@ -536,7 +669,7 @@ class Grids(lib.StreamObject):
 
     def __setattr__(self, key, val):
         if key in ('atom_grid', 'atomic_radii', 'radii_adjust', 'radi_method',
-                   'becke_scheme', 'prune', 'level'):
+                   'becke_scheme', 'prune', 'level', 'ao_weight_cutoff'):
             self.reset()
         super().__setattr__(key, val)
 
@@ -552,14 +685,74 @@ class Grids(lib.StreamObject):
             logger.debug2(self, 'atomic_radii : %s', self.atomic_radii)
         if self.atom_grid:
             logger.info(self, 'User specified grid scheme %s', str(self.atom_grid))
+        if self.ao_weight_cutoff > 0:
+            logger.info(self, 'ao_weight_cutoff = %g', self.ao_weight_cutoff)
         return self
 
     def build(self, mol=None, with_non0tab=False, sort_grids=True, **kwargs):
         if mol is None: mol = self.mol
         if self.verbose >= logger.WARN:
             self.check_sanity()
-        atom_grids_tab = self.gen_atomic_grids(
-            mol, self.atom_grid, self.radi_method, self.level, self.prune, **kwargs)
+
+        if self._grids_cache is None:
+            self._grids_cache = collections.OrderedDict()
+        key = self._grids_cache_key(mol, sort_grids, kwargs)
+        if key in self._grids_cache:
+            logger.debug(self, 'Reuse the grids generated for the same geometry')
+            self._grids_cache.move_to_end(key)
+            (self.coords, self.weights, self.atm_idx,
+             self.quadrature_weights) = self._grids_cache[key]
+        else:
+            self._build_grids(mol, sort_grids, **kwargs)
+            if self.cache_size > 0:
+                self._grids_cache[key] = (self.coords, self.weights,
+                                          self.atm_idx, self.quadrature_weights)
+                while len(self._grids_cache) > self.cache_size:
+                    self._grids_cache.popitem(last=False)
+
+        if with_non0tab:
+            self.non0tab = self.make_mask(mol, self.coords)
+            self.screen_index = self.non0tab
+        else:
+            self.screen_index = self.non0tab = None
+        logger.info(self, 'tot grids = %d', len(self.weights))
+        return self
+
+    def _atom_grids_key(self, mol, kwargs):
+        return (tuple(mol.atom_symbol(ia) for ia in range(mol.natm)),
+                repr(self.get_atom_grid()), self.radi_method, self.level, self.prune,
+                radi.ATOM_SPECIFIC_TREUTLER_GRIDS, repr(sorted(kwargs.items())))
+
+    def _grids_cache_key(self, mol, sort_grids, kwargs):
+        atomic_radii = self.atomic_radii
+        if isinstance(atomic_radii, numpy.ndarray):
+            atomic_radii = atomic_radii.tobytes()
+        key = (self._atom_grids_key(mol, kwargs), mol.atom_coords().tobytes(),
+               atomic_radii, self.radii_adjust, self.becke_scheme,
+               self.alignment, sort_grids, self.ao_weight_cutoff)
+        if self.ao_weight_cutoff > 0:
+            # The screening depends on the basis set
+            key += (mol._bas.tobytes(), mol._env.tobytes())
+        return key
+
+    def _get_atomic_grids(self, mol, **kwargs):
+        '''Atomic grids, cached for molecules of the same atoms'''
+        key = self._atom_grids_key(mol, kwargs)
+        if self._atom_grids_cache[0] != key:
+            atom_grids_tab = self.gen_atomic_grids(
+                mol, self.get_atom_grid(), self.radi_method, self.level,
+                self.prune, **kwargs)
+            self._atom_grids_cache = (key, atom_grids_tab)
+        return self._atom_grids_cache[1]
+
+    def get_atom_grid(self):
+        '''The atom_grid settings which are used to generate the grids'''
+        if self.adapted_atom_grid:
+            return {**self.adapted_atom_grid, **self.atom_grid}
+        return self.atom_grid
+
+    def _build_grids(self, mol, sort_grids=True, **kwargs):
+        atom_grids_tab = self._get_atomic_grids(mol, **kwargs)
         self.coords, self.weights = self.get_partition(
             mol, atom_grids_tab, self.radii_adjust, self.atomic_radii, self.becke_scheme)
 
@@ -574,6 +767,16 @@ class Grids(lib.StreamObject):
         self.atm_idx = atm_idx
         self.quadrature_weights = quadrature_weights
 
+        if self.ao_weight_cutoff > 0:
+            idx = ao_weight_mask(mol, self.coords, self.weights,
+                                 self.ao_weight_cutoff)
+            logger.debug(self, 'Drop grids %d by ao_weight_cutoff',
+                         idx.size - numpy.count_nonzero(idx))
+            self.coords = self.coords[idx]
+            self.weights = self.weights[idx]
+            self.atm_idx = self.atm_idx[idx]
+            self.quadrature_weights = self.quadrature_weights[idx]
+
         if sort_grids:
             idx = arg_group_grids(mol, self.coords)
             self.coords = self.coords[idx]
@@ -590,13 +793,6 @@ class Grids(lib.StreamObject):
                 self.weights = numpy.hstack([self.weights, numpy.zeros(padding)])
                 self.atm_idx = numpy.hstack([self.atm_idx, numpy.full(padding, -1, dtype=numpy.int32)])
                 self.quadrature_weights = numpy.hstack([self.quadrature_weights, numpy.zeros(padding)])
-
-        if with_non0tab:
-            self.non0tab = self.make_mask(mol, self.coords)
-            self.screen_index = self.non0tab
-        else:
-            self.screen_index = self.non0tab = None
-        logger.info(self, 'tot grids = %d', len(self.weights))
         return self
 
     def kernel(self, mol=None, with_non0tab=False):
@@ -613,6 +809,7 @@ class Grids(lib.StreamObject):
         self.screen_index = None
         self.atm_idx = None
         self.quadrature_weights = None
+        self.adapted_atom_grid = None
         return self
 
     gen_atomic_grids = lib.module_method(
@@ -623,7 +820,7 @@ class Grids(lib.StreamObject):
                       radii_adjust=None, atomic_radii=radi.BRAGG_RADII,
                       becke_scheme=original_becke, concat=True):
         if atom_grids_tab is None:
-            atom_grids_tab = self.gen_atomic_grids(mol)
+            atom_grids_tab = self.gen_atomic_grids(mol, self.get_atom_grid())
         return get_partition(mol, atom_grids_tab, radii_adjust, atomic_radii,
                              becke_scheme, concat=concat)
 
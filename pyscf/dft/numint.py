@@ -22,6 +22,7 @@ Numerical integration functions for RKS and UKS with real AO basis
 
 import warnings
 import ctypes
+import collections
 import numpy
 from pyscf import lib
 try:
@@ -48,8 +49,21 @@ SWITCH_SIZE = getattr(__config__, 'dft_numint_switch_size', 800)
 # Whether to compute density laplacian for meta-GGA functionals
 MGGA_DENSITY_LAPL = False
 
+# Memory (in MB) to cache AO values between calls of NumInt.block_loop. The
+# cache is disabled by default.
+AO_CACHE_SIZE = getattr(__config__, 'dft_numint_NumInt_ao_cache_size', 0)
+# The AO values can be cached in single precision to reduce memory footprint.
+AO_CACHE_DTYPE = getattr(__config__, 'dft_numint_NumInt_ao_cache_dtype', numpy.double)
+
+# Whether to contract AO pairs with single precision GEMM in nr_rks and nr_uks
+MIXED_PRECISION = getattr(__config__, 'dft_numint_NumInt_mixed_precision', False)
+
+# Whether to integrate all trial densities of nr_rks_fxc together with batched
+# GEMMs. It is not faster with single-threaded BLAS. Disabled by default.
+FXC_FUSED = getattr(__config__, 'dft_numint_NumInt_fxc_fused', False)
+
 def eval_ao(mol, coords, deriv=0, shls_slice=None,
-            non0tab=None, cutoff=None, out=None, verbose=None):
+            non0tab=None, cutoff=None, out=None, verbose=None, sparse=False):
     '''Evaluate AO function value on the given grids.
 
     Args:
@@ -81,6 +95,10 @@ def eval_ao(mol, coords, deriv=0, shls_slice=None,
             If provided, results are written into this array.
         verbose : int or object of :class:`Logger`
             No effects.
+        sparse : bool
+            If set, only the shells which are not screened out by non0tab on
+            the grids are evaluated. The AO values are returned in a
+            :class:`SparseAO` object.
 
     Returns:
         2D array of shape (N,nao) for AO values if deriv = 0.
@@ -105,6 +123,8 @@ def eval_ao(mol, coords, deriv=0, shls_slice=None,
     >>> print(ao_value.shape)
     (10, 100, 7)
     '''
+    if sparse:
+        return SparseAO.build(mol, coords, deriv, shls_slice, non0tab, cutoff, out)
     comp = (deriv+1)*(deriv+2)*(deriv+3)//6
     if mol.cart:
         feval = 'GTOval_cart_deriv%d' % deriv
@@ -113,6 +133,79 @@ def eval_ao(mol, coords, deriv=0, shls_slice=None,
     return mol.eval_gto(feval, coords, comp, shls_slice, non0tab,
                         cutoff=cutoff, out=out)
 
+class SparseAO:
+    '''AO values on a block of grids. Only the shells which are not screened
+    out on the block are stored.
+
+    Attributes:
+        mol : :class:`Mole`
+            A view of the molecule which holds the stored shells only. Its
+            basis layout (nbas, ao_loc) matches data and non0tab.
+        data : ndarray
+            AO values of the stored shells, in the shape of :func:`eval_ao`.
+        non0tab : 2D uint8 array
+            Screening index of the stored shells on the grids.
+        ao_idx : 1D int array
+            Indices of the stored AOs in the original AO basis.
+        nao : int
+            Number of AOs of the original basis.
+    '''
+    def __init__(self, mol, data, non0tab, ao_idx, nao):
+        self.mol = mol
+        self.data = data
+        self.non0tab = non0tab
+        self.ao_idx = ao_idx
+        self.nao = nao
+
+    @classmethod
+    def build(cls, mol, coords, deriv=0, shls_slice=None, non0tab=None,
+              cutoff=None, out=None):
+        ngrids = coords.shape[0]
+        if shls_slice is None:
+            shls_slice = (0, mol.nbas)
+        sh0, sh1 = shls_slice
+        if non0tab is None:
+            non0tab = make_mask(mol, coords, cutoff=cutoff or CUTOFF)
+        non0tab = non0tab[:(ngrids+BLKSIZE-1)//BLKSIZE]
+        shl_mask = non0tab[:,sh0:sh1].any(axis=0)
+        if not shl_mask.any():
+            # Keep one (zero) shell to avoid empty arrays in the AO kernels
+            shl_mask[0] = True
+        shls = sh0 + numpy.where(shl_mask)[0]
+
+        pmol = mol.view(mol.__class__)
+        pmol._bas = numpy.asarray(mol._bas[shls], order='C')
+        non0tab = numpy.asarray(non0tab[:,shls], order='C')
+        data = eval_ao(pmol, coords, deriv, None, non0tab, cutoff, out)
+
+        ao_loc = mol.ao_loc_nr()
+        ao_idx = numpy.where(numpy.repeat(shl_mask, numpy.diff(ao_loc[sh0:sh1+1])))[0]
+        return cls(pmol, data, non0tab, ao_idx, int(ao_loc[sh1] - ao_loc[sh0]))
+
+    @property
+    def shape(self):
+        return self.data.shape[:-1] + (self.nao,)
+
+    def compress(self, mat):
+        '''The block of a (nao,nao) matrix on the stored AOs'''
+        idx = self.ao_idx
+        if mat.dtype == numpy.double:
+            return lib.take_2d(mat, idx, idx)
+        return mat[idx[:,None],idx]
+
+    def expand(self, mat):
+        '''Scatter a matrix in the stored AOs to the (nao,nao) matrix'''
+        idx = self.ao_idx
+        out = numpy.zeros((self.nao,self.nao), dtype=mat.dtype)
+        out[idx[:,None],idx] = mat
+        return out
+
+    def todense(self):
+        '''AO values in the dense array as returned by :func:`eval_ao`'''
+        out = numpy.zeros(self.shape, dtype=self.data.dtype)
+        out[...,self.ao_idx] = self.data
+        return out
+
 def eval_rho(mol, ao, dm, non0tab=None, xctype='LDA', hermi=0,
              with_lapl=True, verbose=None):
     r'''Calculate the electron density for LDA functional, and the density
@@ -156,6 +249,9 @@ def eval_rho(mol, ao, dm, non0tab=None, xctype='LDA', hermi=0,
     >>> dm = dm + dm.T
     >>> rho, dx_rho, dy_rho, dz_rho = eval_rho(mol, ao, dm, xctype='LDA')
     '''
+    if isinstance(ao, SparseAO):
+        return eval_rho(ao.mol, ao.data, ao.compress(dm), ao.non0tab, xctype,
+                        hermi, with_lapl, verbose)
     xctype = xctype.upper()
     ngrids, nao = ao.shape[-2:]
 
@@ -598,6 +694,10 @@ def eval_mat(mol, ao, weight, rho, vxc,
         XC potential matrix in 2D array of shape (nao,nao) where nao is the
         number of AO functions.
     '''
+    if isinstance(ao, SparseAO):
+        mat = eval_mat(ao.mol, ao.data, weight, rho, vxc, ao.non0tab, xctype,
+                       spin, verbose)
+        return ao.expand(mat)
     xctype = xctype.upper()
     ngrids, nao = ao.shape[-2:]
 
@@ -804,6 +904,12 @@ def _tau_dot(mol, bra, ket, wv, mask, shls_slice, ao_loc):
     '''nabla_ao dot nabla_ao
     numpy.einsum('p,xpi,xpj->ij', wv, bra[1:4].conj(), ket[1:4])
     '''
+    if isinstance(bra, SparseAO):
+        assert ket is bra
+        pmol = bra.mol
+        mat = _tau_dot(pmol, bra.data, bra.data, wv, bra.non0tab,
+                       (0, pmol.nbas), pmol.ao_loc_nr())
+        return bra.expand(mat)
     aow = _scale_ao(ket[1], wv)
     mat = _dot_ao_ao(mol, bra[1], aow, mask, shls_slice, ao_loc)
     aow = _scale_ao(ket[2], wv, aow)
@@ -972,6 +1078,32 @@ def _tau_dot_sparse(bra, ket, wv, nbins, screen_index, pair_mask, ao_loc, out=No
                       ao_loc, hermi, out)
     return out
 
+def _dot_ao_ao_mixed(ao1, ao2, wv, nbins, screen_index, pair_mask, ao_loc,
+                     hermi=0, out=None):
+    '''Returns (bra*wv).T.dot(ket) using single precision GEMM. The result is
+    accumulated in the double precision array out. The arguments of sparsity
+    are ignored.
+    '''
+    ngrids, nao = ao1.shape
+    if out is None:
+        out = numpy.zeros((nao, nao))
+    if wv is not None:
+        ao1 = _scale_ao(ao1, wv.ravel())
+    ao1 = numpy.asarray(ao1.T, dtype=numpy.float32, order='C')
+    ao2 = numpy.asarray(ao2, dtype=numpy.float32, order='F')
+    out += numpy.dot(ao1, ao2)
+    return out
+
+def _tau_dot_mixed(bra, ket, wv, nbins, screen_index, pair_mask, ao_loc, out=None):
+    '''Similar to _tau_dot_sparse, using single precision GEMM'''
+    nao = bra.shape[1]
+    if out is None:
+        out = numpy.zeros((nao, nao))
+    for i in range(1, 4):
+        _dot_ao_ao_mixed(bra[i], ket[i], wv, nbins, screen_index, pair_mask,
+                         ao_loc, out=out)
+    return out
+
 def nr_vxc(mol, grids, xc_code, dms, spin=0, relativity=0, hermi=0,
            max_memory=2000, verbose=None):
     '''
@@ -1141,19 +1273,23 @@ def nr_rks(ni, mol, grids, xc_code, dms, relativity=0, hermi=1,
 
     aow = None
     pair_mask = mol.get_overlap_cond() < -numpy.log(ni.cutoff)
+    if ni.mixed_precision:
+        dot_ao_ao, tau_dot = _dot_ao_ao_mixed, _tau_dot_mixed
+    else:
+        dot_ao_ao, tau_dot = _dot_ao_ao_sparse, _tau_dot_sparse
     if xctype == 'LDA':
         ao_deriv = 0
         for i, ao, mask, wv in block_loop(ao_deriv):
-            _dot_ao_ao_sparse(ao, ao, wv, nbins, mask, pair_mask, ao_loc,
-                              hermi, vmat[i])
+            dot_ao_ao(ao, ao, wv, nbins, mask, pair_mask, ao_loc,
+                      hermi, vmat[i])
 
     elif xctype == 'GGA':
         ao_deriv = 1
         for i, ao, mask, wv in block_loop(ao_deriv):
             wv[0] *= .5  # *.5 because vmat + vmat.T at the end
             aow = _scale_ao_sparse(ao[:4], wv[:4], mask, ao_loc, out=aow)
-            _dot_ao_ao_sparse(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
-                              hermi=0, out=vmat[i])
+            dot_ao_ao(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
+                      hermi=0, out=vmat[i])
         vmat = lib.hermi_sum(vmat, axes=(0,2,1))
 
     elif xctype == 'MGGA':
@@ -1165,9 +1301,9 @@ def nr_rks(ni, mol, grids, xc_code, dms, relativity=0, hermi=1,
             wv[0] *= .5  # *.5 for v+v.conj().T
             wv[4] *= .5  # *.5 for 1/2 in tau
             aow = _scale_ao_sparse(ao[:4], wv[:4], mask, ao_loc, out=aow)
-            _dot_ao_ao_sparse(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
-                              hermi=0, out=vmat[i])
-            _tau_dot_sparse(ao, ao, wv[4], nbins, mask, pair_mask, ao_loc, out=v1[i])
+            dot_ao_ao(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
+                      hermi=0, out=vmat[i])
+            tau_dot(ao, ao, wv[4], nbins, mask, pair_mask, ao_loc, out=v1[i])
         vmat = lib.hermi_sum(vmat, axes=(0,2,1))
         vmat += v1
 
@@ -1266,14 +1402,18 @@ def nr_uks(ni, mol, grids, xc_code, dms, relativity=0, hermi=1,
                 yield i, ao, mask, wv
 
     pair_mask = mol.get_overlap_cond() < -numpy.log(ni.cutoff)
+    if ni.mixed_precision:
+        dot_ao_ao, tau_dot = _dot_ao_ao_mixed, _tau_dot_mixed
+    else:
+        dot_ao_ao, tau_dot = _dot_ao_ao_sparse, _tau_dot_sparse
     aow = None
     if xctype == 'LDA':
         ao_deriv = 0
         for i, ao, mask, wv in block_loop(ao_deriv):
-            _dot_ao_ao_sparse(ao, ao, wv[0,0], nbins, mask, pair_mask, ao_loc,
-                              hermi, vmat[0,i])
-            _dot_ao_ao_sparse(ao, ao, wv[1,0], nbins, mask, pair_mask, ao_loc,
-                              hermi, vmat[1,i])
+            dot_ao_ao(ao, ao, wv[0,0], nbins, mask, pair_mask, ao_loc,
+                      hermi, vmat[0,i])
+            dot_ao_ao(ao, ao, wv[1,0], nbins, mask, pair_mask, ao_loc,
+                      hermi, vmat[1,i])
 
     elif xctype == 'GGA':
         ao_deriv = 1
@@ -1281,11 +1421,11 @@ def nr_uks(ni, mol, grids, xc_code, dms, relativity=0, hermi=1,
             wv[:,0] *= .5
             wva, wvb = wv
             aow = _scale_ao_sparse(ao, wva, mask, ao_loc, out=aow)
-            _dot_ao_ao_sparse(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
-                              hermi=0, out=vmat[0,i])
+            dot_ao_ao(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
+                      hermi=0, out=vmat[0,i])
             aow = _scale_ao_sparse(ao, wvb, mask, ao_loc, out=aow)
-            _dot_ao_ao_sparse(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
-                              hermi=0, out=vmat[1,i])
+            dot_ao_ao(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
+                      hermi=0, out=vmat[1,i])
         vmat = lib.hermi_sum(vmat.reshape(-1,nao,nao), axes=(0,2,1)).reshape(2,nset,nao,nao)
 
     elif xctype == 'MGGA':
@@ -1299,13 +1439,13 @@ def nr_uks(ni, mol, grids, xc_code, dms, relativity=0, hermi=1,
             wv[:,4] *= .5
             wva, wvb = wv
             aow = _scale_ao_sparse(ao[:4], wva[:4], mask, ao_loc, out=aow)
-            _dot_ao_ao_sparse(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
-                              hermi=0, out=vmat[0,i])
-            _tau_dot_sparse(ao, ao, wva[4], nbins, mask, pair_mask, ao_loc, out=v1[0,i])
+            dot_ao_ao(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
+                      hermi=0, out=vmat[0,i])
+            tau_dot(ao, ao, wva[4], nbins, mask, pair_mask, ao_loc, out=v1[0,i])
             aow = _scale_ao_sparse(ao[:4], wvb[:4], mask, ao_loc, out=aow)
-            _dot_ao_ao_sparse(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
-                              hermi=0, out=vmat[1,i])
-            _tau_dot_sparse(ao, ao, wvb[4], nbins, mask, pair_mask, ao_loc, out=v1[1,i])
+            dot_ao_ao(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
+                      hermi=0, out=vmat[1,i])
+            tau_dot(ao, ao, wvb[4], nbins, mask, pair_mask, ao_loc, out=v1[1,i])
         vmat = lib.hermi_sum(vmat.reshape(-1,nao,nao), axes=(0,2,1)).reshape(2,nset,nao,nao)
         vmat += v1
     elif xctype == 'HF':
@@ -1415,6 +1555,63 @@ def nr_nlc_vxc(ni, mol, grids, xc_code, dm, relativity=0, hermi=1,
     vmat = vmat + vmat.T
     return nelec, excsum, vmat
 
+def _fxc_fused_block(ao, dms, fxc, weight, xctype, vmat, v1=None, buf=None):
+    '''Adds the first order XC potentials of all symmetric density matrices
+    dms on one block of grids to vmat (and to v1 for the tau part of meta-GGA).
+    For GGA and meta-GGA, vmat holds the potentials before the
+    symmetrization v+v.T. Returns the work buffer for the next block.
+    '''
+    nset, nao = dms.shape[:2]
+    ngrids = weight.size
+    if xctype == 'LDA':
+        ao = ao.reshape(1,ngrids,nao)
+    if buf is None or buf.size < nset*nao*ngrids:
+        buf = numpy.empty(nset*nao*ngrids)
+    buf = numpy.ndarray((nset,nao,ngrids), buffer=buf)
+    dms = dms.reshape(nset*nao,nao)
+
+    # c[i] = dms[i].dot(ao[0].T) for all i in one GEMM
+    c = lib.dot(dms, ao[0].T, c=buf.reshape(nset*nao,ngrids))
+    if xctype == 'LDA':
+        rho1 = numpy.empty((nset,1,ngrids))
+    elif xctype == 'GGA':
+        rho1 = numpy.empty((nset,4,ngrids))
+    else:
+        rho1 = numpy.empty((nset,5,ngrids))
+    for i in range(nset):
+        rho1[i,0] = _contract_rho(ao[0], buf[i].T)
+        for x in range(1, min(rho1.shape[1], 4)):
+            rho1[i,x] = _contract_rho(ao[x], buf[i].T) * 2
+    if xctype == 'MGGA':
+        rho1[:,4] = 0
+        for x in range(1, 4):
+            c = lib.dot(dms, ao[x].T, c=c)
+            for i in range(nset):
+                rho1[i,4] += _contract_rho(ao[x], buf[i].T)
+        rho1[:,4] *= .5
+
+    if xctype == 'LDA':
+        wv = rho1 * (fxc[0,0] * weight)
+    else:
+        wv = numpy.einsum('iyg,xyg,g->ixg', rho1, fxc, weight)
+        wv[:,0] *= .5  # *.5 for v+v.conj().T
+
+    ncomp = min(wv.shape[1], 4)
+    for i in range(nset):
+        _scale_ao(ao[:ncomp], wv[i,:ncomp], out=buf[i])
+    # vmat[i] += aow[i].T.dot(ao[0]) for all i in one GEMM
+    vmat = vmat.reshape(nset*nao,nao)
+    lib.dot(buf.reshape(nset*nao,ngrids), ao[0], 1, vmat, 1)
+
+    if xctype == 'MGGA':
+        wv[:,4] *= .5  # *.5 for 1/2 in tau
+        v1 = v1.reshape(nset*nao,nao)
+        for x in range(1, 4):
+            for i in range(nset):
+                _scale_ao(ao[x], wv[i,4], out=buf[i])
+            lib.dot(buf.reshape(nset*nao,ngrids), ao[x], 1, v1, 1)
+    return buf
+
 def nr_rks_fxc(ni, mol, grids, xc_code, dm0, dms, relativity=0, hermi=0,
                rho0=None, vxc=None, fxc=None, max_memory=2000, verbose=None):
     '''Contract RKS XC (singlet hessian) kernel matrix with given density matrices
@@ -1470,57 +1667,70 @@ def nr_rks_fxc(ni, mol, grids, xc_code, dm0, dms, relativity=0, hermi=0,
                                   max_memory=max_memory)[2]
 
     make_rho1, nset, nao = ni._gen_rho_evaluator(mol, dms, hermi, False, grids)
-
-    def block_loop(ao_deriv):
-        p1 = 0
-        for ao, mask, weight, coords \
-                in ni.block_loop(mol, grids, nao, ao_deriv, max_memory=max_memory):
-            p0, p1 = p1, p1 + weight.size
-            _fxc = fxc[:,:,p0:p1]
-            for i in range(nset):
-                rho1 = make_rho1(i, ao, mask, xctype)
-                if xctype == 'LDA':
-                    wv = weight * rho1 * _fxc[0]
-                else:
-                    wv = numpy.einsum('yg,xyg,g->xg', rho1, _fxc, weight)
-                yield i, ao, mask, wv
+    vmat = numpy.zeros((nset,nao,nao))
+    if xctype not in ('LDA', 'GGA', 'MGGA'):
+        if isinstance(dms, numpy.ndarray) and dms.ndim == 2:
+            vmat = vmat[0]
+        return numpy.asarray(vmat, dtype=dtype)
+
+    ao_deriv = 0 if xctype == 'LDA' else 1
+    assert xctype != 'MGGA' or not MGGA_DENSITY_LAPL
+    # The densities and potentials of all trial density matrices are computed
+    # together with batched GEMMs on the grids where the AO values are dense.
+    fused = ni.fxc_fused and nset > 1 and dtype == numpy.double
+    blksize = None
+    if fused:
+        dm1 = numpy.asarray(dms, dtype=numpy.double).reshape(nset,nao,nao)
+        if hermi != 1:
+            dm1 = lib.hermi_sum(numpy.asarray(dm1, order='C'), axes=(0,2,1)) * .5
+        if grids.coords is None:
+            grids.build(with_non0tab=True)
+        comp = (ao_deriv+1)*(ao_deriv+2)*(ao_deriv+3)//6
+        blksize = int(max_memory*1e6/((comp+1+nset)*nao*8*BLKSIZE))
+        blksize = max(4, min(blksize, grids.weights.size//BLKSIZE+1, 1200)) * BLKSIZE
+        buf = None
 
     ao_loc = mol.ao_loc_nr()
     cutoff = grids.cutoff * 1e2
     nbins = NBINS * 2 - int(NBINS * numpy.log(cutoff) / numpy.log(grids.cutoff))
     pair_mask = mol.get_overlap_cond() < -numpy.log(ni.cutoff)
-    vmat = numpy.zeros((nset,nao,nao))
+    v1 = numpy.zeros_like(vmat) if xctype == 'MGGA' else None
     aow = None
-    if xctype == 'LDA':
-        ao_deriv = 0
-        for i, ao, mask, wv in block_loop(ao_deriv):
-            _dot_ao_ao_sparse(ao, ao, wv[0], nbins, mask, pair_mask, ao_loc,
-                              hermi, vmat[i])
-
-    elif xctype == 'GGA':
-        ao_deriv = 1
-        for i, ao, mask, wv in block_loop(ao_deriv):
+    p1 = 0
+    for ao, mask, weight, coords \
+            in ni.block_loop(mol, grids, nao, ao_deriv, max_memory=max_memory,
+                             blksize=blksize):
+        p0, p1 = p1, p1 + weight.size
+        _fxc = fxc[:,:,p0:p1]
+        if fused and ao.dtype == numpy.double and (
+                mask is None or
+                not _sparse_enough(mask[:(weight.size+BLKSIZE-1)//BLKSIZE])):
+            buf = _fxc_fused_block(ao, dm1, _fxc, weight, xctype, vmat, v1, buf)
+            continue
+
+        for i in range(nset):
+            rho1 = make_rho1(i, ao, mask, xctype)
+            if xctype == 'LDA':
+                wv = weight * rho1 * _fxc[0]
+                _dot_ao_ao_sparse(ao, ao, wv[0], nbins, mask, pair_mask, ao_loc,
+                                  hermi, vmat[i])
+                continue
+
+            wv = numpy.einsum('yg,xyg,g->xg', rho1, _fxc, weight)
             wv[0] *= .5  # *.5 for v+v.conj().T
-            aow = _scale_ao_sparse(ao, wv, mask, ao_loc, out=aow)
+            aow = _scale_ao_sparse(ao[:4], wv[:4], mask, ao_loc, out=aow)
             _dot_ao_ao_sparse(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
                               hermi=0, out=vmat[i])
+            if xctype == 'MGGA':
+                wv[4] *= .5  # *.5 for 1/2 in tau
+                _tau_dot_sparse(ao, ao, wv[4], nbins, mask, pair_mask, ao_loc,
+                                out=v1[i])
 
+    if xctype != 'LDA':
         # For real orbitals, K_{ia,bj} = K_{ia,jb}. It simplifies real fxc_jb
         # [(\nabla mu) nu + mu (\nabla nu)] * fxc_jb = ((\nabla mu) nu f_jb) + h.c.
         vmat = lib.hermi_sum(vmat, axes=(0,2,1))
-
-    elif xctype == 'MGGA':
-        assert not MGGA_DENSITY_LAPL
-        ao_deriv = 2 if MGGA_DENSITY_LAPL else 1
-        v1 = numpy.zeros_like(vmat)
-        for i, ao, mask, wv in block_loop(ao_deriv):
-            wv[0] *= .5  # *.5 for v+v.conj().T
-            wv[4] *= .5  # *.5 for 1/2 in tau
-            aow = _scale_ao_sparse(ao, wv[:4], mask, ao_loc, out=aow)
-            _dot_ao_ao_sparse(ao[0], aow, None, nbins, mask, pair_mask, ao_loc,
-                              hermi=0, out=vmat[i])
-            _tau_dot_sparse(ao, ao, wv[4], nbins, mask, pair_mask, ao_loc, out=v1[i])
-        vmat = lib.hermi_sum(vmat, axes=(0,2,1))
+    if xctype == 'MGGA':
         vmat += v1
 
     if isinstance(dms, numpy.ndarray) and dms.ndim == 2:
@@ -2508,6 +2718,66 @@ def _uks_mgga_wv2(rho0, rho1, fxc, kxc, weight):
 
     return wva, wvb
 
+class _AOCache:
+    '''LRU cache for the AO values of grid blocks. AO functions which are
+    screened out by non0tab on the entire block are not stored.
+    '''
+    def __init__(self, max_memory=AO_CACHE_SIZE, dtype=AO_CACHE_DTYPE):
+        self.max_memory = max_memory
+        self.dtype = numpy.dtype(dtype)
+        self.nbytes = 0
+        self._data = collections.OrderedDict()
+        self._signature = None
+
+    def clear(self):
+        self.nbytes = 0
+        self._data.clear()
+        self._signature = None
+        return self
+
+    def check(self, mol, grids, non0tab):
+        '''Drop all cached blocks if geometry, basis or grids were changed'''
+        sig = self._signature
+        if (sig is None or sig[0] != mol.cart or
+            sig[4] is not grids.coords or sig[5] is not non0tab or
+            not numpy.array_equal(sig[1], mol._atm) or
+            not numpy.array_equal(sig[2], mol._bas) or
+            not numpy.array_equal(sig[3], mol._env)):
+            self.clear()
+            self._signature = (mol.cart, mol._atm.copy(), mol._bas.copy(),
+                               mol._env.copy(), grids.coords, non0tab)
+        return self
+
+    def get(self, key, out):
+        '''Restore the cached AO values of a grid block in out. out is a
+        (comp,nao,ngrids) array.'''
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        self._data.move_to_end(key)
+        ao_idx, ao = entry
+        if ao_idx is None:
+            out[:] = ao
+        else:
+            out[:] = 0
+            out[:,ao_idx] = ao
+        return out
+
+    def put(self, key, ao, ao_idx=None):
+        '''Store the (comp,nao,ngrids) AO values of a grid block. ao_idx are
+        the indices of AOs which are not screened out.'''
+        if ao_idx is None:
+            ao = numpy.array(ao, dtype=self.dtype, order='C')
+        else:
+            ao = numpy.asarray(ao[:,ao_idx], dtype=self.dtype, order='C')
+        if ao.nbytes > self.max_memory * 1e6:
+            return self
+        self._data[key] = (ao_idx, ao)
+        self.nbytes += ao.nbytes
+        while self.nbytes > self.max_memory * 1e6:
+            self.nbytes -= self._data.popitem(last=False)[1][1].nbytes
+        return self
+
 def _empty_aligned(shape, alignment=8):
     if alignment <= 1:
         return numpy.empty(shape)
@@ -2613,14 +2883,20 @@ def cache_xc_kernel1(ni, mol, grids, xc_code, dm, spin=0, max_memory=2000):
 def get_rho(ni, mol, dm, grids, max_memory=2000):
     '''Density in real space
     '''
-    make_rho, nset, nao = ni._gen_rho_evaluator(mol, dm, 1, False, grids)
-    assert nset == 1
+    dm = numpy.asarray(dm)
+    nao = dm.shape[-1]
+    dm = dm.reshape(-1,nao,nao)
+    assert len(dm) == 1
+    dm = dm[0]
+    if grids.coords is None:
+        grids.build(with_non0tab=True)
     rho = numpy.empty(grids.weights.size)
     p1 = 0
     for ao, mask, weight, coords \
-            in ni.block_loop(mol, grids, nao, 0, max_memory=max_memory):
+            in ni.block_loop(mol, grids, nao, 0, max_memory=max_memory,
+                             sparse_ao=True):
         p0, p1 = p1, p1 + weight.size
-        rho[p0:p1] = make_rho(0, ao, mask, 'LDA')
+        rho[p0:p1] = eval_rho(mol, ao, dm, xctype='LDA', hermi=1)
     return rho
 
 
@@ -2744,9 +3020,32 @@ class NumInt(lib.StreamObject, LibXCMixin):
             The Coulomb attenuation parameter for range-separated functionals.
             If specified, this value will replace the default setting in libxc
             when evaluating the libxc RSH functional.
+        ao_cache_size : float
+            Memory (in MB) to keep the AO values of block_loop. The cached
+            AO values are reused in the following SCF iterations, response
+            and gradients calculations as long as the geometry and grids
+            are not changed. 0 to disable the cache. Default is 0.
+        ao_cache_dtype :
+            Data type to store the cached AO values. numpy.float32 halves
+            the memory footprint at the cost of single precision AO values.
+        mixed_precision : bool
+            Whether to contract the AO pairs in nr_rks and nr_uks with single
+            precision GEMM. Densities, functionals and the accumulation of
+            the XC matrix are kept in double precision. The error of the XC
+            matrix is around 1e-6. Default is False.
+        fxc_fused : bool
+            Whether nr_rks_fxc integrates multiple trial density matrices
+            together with batched GEMMs on the dense grid blocks. The wider
+            GEMMs are meant for threaded BLAS. With single-threaded BLAS the
+            fused integration is slightly slower. Default is False.
     '''
 
     cutoff = CUTOFF * 1e2  # cutoff for small AO product
+    ao_cache_size = AO_CACHE_SIZE
+    ao_cache_dtype = AO_CACHE_DTYPE
+    _ao_cache = None
+    mixed_precision = MIXED_PRECISION
+    fxc_fused = FXC_FUSED
 
     @lib.with_doc(nr_vxc.__doc__)
     def nr_vxc(self, mol, grids, xc_code, dms, spin=0, relativity=0, hermi=0,
@@ -2788,8 +3087,12 @@ class NumInt(lib.StreamObject, LibXCMixin):
     get_rho = get_rho
 
     def block_loop(self, mol, grids, nao=None, deriv=0, max_memory=2000,
-                   non0tab=None, blksize=None, buf=None):
+                   non0tab=None, blksize=None, buf=None, sparse_ao=False):
         '''Define this macro to loop over grids by blocks.
+
+        If sparse_ao is set, the AO values of each block are generated as
+        :class:`SparseAO` objects which hold the screening information
+        themselves. The mask in the output is None in this case.
         '''
         if grids.coords is None:
             grids.build(with_non0tab=True)
@@ -2806,6 +3109,7 @@ class NumInt(lib.StreamObject, LibXCMixin):
 
         if non0tab is None and mol is grids.mol:
             non0tab = grids.non0tab
+        ao_cache = self._get_ao_cache(mol, grids, non0tab)
         if non0tab is None:
             non0tab = numpy.empty(((ngrids+BLKSIZE-1)//BLKSIZE,mol.nbas),
                                   dtype=numpy.uint8)
@@ -2821,15 +3125,63 @@ class NumInt(lib.StreamObject, LibXCMixin):
             coords = grids.coords[ip0:ip1]
             weight = grids.weights[ip0:ip1]
             mask = screen_index[ip0//BLKSIZE:]
-            # TODO: pass grids.cutoff to eval_ao
-            ao = self.eval_ao(mol, coords, deriv=deriv, non0tab=mask,
-                              cutoff=grids.cutoff, out=buf)
+            if sparse_ao:
+                ao = self.eval_ao(mol, coords, deriv=deriv, non0tab=mask,
+                                  cutoff=grids.cutoff, out=buf, sparse=True)
+                yield ao, None, weight, coords
+                continue
+            if ao_cache is None:
+                # TODO: pass grids.cutoff to eval_ao
+                ao = self.eval_ao(mol, coords, deriv=deriv, non0tab=mask,
+                                  cutoff=grids.cutoff, out=buf)
+            else:
+                ao = self._eval_ao_cached(ao_cache, mol, coords, deriv,
+                                          mask, grids.cutoff, buf, (ip0, ip1))
             if not allow_sparse and not _sparse_enough(mask):
                 # Unset mask for dense AO tensor. It determines which eval_rho
                 # to be called in make_rho
                 mask = None
             yield ao, mask, weight, coords
 
+    def _get_ao_cache(self, mol, grids, non0tab):
+        '''The AO cache associated to (mol, grids). None if cache is disabled'''
+        if not self.ao_cache_size or self.ao_cache_size <= 0:
+            self._ao_cache = None
+            return None
+        ao_cache = self._ao_cache
+        if ao_cache is None:
+            ao_cache = self._ao_cache = _AOCache()
+        ao_cache.max_memory = self.ao_cache_size
+        if ao_cache.dtype != self.ao_cache_dtype:
+            ao_cache.clear()
+            ao_cache.dtype = numpy.dtype(self.ao_cache_dtype)
+        return ao_cache.check(mol, grids, non0tab)
+
+    def _eval_ao_cached(self, ao_cache, mol, coords, deriv, non0tab, cutoff,
+                        buf, key):
+        comp = (deriv+1)*(deriv+2)*(deriv+3)//6
+        nao = mol.nao
+        ngrids = coords.shape[0]
+        key = (deriv,) + key
+        out = numpy.ndarray((comp,nao,ngrids), buffer=buf)
+        if ao_cache.get(key, out) is None:
+            ao = self.eval_ao(mol, coords, deriv=deriv, non0tab=non0tab,
+                              cutoff=cutoff, out=buf)
+            if ao.dtype != numpy.double:
+                return ao
+            # AOs are zero on the entire block if their shells are screened
+            nblk = (ngrids+BLKSIZE-1) // BLKSIZE
+            shl_mask = non0tab[:nblk].any(axis=0)
+            if shl_mask.all():
+                ao_idx = None
+            else:
+                ao_loc = mol.ao_loc
+                ao_idx = numpy.where(numpy.repeat(shl_mask, ao_loc[1:]-ao_loc[:-1]))[0]
+            ao_cache.put(key, out, ao_idx)
+        if deriv == 0:
+            return out[0].T
+        return out.transpose(0,2,1)
+
     def _gen_rho_evaluator(self, mol, dms, hermi=0, with_lapl=True, grids=None):
         if getattr(dms, 'mo_coeff', None) is not None:
             #TODO: test whether dm.mo_coeff matching dm
@@ -717,7 +717,13 @@ class NumInt2C(lib.StreamObject, numint.LibXCMixin):
     eval_xc_eff = _eval_xc_eff
     mcfun_eval_xc_adapter = mcfun_eval_xc_adapter
 
+    ao_cache_size = numint.AO_CACHE_SIZE
+    ao_cache_dtype = numint.AO_CACHE_DTYPE
+    _ao_cache = None
+
     block_loop = numint.NumInt.block_loop
+    _get_ao_cache = numint.NumInt._get_ao_cache
+    _eval_ao_cached = numint.NumInt._eval_ao_cached
     _gen_rho_evaluator = numint.NumInt._gen_rho_evaluator
 
     def _to_numint1c(self):
@@ -77,7 +77,8 @@ def get_veff(ks, mol=None, dm=None, dm_last=0, vhf_last=0, hermi=1):
         n, exc, vxc = 0, 0, 0
     else:
         max_memory = ks.max_memory - lib.current_memory()[0]
-        n, exc, vxc = ni.nr_rks(mol, ks.grids, ks.xc, dm, max_memory=max_memory)
+        with lib.temporary_env(ni, mixed_precision=_mixed_precision_xc(ks, dm, dm_last)):
+            n, exc, vxc = ni.nr_rks(mol, ks.grids, ks.xc, dm, max_memory=max_memory)
         logger.debug(ks, 'nelec by numeric integration = %s', n)
         if ks.do_nlc():
             if ni.libxc.is_nlc(ks.xc):
@@ -267,6 +268,20 @@ def define_xc_(ks, description, xctype='LDA', hyb=0, rsh=(0,0,0)):
 def _dft_common_init_(mf, xc='LDA,VWN'):
     raise DeprecationWarning
 
+def _mixed_precision_xc(ks, dm, dm_last=0):
+    '''Whether to integrate the XC potential in mixed precision. When
+    ks.mixed_precision_tol is set, mixed precision is used in the SCF
+    iterations until the change of density matrix drops below the threshold.
+    '''
+    mixed = getattr(ks._numint, 'mixed_precision', False)
+    tol = getattr(ks, 'mixed_precision_tol', None)
+    if mixed or not tol or not isinstance(dm_last, numpy.ndarray):
+        return mixed
+    mixed = abs(numpy.asarray(dm) - dm_last).max() > tol
+    if mixed:
+        logger.debug(ks, 'XC potential in mixed precision')
+    return mixed
+
 class KohnShamDFT:
     '''
     Attributes for Kohn-Sham DFT:
@@ -314,6 +329,16 @@ class KohnShamDFT:
         small_rho_cutoff : float
             Drop grids if their contribution to total electrons smaller than
             this cutoff value.  Default is 1e-7.
+        grids_adaptive_tol : float
+            If set, the grid level of each element is lowered as long as the
+            atomic populations of the initial guess change less than this
+            value (see gen_grid.adaptive_atom_grid). The adapted settings are
+            stored in grids.adapted_atom_grid until the grids are reset.
+            Default is None.
+        mixed_precision_tol : float
+            If set, the XC potential is integrated in mixed precision (see
+            NumInt.mixed_precision) during SCF iterations until the change
+            of density matrix is smaller than this value. Default is None.
 
     Examples:
 
@@ -324,10 +349,13 @@ class KohnShamDFT:
     -76.415443079840458
     '''
 
-    _keys = {'xc', 'nlc', 'grids', 'disp', 'nlcgrids', 'small_rho_cutoff'}
+    _keys = {'xc', 'nlc', 'grids', 'disp', 'nlcgrids', 'small_rho_cutoff',
+             'mixed_precision_tol', 'grids_adaptive_tol'}
 
     # Use rho to filter grids
     small_rho_cutoff = getattr(__config__, 'dft_rks_RKS_small_rho_cutoff', 1e-7)
+    mixed_precision_tol = getattr(__config__, 'dft_rks_RKS_mixed_precision_tol', None)
+    grids_adaptive_tol = getattr(__config__, 'dft_rks_RKS_grids_adaptive_tol', None)
 
     def __init__(self, xc='LDA,VWN'):
         # By default, self.nlc = '' and self.disp = None
@@ -374,6 +402,8 @@ class KohnShamDFT:
             self.nlcgrids.dump_flags(verbose)
 
         log.info('small_rho_cutoff = %g', self.small_rho_cutoff)
+        if self.mixed_precision_tol:
+            log.info('mixed_precision_tol = %g', self.mixed_precision_tol)
         return self
 
     define_xc_ = define_xc_
@@ -500,6 +530,14 @@ class KohnShamDFT:
         ground_state = getattr(dm, 'ndim', 0) == 2
         if self.grids.coords is None:
             t0 = (logger.process_clock(), logger.perf_counter())
+            if self.grids_adaptive_tol and ground_state:
+                ni = self._numint
+                def rho_evaluator(grids):
+                    return ni.get_rho(mol, dm, grids, self.max_memory)
+                self.grids.adapted_atom_grid = gen_grid.adaptive_atom_grid(
+                    self.grids, rho_evaluator, self.grids_adaptive_tol)
+                logger.debug(self, 'Adapted grids %s',
+                             self.grids.adapted_atom_grid)
             self.grids.build(with_non0tab=True)
             if self.small_rho_cutoff > 1e-20 and ground_state:
                 # Filter grids the first time setup grids
@@ -178,6 +178,48 @@ class KnownValues(unittest.TestCase):
         idx = gen_grid.arg_group_grids(mol, coords)
         self.assertTrue(abs(ref - idx).max() == 0)
 
+    def test_stratmann_partition(self):
+        mol = gto.M(atom='''
+            O   0.   0.   0.
+            H   0.  -0.757 0.587
+            H   0.   0.757 0.587
+            O   2.9  0.   0.
+            H   3.86 0.   0.
+            H   2.66 0.93 0.
+            He  8.   0.   0.''', basis='sto3g', verbose=0)
+        g = gen_grid.Grids(mol)
+        g.level = 1
+        atom_grids_tab = g.gen_atomic_grids(mol, level=1)
+        for radii_adjust in (radi.treutler_atomic_radii_adjust,
+                             radi.becke_atomic_radii_adjust, None):
+            coords, weights = gen_grid.get_partition(
+                mol, atom_grids_tab, radii_adjust, radi.BRAGG_RADII,
+                gen_grid.stratmann)
+            # Python implementation of the same partition
+            f_adjust = radii_adjust and (lambda mol, r: radii_adjust(mol, r))
+            ref = gen_grid.get_partition(
+                mol, atom_grids_tab, f_adjust, radi.BRAGG_RADII,
+                lambda g: gen_grid.stratmann(g))[1]
+            self.assertAlmostEqual(abs(weights - ref).max(), 0, 12)
+
+    def test_grids_cache(self):
+        g = gen_grid.Grids(h2o).build()
+        coords, weights = g.coords, g.weights
+        g.reset(h2o).build()
+        self.assertTrue(g.weights is weights)
+
+        mol1 = h2o.set_geom_('O 0 0 .1; H 0 -.757 .587; H 0 .757 .587',
+                             inplace=False)
+        g.reset(mol1).build()
+        self.assertTrue(g.weights is not weights)
+        ref = gen_grid.Grids(mol1).set(cache_size=0).build()
+        self.assertAlmostEqual(abs(g.coords - ref.coords).max(), 0, 14)
+        self.assertAlmostEqual(abs(g.weights - ref.weights).max(), 0, 14)
+
+        g.level = 1
+        g.build()
+        self.assertTrue(g.weights.size < ref.weights.size)
+
 class TreutlerAhlrichsGrids(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -208,6 +250,45 @@ class TreutlerAhlrichsGrids(unittest.TestCase):
         self.assertAlmostEqual(lib.fp(grid.coords), -64.2641450749045, 9)
         self.assertAlmostEqual(lib.fp(grid.weights), -26.8795084011127, 9)
 
+    def test_ao_weight_cutoff(self):
+        grid = gen_grid.Grids(h2o)
+        grid.build(with_non0tab=False)
+        ao = h2o.eval_gto('GTOval', grid.coords)
+        s_ref = numpy.einsum('g,gi,gj->ij', grid.weights, ao, ao)
+        ngrids = grid.size
+        grid.ao_weight_cutoff = 1e-12
+        self.assertTrue(grid.coords is None)
+        grid.build(with_non0tab=False)
+        self.assertTrue(grid.size < ngrids)
+        ao = h2o.eval_gto('GTOval', grid.coords)
+        s = numpy.einsum('g,gi,gj->ij', grid.weights, ao, ao)
+        self.assertAlmostEqual(abs(s - s_ref).max(), 0, 9)
+
+    def test_adaptive_atom_grid(self):
+        mf = dft.RKS(h2o)
+        dm = mf.get_init_guess()
+        ni = mf._numint
+        grid = gen_grid.Grids(h2o)
+        grid.atom_grid = {'O': (50, 194)}
+        atom_grid = gen_grid.adaptive_atom_grid(
+            grid, lambda g: ni.get_rho(h2o, dm, g), tol=1e-4)
+        self.assertEqual(list(atom_grid.keys()), ['H'])
+        self.assertTrue(atom_grid['H'][0] < gen_grid._default_rad(1, grid.level))
+
+        mf.grids_adaptive_tol = 1e-5
+        mf.xc = 'b3lyp'
+        e = mf.kernel()
+        self.assertTrue('H' in mf.grids.adapted_atom_grid)
+        self.assertEqual(mf.grids.atom_grid, {})
+        self.assertAlmostEqual(e, dft.RKS(h2o, xc='b3lyp').kernel(), 5)
+
+        # The adapted levels are dropped for a new geometry
+        mol1 = h2o.set_geom_(h2o.atom_coords() * 1.02, unit='Bohr', inplace=False)
+        mf.reset(mol1)
+        self.assertTrue(mf.grids.adapted_atom_grid is None)
+        self.assertAlmostEqual(mf.kernel(), dft.RKS(mol1, xc='b3lyp').kernel(), 5)
+        self.assertTrue('H' in mf.grids.adapted_atom_grid)
+
 
 if __name__ == "__main__":
     print("Test Grids")
@@ -100,6 +100,22 @@ class KnownValues(unittest.TestCase):
         method.xc = 'lda, vwn_rpa'
         self.assertAlmostEqual(method.scf(), -76.01330948329084, 8)
 
+    def test_nr_b3lypg_mixed_precision(self):
+        method = dft.RKS(h2o)
+        method.grids.prune = dft.gen_grid.treutler_prune
+        method.grids.atom_grid = {"H": (50, 194), "O": (50, 194),}
+        method.xc = 'b3lypg'
+        method.mixed_precision_tol = 1e-4
+        self.assertAlmostEqual(method.scf(), -76.384928891413438, 8)
+
+        method = dft.UKS(h2o_cation)
+        method.grids.prune = dft.gen_grid.treutler_prune
+        method.grids.atom_grid = {"H": (50, 194), "O": (50, 194),}
+        method.xc = 'b3lypg'
+        e_ref = method.scf()
+        method.mixed_precision_tol = 1e-4
+        self.assertAlmostEqual(method.scf(), e_ref, 8)
+
     def test_nr_b88vwn(self):
         method = dft.RKS(h2o)
         method.grids.prune = dft.gen_grid.treutler_prune
@@ -273,6 +273,40 @@ class KnownValues(unittest.TestCase):
         mat2 = dft.numint.eval_mat(mol, ao, weight, [rho]*2, vxc_1, xctype='MGGA', spin=1)
         self.assertAlmostEqual(abs(mat0 - mat2).max(), 0, 9)
 
+    def test_sparse_ao(self):
+        numpy.random.seed(10)
+        ni = numint.NumInt()
+        dm = numpy.random.random((nao,nao))
+        dm = dm + dm.T
+        for ao_sp, _, weight, coords in ni.block_loop(mol, mf.grids, deriv=1,
+                                                      sparse_ao=True):
+            ao = numint.eval_ao(mol, coords, deriv=1,
+                                non0tab=numint.make_mask(mol, coords))
+            self.assertTrue(isinstance(ao_sp, numint.SparseAO))
+            self.assertAlmostEqual(abs(ao_sp.todense() - ao).max(), 0, 12)
+
+            rho = numint.eval_rho(mol, ao, dm, xctype='GGA', hermi=1)
+            rho1 = numint.eval_rho(mol, ao_sp, dm, xctype='GGA', hermi=1)
+            self.assertAlmostEqual(abs(rho - rho1).max(), 0, 9)
+
+            vxc = numpy.random.random((2,weight.size))
+            mat0 = numint.eval_mat(mol, ao, weight, rho, vxc, xctype='GGA')
+            mat1 = numint.eval_mat(mol, ao_sp, weight, rho, vxc, xctype='GGA')
+            self.assertAlmostEqual(abs(mat0 - mat1).max(), 0, 9)
+
+            ao_loc = mol.ao_loc_nr()
+            mat0 = numint._tau_dot(mol, ao, ao, weight, None, (0, mol.nbas), ao_loc)
+            mat1 = numint._tau_dot(mol, ao_sp, ao_sp, weight, None, None, None)
+            self.assertAlmostEqual(abs(mat0 - mat1).max(), 0, 9)
+            if ao_sp.data.shape[-1] < nao:
+                break
+
+        rho = ni.get_rho(mol, dm, mf.grids)
+        ref = numpy.hstack([numint.eval_rho(mol, ao, dm, xctype='LDA', hermi=1)
+                            for ao, mask, weight, coords
+                            in ni.block_loop(mol, mf.grids, deriv=0)])
+        self.assertAlmostEqual(abs(rho - ref).max(), 0, 9)
+
     def test_rks_vxc(self):
         numpy.random.seed(10)
         nao = mol.nao_nr()
@@ -365,6 +399,22 @@ class KnownValues(unittest.TestCase):
                                rho0=rvf[0], vxc=rvf[1], fxc=rvf[2])
         self.assertAlmostEqual(abs(v-v1).max(), 0, 8)
 
+    def test_rks_fxc_fused(self):
+        numpy.random.seed(10)
+        nao = mol1.nao_nr()
+        dm0 = dft.RKS(mol1).get_init_guess()
+        dms = numpy.random.random((3,nao,nao))
+        ni = dft.numint.NumInt()
+        grids = dft.Grids(mol1)
+        for xc in ('LDA,', 'B88,', 'm06l,'):
+            fxc = ni.cache_xc_kernel1(mol1, grids, xc, dm0, spin=0)[2]
+            with lib.temporary_env(numint, _sparse_enough=_not_sparse), \
+                    lib.temporary_env(ni, fxc_fused=True):
+                v = ni.nr_rks_fxc(mol1, grids, xc, dm0, dms, hermi=0, fxc=fxc)
+            ref = [ni.nr_rks_fxc(mol1, grids, xc, dm0, dm, hermi=0, fxc=fxc)
+                   for dm in dms]
+            self.assertAlmostEqual(abs(v-numpy.array(ref)).max(), 0, 9)
+
     def test_rks_fxc_st(self):
         numpy.random.seed(10)
         nao = mol1.nao_nr()
@@ -592,6 +642,51 @@ class KnownValues(unittest.TestCase):
 
             self.assertAlmostEqual(abs(fxc1*rho1[0] - fxc2*rho2[0]).max(), 0, 4)
 
+    def test_ao_cache(self):
+        ni = numint.NumInt()
+        ref = [ao.copy() for ao, mask, weight, coords
+               in ni.block_loop(mol, mf.grids, nao, 1, blksize=numint.BLKSIZE*4)]
+        ni.ao_cache_size = 1000
+        for i in range(2):
+            aos = [ao.copy() for ao, mask, weight, coords
+                   in ni.block_loop(mol, mf.grids, nao, 1, blksize=numint.BLKSIZE*4)]
+            self.assertAlmostEqual(max(abs(a-b).max() for a, b in zip(ref, aos)), 0, 14)
+        # Screened AOs are not stored
+        self.assertTrue(ni._ao_cache.nbytes < sum(ao.nbytes for ao in ref))
+
+        dm = mf.get_init_guess()
+        ni.ao_cache_size = 0
+        ref = ni.nr_rks(mol, mf.grids, 'pbe', dm)[2]
+        ni.ao_cache_size = 1000
+        ni.nr_rks(mol, mf.grids, 'pbe', dm)
+        v = ni.nr_rks(mol, mf.grids, 'pbe', dm)[2]
+        self.assertAlmostEqual(abs(v - ref).max(), 0, 12)
+
+        ni.ao_cache_dtype = numpy.float32
+        ni.nr_rks(mol, mf.grids, 'pbe', dm)
+        v = ni.nr_rks(mol, mf.grids, 'pbe', dm)[2]
+        self.assertAlmostEqual(abs(v - ref).max(), 0, 5)
+
+        # Cache is dropped when geometry is changed
+        mol2 = mol.set_geom_(mol.atom_coords()+.01, unit='Bohr', inplace=False)
+        ni.ao_cache_dtype = numpy.double
+        ref = numint.NumInt().nr_rks(mol2, mf.grids, 'pbe', dm)[2]
+        v = ni.nr_rks(mol2, mf.grids, 'pbe', dm)[2]
+        self.assertAlmostEqual(abs(v - ref).max(), 0, 12)
+
+    def test_mixed_precision(self):
+        ni = numint.NumInt()
+        dm = mf.get_init_guess()
+        for xc in ('lda,', 'pbe', 'tpss'):
+            ref = ni.nr_rks(mol, mf.grids, xc, dm)
+            ref_u = ni.nr_uks(mol, mf.grids, xc, (dm*.6, dm*.4))
+            with lib.temporary_env(ni, mixed_precision=True):
+                v = ni.nr_rks(mol, mf.grids, xc, dm)
+                v_u = ni.nr_uks(mol, mf.grids, xc, (dm*.6, dm*.4))
+            self.assertAlmostEqual(v[1], ref[1], 12)
+            self.assertAlmostEqual(abs(v[2] - ref[2]).max(), 0, 5)
+            self.assertAlmostEqual(abs(v_u[2] - ref_u[2]).max(), 0, 5)
+
 if __name__ == "__main__":
     print("Test numint")
     unittest.main()
@@ -146,36 +146,68 @@ def get_ovlp(mol):
     return -mol.intor('int1e_ipovlp', comp=3)
 
 
-def get_jk(mol, dm):
-    '''J = ((-nabla i) j| kl) D_lk
-    K = ((-nabla i) j| kl) D_jk
+def make_jk_opt(mol, q_cond=None):
+    '''Screening optimizer for the ((nabla i) j|kl) integrals.
+
+    Kwargs:
+        q_cond : 2D array
+            Schwarz bounds of the regular ERIs (ij|kl). It can be taken from
+            the direct SCF optimizer of the same molecule (mf._opt[None]) to
+            avoid the recomputation.
     '''
     libcvhf = _vhf.libcvhf
     vhfopt = _vhf._VHFOpt(mol, 'int2e_ip1', 'CVHFgrad_jk_prescreen',
                           dmcondname='CVHFnr_dm_cond1')
     ao_loc = mol.ao_loc_nr()
     nbas = mol.nbas
-    q_cond = numpy.empty((2, nbas, nbas))
+    q_cond_ip = numpy.empty((2, nbas, nbas))
     with mol.with_integral_screen(vhfopt.direct_scf_tol**2):
         libcvhf.CVHFnr_int2e_pp_q_cond(
             getattr(libcvhf, mol._add_suffix('int2e_ip1ip2')),
-            lib.c_null_ptr(), q_cond[0].ctypes,
-            ao_loc.ctypes, mol._atm.ctypes, ctypes.c_int(mol.natm),
-            mol._bas.ctypes, ctypes.c_int(nbas), mol._env.ctypes)
-        libcvhf.CVHFnr_int2e_q_cond(
-            getattr(libcvhf, mol._add_suffix('int2e')),
-            lib.c_null_ptr(), q_cond[1].ctypes,
+            lib.c_null_ptr(), q_cond_ip[0].ctypes,
             ao_loc.ctypes, mol._atm.ctypes, ctypes.c_int(mol.natm),
             mol._bas.ctypes, ctypes.c_int(nbas), mol._env.ctypes)
-    vhfopt.q_cond = q_cond
+        if q_cond is None:
+            libcvhf.CVHFnr_int2e_q_cond(
+                getattr(libcvhf, mol._add_suffix('int2e')),
+                lib.c_null_ptr(), q_cond_ip[1].ctypes,
+                ao_loc.ctypes, mol._atm.ctypes, ctypes.c_int(mol.natm),
+                mol._bas.ctypes, ctypes.c_int(nbas), mol._env.ctypes)
+        else:
+            q_cond_ip[1] = q_cond
+    vhfopt.q_cond = q_cond_ip
+    return vhfopt
+
+def get_jk(mol, dm, vhfopt=None, with_j=True, with_k=True):
+    '''J = ((-nabla i) j| kl) D_lk
+    K = ((-nabla i) j| kl) D_jk
+
+    dm can be a list of density matrices. J and K of all density matrices are
+    computed in one pass over the integrals.
 
+    Kwargs:
+        vhfopt : _VHFOpt
+            Screening optimizer created by :func:`make_jk_opt`. It can be
+            reused for the same molecule.
+    '''
+    if vhfopt is None:
+        vhfopt = make_jk_opt(mol)
+    scripts = []
+    if with_j:
+        scripts.append('lk->s1ij')
+    if with_k:
+        scripts.append('jk->s1il')
     intor = mol._add_suffix('int2e_ip1')
-    vj, vk = _vhf.direct_mapdm(intor,  # (nabla i,j|k,l)
-                               's2kl', # ip1_sph has k>=l,
-                               ('lk->s1ij', 'jk->s1il'),
-                               dm, 3, # xyz, 3 components
-                               mol._atm, mol._bas, mol._env, vhfopt=vhfopt)
-    return -vj, -vk
+    vjk = _vhf.direct_mapdm(intor,  # (nabla i,j|k,l)
+                            's2kl', # ip1_sph has k>=l,
+                            scripts, dm, 3, # xyz, 3 components
+                            mol._atm, mol._bas, mol._env, vhfopt=vhfopt)
+    vj = vk = None
+    if with_j:
+        vj = -vjk.pop(0)
+    if with_k:
+        vk = -vjk.pop(0)
+    return vj, vk
 
 def get_veff(mf_grad, mol, dm):
     '''NR Hartree-Fock Coulomb repulsion'''
@@ -279,6 +311,10 @@ class GradientsBase(lib.StreamObject):
 
         self.atmlst = None
         self.de = None
+        self._jk_opt = None
+
+    __getstate__, __setstate__ = lib.generate_pickle_methods(
+            excludes=('_jk_opt',))
 
     def dump_flags(self, verbose=None):
         log = logger.new_logger(self, verbose)
@@ -300,6 +336,7 @@ class GradientsBase(lib.StreamObject):
         if mol is not None:
             self.mol = mol
         self.base.reset(mol)
+        self._jk_opt = None
         return self
 
     def get_hcore(self, mol=None):
@@ -312,40 +349,43 @@ class GradientsBase(lib.StreamObject):
         if mol is None: mol = self.mol
         return get_ovlp(mol)
 
-    @lib.with_doc(get_jk.__doc__)
-    def get_jk(self, mol=None, dm=None, hermi=0, omega=None):
+    def _get_jk_opt(self, mol):
+        '''Screening optimizer of the derivative integrals. It is cached for
+        the current molecule and shares the Schwarz bounds of the SCF
+        optimizer when available.'''
+        vhfopt = getattr(self, '_jk_opt', None)
+        if vhfopt is None or vhfopt.mol is not mol:
+            q_cond = None
+            mf_opt = getattr(self.base, '_opt', None)
+            if isinstance(mf_opt, dict):
+                mf_opt = mf_opt.get(None)
+                if (isinstance(mf_opt, _vhf._VHFOpt) and mf_opt.mol is mol and
+                    mf_opt.q_cond is not None and
+                    mf_opt.q_cond.shape == (mol.nbas, mol.nbas)):
+                    q_cond = mf_opt.q_cond
+            vhfopt = self._jk_opt = make_jk_opt(mol, q_cond)
+        return vhfopt
+
+    def _get_jk(self, mol, dm, with_j, with_k, omega):
         if mol is None: mol = self.mol
         if dm is None: dm = self.base.make_rdm1()
-        cpu0 = (logger.process_clock(), logger.perf_counter())
         if omega is None:
-            vj, vk = get_jk(mol, dm)
-        else:
-            with mol.with_range_coulomb(omega):
-                vj, vk = get_jk(mol, dm)
+            return get_jk(mol, dm, self._get_jk_opt(mol), with_j, with_k)
+        with mol.with_range_coulomb(omega):
+            return get_jk(mol, dm, None, with_j, with_k)
+
+    @lib.with_doc(get_jk.__doc__)
+    def get_jk(self, mol=None, dm=None, hermi=0, omega=None):
+        cpu0 = (logger.process_clock(), logger.perf_counter())
+        vj, vk = self._get_jk(mol, dm, True, True, omega)
         logger.timer(self, 'vj and vk', *cpu0)
         return vj, vk
 
     def get_j(self, mol=None, dm=None, hermi=0, omega=None):
-        if mol is None: mol = self.mol
-        if dm is None: dm = self.base.make_rdm1()
-        intor = mol._add_suffix('int2e_ip1')
-        if omega is None:
-            return -_vhf.direct_mapdm(intor, 's2kl', 'lk->s1ij', dm, 3,
-                                      mol._atm, mol._bas, mol._env)
-        with mol.with_range_coulomb(omega):
-            return -_vhf.direct_mapdm(intor, 's2kl', 'lk->s1ij', dm, 3,
-                                      mol._atm, mol._bas, mol._env)
+        return self._get_jk(mol, dm, True, False, omega)[0]
 
     def get_k(self, mol=None, dm=None, hermi=0, omega=None):
-        if mol is None: mol = self.mol
-        if dm is None: dm = self.base.make_rdm1()
-        intor = mol._add_suffix('int2e_ip1')
-        if omega is None:
-            return -_vhf.direct_mapdm(intor, 's2kl', 'jk->s1il', dm, 3,
-                                      mol._atm, mol._bas, mol._env)
-        with mol.with_range_coulomb(omega):
-            return -_vhf.direct_mapdm(intor, 's2kl', 'jk->s1il', dm, 3,
-                                      mol._atm, mol._bas, mol._env)
+        return self._get_jk(mol, dm, False, True, omega)[1]
 
     def get_veff(self, mol=None, dm=None):
         raise NotImplementedError
@@ -451,7 +451,7 @@ def get_nlc_vxc_full_response(ni, mol, grids, xc_code, dms, relativity=0, hermi=
 # JCP 98, 5612 (1993); DOI:10.1063/1.464906
 def grids_response_cc(grids):
     mol = grids.mol
-    atom_grids_tab = grids.gen_atomic_grids(mol, grids.atom_grid,
+    atom_grids_tab = grids.gen_atomic_grids(mol, grids.get_atom_grid(),
                                             grids.radi_method,
                                             grids.level, grids.prune)
     atm_coords = numpy.asarray(mol.atom_coords() , order='C')
@@ -568,7 +568,7 @@ def grids_noresponse_cc(grids):
     # same as above but without the response, for nlc grids response routine
     assert grids.becke_scheme == gen_grid.original_becke
     mol = grids.mol
-    atom_grids_tab = grids.gen_atomic_grids(mol, grids.atom_grid,
+    atom_grids_tab = grids.gen_atomic_grids(mol, grids.get_atom_grid(),
                                             grids.radi_method,
                                             grids.level, grids.prune)
     coords_all, weights_all = gen_grid.get_partition(mol, atom_grids_tab,
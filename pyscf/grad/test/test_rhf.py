@@ -234,6 +234,30 @@ class KnownValues(unittest.TestCase):
         g_x = scf.RHF (mol).run ().nuc_grad_method ().kernel ()
         self.assertAlmostEqual(abs(ref[:,2] - g_x[:,0]).max(), 0, 9)
 
+    def test_batched_jk(self):
+        from pyscf.scf import _vhf
+        mf = scf.RHF(mol)
+        mf.direct_scf = True
+        mf._opt[None] = mf.init_direct_scf()
+        g = mf.nuc_grad_method()
+        numpy.random.seed(2)
+        dms = numpy.random.random((3, mol.nao, mol.nao))
+        dms = dms + dms.transpose(0,2,1)
+        intor = mol._add_suffix('int2e_ip1')
+        vj_ref, vk_ref = _vhf.direct_mapdm(intor, 's2kl', ('lk->s1ij', 'jk->s1il'),
+                                           dms, 3, mol._atm, mol._bas, mol._env)
+        vj, vk = g.get_jk(mol, dms)
+        self.assertAlmostEqual(abs(vj + vj_ref).max(), 0, 12)
+        self.assertAlmostEqual(abs(vk + vk_ref).max(), 0, 12)
+        vhfopt = g._jk_opt
+        self.assertTrue(numpy.array_equal(vhfopt.q_cond[1], mf._opt[None].q_cond))
+
+        self.assertAlmostEqual(abs(g.get_j(mol, dms[0]) + vj_ref[0]).max(), 0, 12)
+        self.assertAlmostEqual(abs(g.get_k(mol, dms[1]) + vk_ref[1]).max(), 0, 12)
+        self.assertTrue(g._jk_opt is vhfopt)
+        g.reset(mol.copy())
+        self.assertTrue(g._jk_opt is None)
+
     def test_grad_nuc(self):
         mol = gto.M(atom='He 0 0 0; He 0 1 2; H 1 2 1; H 1 0 0')
         gs = grad.rhf.grad_nuc(mol)
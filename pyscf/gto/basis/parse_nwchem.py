@@ -24,7 +24,9 @@ __all__ = ['parse', 'load', 'parse_ecp', 'load_ecp',
            'convert_basis_to_nwchem', 'convert_ecp_to_nwchem',
            'optimize_contraction', 'remove_zero', 'to_general_contraction']
 
+import os
 import re
+import mmap
 import numpy
 import numpy as np
 import scipy.linalg
@@ -37,6 +39,11 @@ from pyscf.gto.basis.parse_nwchem_ecp import convert_ecp_to_nwchem
 from pyscf import __config__
 
 BASIS_SET_DELIMITER = re.compile('# *BASIS SET.*\n|END\n')
+_BASIS_SET_DELIMITER_BYTES = re.compile(BASIS_SET_DELIMITER.pattern.encode())
+
+# Cached byte ranges of the basis blocks in basis files,
+# {path: ((mtime, size), {symb: (start, end)})}
+_BASIS_FILE_INDEX = {}
 
 def parse(string, symb=None, optimize=True):
     '''Parse the basis text which is in NWChem format. Return an internal
@@ -155,11 +162,67 @@ def _parse(raw_basis, optimize=True):
 
 def search_seg(basisfile, symb):
     symb = _std_symbol(symb)
-    with open(basisfile, 'r') as fin:
-        fdata = re.split(BASIS_SET_DELIMITER, fin.read())
-    line_data = _search_basis_block(fdata, symb)
+    index = _basis_file_index(basisfile)
+    if symb not in index:
+        return []
+    start, end = index[symb]
+    with open(basisfile, 'rb') as fin:
+        fin.seek(start)
+        line_data = fin.read(end - start).decode().splitlines()
     return [x for x in line_data if x and 'END' not in x]
 
+def _basis_file_index(basisfile):
+    '''Byte ranges {symb: (start, end)} of the basis blocks in basisfile.
+
+    The index is built once for each file, so that loading the basis of an
+    element only reads the bytes of the element from the file.
+    '''
+    path = os.path.abspath(basisfile)
+    stat = os.stat(path)
+    tag = (stat.st_mtime_ns, stat.st_size)
+    cached = _BASIS_FILE_INDEX.get(path)
+    if cached is not None and cached[0] == tag:
+        return cached[1]
+
+    index = {}
+    if stat.st_size > 0:
+        with open(path, 'rb') as fin, \
+                mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as fdata:
+            start = 0
+            for m in _BASIS_SET_DELIMITER_BYTES.finditer(fdata):
+                _index_basis_block(fdata, start, m.start(), index)
+                start = m.end()
+            _index_basis_block(fdata, start, len(fdata), index)
+    _BASIS_FILE_INDEX[path] = (tag, index)
+    return index
+
+def _index_basis_block(fdata, start, end, index):
+    '''Register the block fdata[start:end] in index. The rules to identify
+    the element of a block are the same to those in _search_basis_block.'''
+    dat0 = fdata[start:end].split(None, 1)
+    if not dat0:
+        return
+
+    if dat0[0][:1] != b'#':
+        symb = dat0[0].decode()
+        if symb not in index:
+            index[symb] = (start, end)
+        return
+
+    # Skip all leading '# xxx' lines and empty lines
+    pos = start
+    while pos < end:
+        eol = fdata.find(b'\n', pos, end)
+        if eol < 0:
+            eol = end
+        line = fdata[pos:eol]
+        if line.strip() and line.lstrip()[:1] != b'#':
+            symb = line.split(None, 1)[0].decode()
+            if symb not in index:
+                index[symb] = (pos, end)
+            return
+        pos = eol + 1
+
 def _search_basis_block(raw_data, symb):
     line_data = []
     for dat in raw_data:
@@ -78,6 +78,43 @@ Li    S
         self.assertEqual(len(b[0][1:]), 3)
         self.assertEqual(len(b[1][1:]), 3)
 
+    def test_basis_file_index(self):
+        import re
+        from pyscf.gto.basis import parse_nwchem
+        ftmp = tempfile.NamedTemporaryFile()
+        ftmp.write('''BASIS "ao basis" PRINT
+#BASIS SET: (3s) -> [2s]
+H    S
+      3.42525091             0.15432897
+      0.62391373             0.53532814
+H    S
+      0.16885540             1.00000000
+#BASIS SET: (6s,3p) -> [2s,1p]
+# comments
+Li    S
+     16.1195750              0.15432897
+Li    P
+      0.6362897              0.39951283
+END
+'''.encode())
+        ftmp.flush()
+        with open(ftmp.name, 'r') as f:
+            fdata = re.split(parse_nwchem.BASIS_SET_DELIMITER, f.read())
+        for symb in ('H', 'Li', 'C'):
+            ref = [x for x in parse_nwchem._search_basis_block(fdata, symb)
+                   if x and 'END' not in x]
+            self.assertEqual(parse_nwchem.search_seg(ftmp.name, symb), ref)
+        self.assertEqual(len(gto.basis.load(ftmp.name, 'Li')), 2)
+
+        # The index is updated when the file is modified
+        ftmp.write('''#BASIS SET: (1s) -> [1s]
+C    S
+      0.2                    1.00000000
+END
+'''.encode())
+        ftmp.flush()
+        self.assertEqual(len(parse_nwchem.search_seg(ftmp.name, 'C')), 2)
+
     def test_basis_load_ecp(self):
         self.assertEqual(gto.basis.load_ecp(__file__, 'H'), [])
 
@@ -18,6 +18,10 @@
 
 import sys
 import json
+import atexit
+import time
+import threading
+import collections
 import h5py
 
 if sys.version_info < (3,):
@@ -69,6 +73,7 @@ def load(chkfile, key):
         else:
             return val[()]
 
+    flush(chkfile)
     with h5py.File(chkfile, 'r') as fh5:
         return load_as_dic(key, fh5)
 load_chkfile_key = load
@@ -126,6 +131,7 @@ def dump(chkfile, key, value):
                 for k, v in enumerate(value):
                     save_as_group('%06d'%k, v, root1)
 
+    flush(chkfile)
     if h5py.is_hdf5(chkfile):
         with H5FileWrap(chkfile, 'r+') as fh5:
             if key in fh5:
@@ -139,6 +145,138 @@ def dump(chkfile, key, value):
 dump_chkfile_key = save = dump
 
 
+class _AsyncWriter:
+    '''Execute the checkpoint tasks in a background thread.
+
+    Tasks are identified by a tag (filename, key). A task submitted while an
+    earlier task of the same tag is still pending replaces the pending one.
+    Tasks of the same tag are executed at most once every min_interval
+    seconds. Errors are kept for the file of the task until they are raised
+    by :meth:`flush` for that file.
+    '''
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = collections.OrderedDict()
+        self._last_time = {}
+        self._thread = None
+        self._running = None
+        # Number of flush calls waiting for each file. None for all files.
+        self._flushing = collections.Counter()
+        self._errors = {}
+
+    def submit(self, tag, fn, *args, min_interval=0, **kwargs):
+        with self._cond:
+            self._pending.pop(tag, None)
+            self._pending[tag] = (fn, args, kwargs, min_interval)
+            if self._thread is None:
+                # The pending tasks are finished by the atexit hook
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _next_task(self):
+        '''Pop the first task which is ready. Returns the time to wait if
+        no task is ready.'''
+        now = time.perf_counter()
+        wait = None
+        for tag, task in self._pending.items():
+            t_ready = self._last_time.get(tag, -1e9) + task[3]
+            if (self._flushing[None] or self._flushing[_tag_file(tag)] or
+                t_ready <= now):
+                del self._pending[tag]
+                return tag, task, None
+            elif wait is None or t_ready - now < wait:
+                wait = t_ready - now
+        return None, None, wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+                tag, task, wait = self._next_task()
+                if task is None:
+                    self._cond.wait(wait)
+                    continue
+                self._running = tag
+            fn, args, kwargs = task[:3]
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                self._errors.setdefault(_tag_file(tag), e)
+            with self._cond:
+                self._running = None
+                self._last_time[tag] = time.perf_counter()
+                self._cond.notify_all()
+
+    def _busy(self, filename):
+        tags = list(self._pending)
+        if self._running is not None:
+            tags.append(self._running)
+        return any(filename is None or _tag_file(tag) == filename
+                   for tag in tags)
+
+    def flush(self, filename=None):
+        '''Block until the pending tasks of filename (of all files if
+        filename is None) are finished'''
+        if threading.current_thread() is self._thread:
+            # Called by the tasks themselves
+            return
+        with self._cond:
+            self._flushing[filename] += 1
+            self._cond.notify_all()
+            try:
+                while self._busy(filename):
+                    self._cond.wait()
+            finally:
+                self._flushing[filename] -= 1
+            if filename is None:
+                errors, self._errors = list(self._errors.values()), {}
+                err = errors[0] if errors else None
+            else:
+                err = self._errors.pop(filename, None)
+        if err is not None:
+            raise err
+
+def _tag_file(tag):
+    '''The file name of a task tag (filename, key)'''
+    if isinstance(tag, tuple):
+        return tag[0]
+    return tag
+
+_async_writer = _AsyncWriter()
+
+def _flush_at_exit():
+    try:
+        _async_writer.flush()
+    except Exception as e:
+        sys.stderr.write(f'Failed to write chkfile: {e!r}\n')
+atexit.register(_flush_at_exit)
+
+def submit(tag, fn, *args, min_interval=0, **kwargs):
+    '''Run the checkpoint function fn(*args, **kwargs) in a background
+    thread. tag is a tuple (filename, key). A pending task of the same tag is
+    discarded, so that only the latest data are written. Tasks of the same
+    tag are executed at most once every min_interval seconds. The arguments
+    should not be modified in place after submission.
+    '''
+    _async_writer.submit(tag, fn, *args, min_interval=min_interval, **kwargs)
+
+def dump_async(chkfile, key, value, min_interval=0):
+    '''Asynchronous version of :func:`dump`. The data are written in a
+    background thread. Call :func:`flush` to wait for the writes.'''
+    submit((chkfile, key), dump, chkfile, key, value, min_interval=min_interval)
+
+def flush(chkfile=None):
+    '''Wait for the asynchronous writes to chkfile submitted by
+    :func:`dump_async` and :func:`submit`. If chkfile is not given, wait for
+    the writes to all files. The exception raised in the background for
+    chkfile is re-raised here.'''
+    _async_writer.flush(chkfile)
+
+
 def load_mol(chkfile):
     '''Load Mole object from chkfile.
     The save_mol/load_mol operation can be used a serialization method for Mole object.
@@ -160,6 +298,7 @@ def load_mol(chkfile):
     '''
     from numpy import array  # noqa
     from pyscf import gto
+    flush(chkfile)
     try:
         with h5py.File(chkfile, 'r') as fh5:
             mol = gto.loads(fh5['mol'][()])
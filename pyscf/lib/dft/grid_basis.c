@@ -100,6 +100,138 @@ void VXCgen_grid(double *out, double *coords, double *atm_coords,
         free(atom_dist);
 }
 
+/*
+ * Stratmann switching function s(mu) = (1 - g(mu))/2,
+ * CPL, 257, 213 (1996); DOI:10.1016/0009-2614(96)00600-8
+ */
+static double _stratmann_s(double mu, double a)
+{
+        if (mu <= -a) {
+                return 1;
+        } else if (mu >= a) {
+                return 0;
+        }
+        double ma = mu / a;
+        double ma2 = ma * ma;
+        double g = (1./16) * (ma*(35 + ma2*(-35 + ma2*(21 - 5*ma2))));
+        return .5 * (1 - g);
+}
+
+/*
+ * Becke cell function P_X = prod_C s(mu_XC) of the atom order[x] on one grid.
+ * r are the grid-atom distances of the atoms order[:n]. Factors of atoms
+ * with r_C >= K * r_X are exactly 1 due to the compact support.
+ */
+static double _stratmann_cell(int x, double *r, int *order, int n,
+                              double *atm_coords, double *radii_table,
+                              int natm, double a, double K)
+{
+        int ix = order[x];
+        double rx = r[x];
+        double rcut = K * rx;
+        double p = 1;
+        double dx, dy, dz, mu;
+        int c, ic;
+        for (c = 0; c < n; c++) {
+                if (c == x || r[c] >= rcut) {
+                        continue;
+                }
+                ic = order[c];
+                dx = atm_coords[ix*3+0] - atm_coords[ic*3+0];
+                dy = atm_coords[ix*3+1] - atm_coords[ic*3+1];
+                dz = atm_coords[ix*3+2] - atm_coords[ic*3+2];
+                mu = (rx - r[c]) / sqrt(dx*dx + dy*dy + dz*dz);
+                if (radii_table != NULL) {
+                        mu += radii_table[ix*natm+ic] * (1 - mu*mu);
+                }
+                p *= _stratmann_s(mu, a);
+                if (p == 0) {
+                        break;
+                }
+        }
+        return p;
+}
+
+/*
+ * Becke weights with the Stratmann partition for the grids of one atom.
+ * order lists all atoms sorted by their distance atm_dist to the atom
+ * order[0] which owns the grids. For a grid at distance r_A to its own atom
+ * and at distance d to the nearest atom, only atoms with r_X < K * d can have
+ * non-zero cell functions, and only atoms with r_C < K * r_X contribute to the
+ * cell function of X. These atoms are within the leading part of order.
+ * K = (1+mu_max)/(1-mu_max) where mu_max is the largest mu at which the
+ * (radii adjusted) switching function vanishes.
+ */
+void VXCgen_grid_stratmann(double *out, double *coords, double *atm_coords,
+                           double *radii_table, int *order, double *atm_dist,
+                           int natm, int ngrids, double a, double K)
+{
+        const size_t Ngrids = ngrids;
+        const double K2 = K * K;
+#pragma omp parallel
+{
+        double *r = malloc(sizeof(double) * natm);
+        double dx, dy, dz, ra, d, lim, pa, wsum, mu;
+        int i, ia, n1, n2;
+        int i0 = order[0];
+        size_t n;
+#pragma omp for schedule(dynamic, 64)
+        for (n = 0; n < Ngrids; n++) {
+                dx = coords[0*Ngrids+n] - atm_coords[i0*3+0];
+                dy = coords[1*Ngrids+n] - atm_coords[i0*3+1];
+                dz = coords[2*Ngrids+n] - atm_coords[i0*3+2];
+                ra = sqrt(dx*dx + dy*dy + dz*dz);
+                r[0] = ra;
+                d = ra;
+                lim = (K + 1) * ra;
+                // P_A, accumulated in the order of the distance to atom A.
+                // It is often found to be zero before all neighbors are visited
+                pa = 1;
+                for (n1 = 1; n1 < natm && atm_dist[n1] < lim; n1++) {
+                        ia = order[n1];
+                        dx = coords[0*Ngrids+n] - atm_coords[ia*3+0];
+                        dy = coords[1*Ngrids+n] - atm_coords[ia*3+1];
+                        dz = coords[2*Ngrids+n] - atm_coords[ia*3+2];
+                        r[n1] = sqrt(dx*dx + dy*dy + dz*dz);
+                        d = MIN(d, r[n1]);
+                        if (r[n1] < K * ra) {
+                                mu = (ra - r[n1]) / atm_dist[n1];
+                                if (radii_table != NULL) {
+                                        mu += radii_table[i0*natm+ia] * (1 - mu*mu);
+                                }
+                                pa *= _stratmann_s(mu, a);
+                                if (pa == 0) {
+                                        break;
+                                }
+                        }
+                }
+                if (pa == 0) {
+                        out[n] = 0;
+                        continue;
+                }
+
+                lim = ra + K2 * d;
+                for (n2 = n1; n2 < natm && atm_dist[n2] < lim; n2++) {
+                        ia = order[n2];
+                        dx = coords[0*Ngrids+n] - atm_coords[ia*3+0];
+                        dy = coords[1*Ngrids+n] - atm_coords[ia*3+1];
+                        dz = coords[2*Ngrids+n] - atm_coords[ia*3+2];
+                        r[n2] = sqrt(dx*dx + dy*dy + dz*dz);
+                }
+
+                wsum = pa;
+                for (i = 1; i < n2; i++) {
+                        if (r[i] < K * d) {
+                                wsum += _stratmann_cell(i, r, order, n2, atm_coords,
+                                                        radii_table, natm, a, K);
+                        }
+                }
+                out[n] = pa / wsum;
+        }
+        free(r);
+}
+}
+
 typedef struct { double x, y, z; } double3;
 
 static inline double3 d3_plus(const double3 v1, const double3 v2) { double3 v = { v1.x + v2.x, v1.y + v2.y, v1.z + v2.z }; return v; }
@@ -20,16 +20,25 @@
 DIIS
 """
 
+import os
 import sys
+import shutil
+import tempfile
+import itertools
 import numpy
 import scipy.linalg
 from pyscf.lib import logger
 from pyscf.lib import misc
 from pyscf.lib import numpy_helper
+from pyscf.lib import parameters as param
 from pyscf import __config__
 
 INCORE_SIZE = getattr(__config__, 'lib_diis_incore_size', 10000000)  # 80 MB
 BLOCK_SIZE  = getattr(__config__, 'lib_diis_block_size', 20000000)  # ~ 160/320 MB
+# Backend for the vectors which do not fit in memory: 'h5' or 'mmap'
+STORAGE = getattr(__config__, 'lib_diis_DIIS_storage', 'h5')
+# Precision of the stored error vectors. None to keep the input precision
+ERR_VEC_DTYPE = getattr(__config__, 'lib_diis_DIIS_err_vec_dtype', None)
 
 # PCCP, 4, 11 (2002); DOI:10.1039/B108658H
 # GEDIIS, JCTC, 2, 835 (2006); DOI:10.1021/ct050275a
@@ -44,6 +53,15 @@ class DIIS:
             DIIS subspace size. The maximum number of the vectors to be stored.
         min_space
             The minimal size of subspace before DIIS extrapolation.
+        storage : str
+            Backend for the out-of-core vectors. 'h5' stores vectors in an
+            HDF5 file which can be used to restore the DIIS object. 'mmap'
+            stores vectors in memory-mapped scratch files and leaves the disk
+            writeback to the OS. When filename is given, 'h5' is always used.
+        err_vec_dtype
+            If specified (e.g. numpy.float32), error vectors are stored in
+            this precision. The overlap of the new error vector with the
+            stored error vectors is still accumulated in double precision.
 
     Functions:
         update(x, xerr=None) :
@@ -108,6 +126,8 @@ class DIIS:
         self.space = 6
         self.min_space = 1
         self.incore = incore
+        self.storage = STORAGE
+        self.err_vec_dtype = ERR_VEC_DTYPE
 
 ##################################################
 # don't modify the following private variables, they are not input options
@@ -120,7 +140,26 @@ class DIIS:
         self._xprev = None
         self._err_vec_touched = False
 
+    def _err_dtype(self, dtype):
+        if self.err_vec_dtype is None:
+            return dtype
+        err_dtype = numpy.dtype(self.err_vec_dtype)
+        if dtype.kind == 'c':
+            err_dtype = numpy.result_type(err_dtype, numpy.complex64)
+        return err_dtype
+
+    def _open_diisfile(self):
+        if self._diisfile is None:
+            if isinstance(self.filename, str) or self.storage != 'mmap':
+                self._diisfile = misc.H5TmpFile(self.filename, 'w')
+            else:
+                self._diisfile = _MmapStorage()
+        return self._diisfile
+
     def _store(self, key, value):
+        if key[0] == 'e':
+            value = value.astype(self._err_dtype(value.dtype), copy=False)
+
         incore = value.size < INCORE_SIZE or self.incore
         if incore:
             self._buffer[key] = value
@@ -128,8 +167,7 @@ class DIIS:
         # save the error vector if filename is given, this file can be used to
         # restore the DIIS state
         if (not incore) or isinstance(self.filename, str):
-            if self._diisfile is None:
-                self._diisfile = misc.H5TmpFile(self.filename, 'w')
+            self._open_diisfile()
             if key in self._diisfile:
                 self._diisfile[key][:] = value
             else:
@@ -176,8 +214,10 @@ class DIIS:
             if x.size < INCORE_SIZE or self.incore:
                 self._store(ekey, x - numpy.asarray(self._xprev))
             else:  # not call _store to reduce memory footprint
+                self._open_diisfile()
                 if ekey not in self._diisfile:
-                    self._diisfile.create_dataset(ekey, (x.size,), x.dtype)
+                    self._diisfile.create_dataset(ekey, (x.size,),
+                                                  self._err_dtype(x.dtype))
                 edat = self._diisfile[ekey]
                 for p0, p1 in misc.prange(0, x.size, BLOCK_SIZE):
                     edat[p0:p1] = x[p0:p1] - self._xprev[p0:p1]
@@ -199,6 +239,19 @@ class DIIS:
     def get_num_vec(self):
         return len(self._bookkeep)
 
+    def _load_blocks(self, getter, nd, size):
+        '''Iterate over the blocks (i, p0, p1, vec_i[p0:p1]) of the first nd
+        stored vectors. Blocks on disk are read in background while the
+        previous block is being processed.'''
+        tasks = [(i, p0, p1) for i in range(nd)
+                 for p0, p1 in misc.prange(0, size, BLOCK_SIZE)]
+        def load(i, p0, p1):
+            return i, p0, p1, numpy.asarray(getter(i)[p0:p1])
+        if self._buffer:
+            return itertools.starmap(load, tasks)
+        else:
+            return misc.map_with_prefetch(load, *zip(*tasks))
+
     def update(self, x, xerr=None):
         '''Extrapolate vector
 
@@ -217,17 +270,18 @@ class DIIS:
         if nd < self.min_space:
             return x
 
-        dt = numpy.asarray(self.get_err_vec(self._head-1))
+        # Only the row of the new error vector in the B matrix is updated
+        dt = self.get_err_vec(self._head-1)
+        dtype = numpy.result_type(dt.dtype, numpy.float64)
+        dt = numpy.asarray(dt, dtype=dtype).conj()
         if self._H is None:
-            self._H = numpy.zeros((self.space+1,self.space+1), dt.dtype)
+            self._H = numpy.zeros((self.space+1,self.space+1), dtype)
             self._H[0,1:] = self._H[1:,0] = 1
-        for i in range(nd):
-            tmp = 0
-            dti = self.get_err_vec(i)
-            for p0, p1 in misc.prange(0, dt.size, BLOCK_SIZE):
-                tmp += numpy.dot(dt[p0:p1].conj(), dti[p0:p1])
-            self._H[self._head,i+1] = tmp
-            self._H[i+1,self._head] = tmp.conjugate()
+        ovlp = numpy.zeros(nd, dtype)
+        for i, p0, p1, dti in self._load_blocks(self.get_err_vec, nd, dt.size):
+            ovlp[i] += numpy.dot(dt[p0:p1], dti)
+        self._H[self._head,1:nd+1] = ovlp
+        self._H[1:nd+1,self._head] = ovlp.conj()
         dt = None
 
         if self._xprev is None:
@@ -264,13 +318,10 @@ class DIIS:
                 raise e
         logger.debug1(self, 'diis-c %s', c)
 
-        xnew = None
-        for i, ci in enumerate(c[1:]):
-            xi = self.get_vec(i)
-            if xnew is None:
-                xnew = numpy.zeros(xi.size, c.dtype)
-            for p0, p1 in misc.prange(0, xi.size, BLOCK_SIZE):
-                xnew[p0:p1] += xi[p0:p1] * ci
+        size = self.get_vec(0).size
+        xnew = numpy.zeros(size, c.dtype)
+        for i, p0, p1, xi in self._load_blocks(self.get_vec, nd, size):
+            xnew[p0:p1] += xi * c[i+1]
         return xnew
 
     def restore(self, filename, inplace=True):
@@ -329,7 +380,8 @@ class DIIS:
         e_mat = numpy_helper.unpack_tril(e_mat)
 
         space = max(nd, self.space)
-        self._H = numpy.zeros((space+1,space+1), e_mat.dtype)
+        self._H = numpy.zeros((space+1,space+1),
+                              numpy.result_type(e_mat.dtype, numpy.float64))
         self._H[0,1:] = self._H[1:,0] = 1
         self._H[1:nd+1,1:nd+1] = e_mat
         return self
@@ -337,6 +389,51 @@ class DIIS:
     to_gpu = misc.to_gpu
 
 
+class _MmapStorage:
+    '''A minimal h5py.File-like container of memory-mapped vectors.
+
+    Each key owns one scratch file. The files are reused when the DIIS ring
+    buffer wraps around and are removed when the container is released.
+    '''
+    def __init__(self, dir=param.TMPDIR):
+        self._tmpdir = tempfile.mkdtemp(prefix='diis', dir=dir)
+        self._data = {}
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        value = numpy.asarray(value)
+        self.create_dataset(key, value.shape, value.dtype)[:] = value
+
+    def keys(self):
+        return self._data.keys()
+
+    def create_dataset(self, key, shape, dtype):
+        self._data[key] = numpy.memmap(os.path.join(self._tmpdir, key),
+                                       dtype=dtype, mode='w+', shape=shape)
+        return self._data[key]
+
+    def flush(self):
+        # Dirty pages are written back by the OS asynchronously
+        pass
+
+    def close(self):
+        self._data = {}
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
 def restore(filename):
     '''Restore/construct diis object based on a diis file'''
     return DIIS().restore(filename)
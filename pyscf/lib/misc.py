@@ -22,9 +22,11 @@ Some helper functions
 
 import os
 import sys
+import io
 import time
 import random
 import platform
+import sysconfig
 import warnings
 import tempfile
 import functools
@@ -91,10 +93,17 @@ c_double_p = ctypes.POINTER(ctypes.c_double)
 c_int_p = ctypes.POINTER(ctypes.c_int)
 c_null_ptr = ctypes.POINTER(ctypes.c_void_p)
 
-def load_library(libname):
+# Defer dlopen of the C extensions until their symbols are accessed.
+LAZY_LOAD_LIBRARY = getattr(__config__, 'lib_misc_lazy_load_library', True)
+
+def load_library(libname, eager=False):
+    '''Load the C extension libname. The shared library is opened when its
+    symbols are accessed for the first time, unless eager is set. Callers
+    which handle the OSError of a missing or broken library should set eager.
+    '''
     try:
         _loaderpath = os.path.dirname(__file__)
-        return numpy.ctypeslib.load_library(libname, _loaderpath)
+        return _load_library(libname, _loaderpath, eager)
     except OSError:
         from pyscf import __path__ as ext_modules
         for path in ext_modules:
@@ -102,9 +111,52 @@ def load_library(libname):
             if os.path.isdir(libpath):
                 for files in os.listdir(libpath):
                     if files.startswith(libname):
-                        return numpy.ctypeslib.load_library(libname, libpath)
+                        return _load_library(libname, libpath, eager)
         raise
 
+def _load_library(libname, libdir, eager=False):
+    if eager or not LAZY_LOAD_LIBRARY:
+        return numpy.ctypeslib.load_library(libname, libdir)
+    base_ext = '.so'
+    if sys.platform.startswith('darwin'):
+        base_ext = '.dylib'
+    elif sys.platform.startswith('win'):
+        base_ext = '.dll'
+    so_ext = sysconfig.get_config_var('EXT_SUFFIX')
+    for ext in (so_ext, base_ext):
+        if ext:
+            libpath = os.path.join(os.path.abspath(libdir), libname + ext)
+            if os.path.exists(libpath):
+                return _LazyLibrary(libpath)
+    raise OSError('no file with expected extension')
+
+class _LazyLibrary:
+    '''A proxy of ctypes.CDLL. The shared library is loaded when any of its
+    attributes is accessed for the first time.'''
+    __slots__ = ('_libpath', '_cdll')
+
+    def __init__(self, libpath):
+        self._libpath = libpath
+        self._cdll = None
+
+    def _load(self):
+        cdll = self._cdll
+        if cdll is None:
+            cdll = self._cdll = ctypes.cdll[self._libpath]
+        return cdll
+
+    def __getattr__(self, key):
+        if key in _LazyLibrary.__slots__:
+            # Not initialized, e.g. by copy.copy or unpickling
+            raise AttributeError(key)
+        return getattr(self._load(), key)
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __repr__(self):
+        return f'<lazy library {self._libpath}>'
+
 #Fixme, the standard resource module gives wrong number when objects are released
 # http://fa.bianp.net/blog/2013/different-ways-to-get-memory-consumption-or-lessons-learned-from-memory_profiler/#fn:1
 #or use slow functions as memory_profiler._get_memory did
@@ -1302,6 +1354,159 @@ class GradScanner:
         conv = getattr(self.base, 'converged', True)
         return conv
 
+class ScannerPool:
+    '''Evaluate a scanner (SinglePointScanner or GradScanner) for a list of
+    geometries in a pool of processes.
+
+    The geometries are distributed in contiguous chunks, so that each worker
+    warm-starts from the converged results of its previous geometry (the
+    initial state of every worker is the state of the scanner in the parent
+    process). The available OpenMP threads are split between the workers.
+    The workers are started by the "spawn" method. Scripts which use the pool
+    should protect the main program with ``if __name__ == '__main__':``.
+
+    Attributes:
+        warm_start : str
+            'previous' (default) starts each calculation from the results of
+            the previous geometry in the same worker. 'initial' starts every
+            calculation from the state of the scanner when the pool was
+            called, e.g. the results of a reference geometry.
+        nproc : int
+            Number of worker processes. By default, one process for each
+            available thread, up to the number of geometries.
+        nthreads : int
+            Number of OpenMP threads in each worker. By default, the
+            available threads are evenly divided among the workers.
+        converged : list
+            Convergence flags of the scanner for each geometry of the last
+            call of :func:`imap`.
+
+    Examples:
+
+    >>> mol = gto.M(atom='H 0 0 0; H 0 0 .74', basis='ccpvdz')
+    >>> pool = lib.ScannerPool(mol.RHF().as_scanner())
+    >>> for e in pool.imap(['H 0 0 0; H 0 0 %g' % r for r in (.7, .8, .9)]):
+    ...     print(e)
+    '''
+    def __init__(self, scanner, nproc=None, nthreads=None):
+        assert isinstance(scanner, (SinglePointScanner, GradScanner))
+        self.scanner = scanner
+        self.nproc = nproc
+        self.nthreads = nthreads
+        self.warm_start = 'previous'
+        self.converged = []
+
+    def _split_threads(self, ntasks):
+        total = num_threads()
+        nproc = self.nproc
+        if nproc is None:
+            nproc = total
+        nproc = max(1, min(nproc, ntasks))
+        nthreads = self.nthreads
+        if nthreads is None:
+            nthreads = max(1, total // nproc)
+        return nproc, nthreads
+
+    def imap(self, geoms, chunksize=None):
+        '''Iterate over the scanner results of the given geometries. The
+        results are yielded in the order of the input geometries as soon as
+        they are available.'''
+        import multiprocessing
+        geoms = list(geoms)
+        nproc, nthreads = self._split_threads(len(geoms))
+        self.converged = []
+        snapshot = None
+        if self.warm_start == 'initial':
+            snapshot = _scanner_snapshot(self.scanner)
+
+        if nproc == 1:
+            for geom in geoms:
+                res, conv = _scanner_pool_call(geom, self.scanner, snapshot)
+                self.converged.append(conv)
+                yield res
+            return
+
+        if chunksize is None:
+            # Larger chunks improve the reuse of the initial guess, smaller
+            # chunks balance the load between workers.
+            chunksize = max(1, len(geoms) // (nproc * 2))
+        # The OpenMP runtime is not safe in processes forked from a parent
+        # which has used OpenMP. Workers are started from fresh interpreters
+        # and the scanner is sent to them by pickle.
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(nproc, _scanner_pool_init,
+                      (_dumps_scanner(self.scanner), snapshot is not None,
+                       nthreads)) as pool:
+            for res, conv in pool.imap(_scanner_pool_call, geoms, chunksize):
+                self.converged.append(conv)
+                yield res
+
+    def map(self, geoms, chunksize=None):
+        '''Scanner results for all the given geometries'''
+        return list(self.imap(geoms, chunksize))
+
+def _scanner_objects(scanner):
+    '''The scanner and the underlying methods which hold the states'''
+    objs = []
+    stack = [scanner]
+    while stack:
+        obj = stack.pop()
+        if all(obj is not x for x in objs):
+            objs.append(obj)
+            stack.extend(getattr(obj, key) for key in ('base', '_scf')
+                         if getattr(obj, key, None) is not None)
+    return objs
+
+def _scanner_snapshot(scanner):
+    return [(obj, dict(obj.__dict__)) for obj in _scanner_objects(scanner)]
+
+def _scanner_restore(snapshot):
+    for obj, attrs in snapshot:
+        obj.__dict__.clear()
+        obj.__dict__.update(attrs)
+
+def _rebuild_class(bases, name, module):
+    cls = make_class(bases, name)
+    cls.__module__ = module
+    return cls
+
+class _ScannerPickler(pickle.Pickler):
+    '''Pickler for the classes created by make_class (e.g. the scanner
+    classes), which cannot be found by their names'''
+    def reducer_override(self, obj):
+        if (isinstance(obj, type) and
+            _registered_classes.get((obj.__name__, obj.__bases__)) is obj):
+            return _rebuild_class, (obj.__bases__, obj.__name__, obj.__module__)
+        return NotImplemented
+
+def _dumps_scanner(scanner):
+    buf = io.BytesIO()
+    _ScannerPickler(buf).dump(scanner)
+    return buf.getvalue()
+
+_pool_worker = None
+
+def _scanner_pool_init(scanner, warm_start_initial, nthreads):
+    global _pool_worker
+    num_threads(nthreads)
+    scanner = pickle.loads(scanner)
+    # chkfiles of the parent process cannot be shared between workers
+    for obj in _scanner_objects(scanner):
+        if getattr(obj, 'chkfile', None):
+            obj.chkfile = None
+    snapshot = None
+    if warm_start_initial:
+        snapshot = _scanner_snapshot(scanner)
+    _pool_worker = (scanner, snapshot)
+
+def _scanner_pool_call(geom, scanner=None, snapshot=None):
+    if scanner is None:
+        scanner, snapshot = _pool_worker
+    if snapshot is not None:
+        _scanner_restore(snapshot)
+    res = scanner(geom)
+    return res, bool(getattr(scanner, 'converged', True))
+
 class temporary_env:
     '''Within the context of this macro, the attributes of the object are
     temporarily updated. When the program goes out of the scope of the
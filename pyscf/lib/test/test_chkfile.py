@@ -60,6 +60,24 @@ class KnownValues(unittest.TestCase):
         self.assertTrue(numpy.all(a['x'][1] == dat['x'][1]))
         self.assertTrue(numpy.all(a['y'][0] == dat['y'][0]))
 
+    def test_dump_async(self):
+        fchk = tempfile.NamedTemporaryFile()
+        for i in range(5):
+            lib.chkfile.dump_async(fchk.name, 'a', numpy.eye(3) * i, min_interval=10)
+        self.assertTrue(numpy.all(lib.chkfile.load(fchk.name, 'a') == numpy.eye(3) * 4))
+
+        def raise_error():
+            raise IndexError
+        lib.chkfile.submit(('err.chk', 'a'), raise_error)
+        self.assertRaises(IndexError, lib.chkfile.flush)
+        lib.chkfile.flush()
+
+        # The error is raised only for the file of the failed task
+        lib.chkfile.submit(('err.chk', 'a'), raise_error)
+        lib.chkfile.dump(fchk.name, 'b', numpy.eye(3))
+        self.assertRaises(IndexError, lib.chkfile.flush, 'err.chk')
+        lib.chkfile.flush('err.chk')
+
 
 if __name__ == "__main__":
     print("Full Tests for lib.chkfile")
@@ -87,6 +87,22 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(abs(a.dot(x) - b).max(), 0, 6)
         self.assertAlmostEqual(abs(x - numpy.linalg.solve(a,b)).max(), 0, 6)
 
+    def test_mmap_storage(self):
+        a, b, adiag, arest, x = make_ab(16)
+        lib.diis.INCORE_SIZE, bak = 4, lib.diis.INCORE_SIZE
+        ad = lib.diis.DIIS()
+        ad.storage = 'mmap'
+        ad.err_vec_dtype = numpy.float32
+        for i in range(20):
+            x = (b - arest.dot(x)) / adiag
+            x = ad.update(x)
+        lib.diis.INCORE_SIZE = bak
+        self.assertTrue(isinstance(ad._diisfile, lib.diis._MmapStorage))
+        self.assertEqual(ad.get_err_vec(0).dtype, numpy.float32)
+        self.assertEqual(ad._H.dtype, numpy.float64)
+        self.assertAlmostEqual(abs(a.dot(x) - b).max(), 0, 6)
+        self.assertAlmostEqual(abs(x - numpy.linalg.solve(a,b)).max(), 0, 6)
+
 
 if __name__ == "__main__":
     print("Full Tests for lib.diis")
@@ -13,6 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import copy
+import tempfile
 import unittest
 import numpy
 from pyscf import lib
@@ -94,6 +97,62 @@ class KnownValues(unittest.TestCase):
         mf = mol.GKS(xc='pbe')
         pickle.loads(pickle.dumps(mf))
 
+    def test_lazy_load_library(self):
+        from pyscf.lib import misc
+        libnp = misc.load_library('libnp_helper')
+        if isinstance(libnp, misc._LazyLibrary):
+            self.assertTrue(libnp._cdll is None)
+        self.assertTrue(callable(libnp.NPdset0))
+        self.assertRaises(OSError, misc.load_library, 'libnot_exist')
+        self.assertFalse(isinstance(misc.load_library('libnp_helper', eager=True),
+                                    misc._LazyLibrary))
+
+        # A library which cannot be opened fails at load_library with eager
+        with tempfile.TemporaryDirectory() as d:
+            libpath = os.path.join(d, 'libbroken.so')
+            with open(libpath, 'w') as f:
+                f.write('not a shared library')
+            self.assertRaises(OSError, misc._load_library, 'libbroken', d, True)
+
+        # copy and pickle create the object without calling __init__
+        self.assertRaises(AttributeError, getattr,
+                          misc._LazyLibrary.__new__(misc._LazyLibrary), '_cdll')
+        libnp1 = copy.copy(libnp)
+        self.assertTrue(callable(libnp1.NPdset0))
+
+    def test_lazy_submodule(self):
+        import pyscf
+        self.assertTrue(pyscf.dft.RKS is not None)
+        self.assertRaises(AttributeError, getattr, pyscf, 'not_a_module')
+
+    def test_scanner_pool(self):
+        from pyscf import gto
+        mol = gto.M(atom='H 0 0 0; H 0 0 .74', basis='631g', verbose=0)
+        geoms = ['H 0 0 0; H 0 0 %g' % r for r in (.7, .75, .8, .85)]
+        ref = [mol.RHF().as_scanner()(g) for g in geoms]
+        pool = lib.ScannerPool(mol.RHF().as_scanner(), nproc=2)
+        self.assertAlmostEqual(abs(numpy.array(pool.map(geoms)) - ref).max(), 0, 9)
+        self.assertTrue(all(pool.converged))
+
+        pool = lib.ScannerPool(mol.RHF().nuc_grad_method().as_scanner(), nproc=1)
+        e, de = list(pool.imap(geoms[:1]))[0]
+        self.assertAlmostEqual(e, ref[0], 9)
+        self.assertEqual(de.shape, (2, 3))
+
+    def test_scanner_pool_threads(self):
+        # OpenMP threads in the workers after the parent has used OpenMP
+        from pyscf import gto
+        mol = gto.M(atom='H 0 0 0; H 0 0 .74', basis='631g', verbose=0)
+        geoms = ['H 0 0 0; H 0 0 %g' % r for r in (.7, .8)]
+        g_scanner = mol.RHF().nuc_grad_method().as_scanner()
+        ref = [g_scanner(g) for g in geoms]
+        pool = lib.ScannerPool(mol.RHF().nuc_grad_method().as_scanner(),
+                               nproc=2, nthreads=2)
+        pool.warm_start = 'initial'
+        for (e, de), (e_ref, de_ref) in zip(pool.imap(geoms), ref):
+            self.assertAlmostEqual(e, e_ref, 9)
+            self.assertAlmostEqual(abs(de - de_ref).max(), 0, 6)
+
 
 if __name__ == "__main__":
     unittest.main()
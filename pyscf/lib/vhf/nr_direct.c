@@ -352,6 +352,119 @@ int CVHFshls_block_partition(int *block_loc, int *shls_slice, int *ao_loc,
  *
  * Return [(ptr[ncomp,nao,nao] in C-contiguous) for ptr in vjk]
  */
+typedef struct {
+        double q;
+        int id;
+} BlockPair;
+
+static int _cmp_block_pair(const void *a, const void *b)
+{
+        double qa = ((BlockPair *)a)->q;
+        double qb = ((BlockPair *)b)->q;
+        return (qa < qb) - (qa > qb);
+}
+
+/*
+ * Upper bounds of the Schwarz conditions for each pair of AO blocks.
+ */
+static void _block_pair_qcond(double *qblk, double *q_cond, int nbas,
+                              int *block_iloc, int nblock_i,
+                              int *block_jloc, int nblock_j)
+{
+        int i, j, ish, jsh;
+        double q;
+        for (i = 0; i < nblock_i; i++) {
+        for (j = 0; j < nblock_j; j++) {
+                q = 0;
+                for (ish = block_iloc[i]; ish < block_iloc[i+1]; ish++) {
+                for (jsh = block_jloc[j]; jsh < block_jloc[j+1]; jsh++) {
+                        q = MAX(q, q_cond[(size_t)ish*nbas+jsh]);
+                } }
+                qblk[i*nblock_j+j] = q;
+        } }
+}
+
+/*
+ * Whether the prescreen function requires q_cond[ij]*q_cond[kl] > cutoff.
+ * Block quartets which violate this condition can be skipped.
+ */
+static int _schwarz_screened(CVHFOpt *vhfopt, int *shls_slice)
+{
+        if (vhfopt == NULL || vhfopt->q_cond == NULL) {
+                return 0;
+        }
+        int nbas = vhfopt->nbas;
+        return ((vhfopt->fprescreen == &CVHFnrs8_prescreen ||
+                 vhfopt->fprescreen == &CVHFnrs8_vj_prescreen ||
+                 vhfopt->fprescreen == &CVHFnrs8_vk_prescreen ||
+                 vhfopt->fprescreen == &CVHFnrs8_vj_cfmm_prescreen ||
+                 vhfopt->fprescreen == &CVHFnr_schwarz_cond) &&
+                shls_slice[1] <= nbas && shls_slice[3] <= nbas &&
+                shls_slice[5] <= nbas && shls_slice[7] <= nbas);
+}
+
+/*
+ * Lists of the significant block pairs. For each j block, the i blocks are
+ * sorted by the Schwarz bounds in descending order (ij_pairs). The
+ * significant (k,l) block pairs are sorted in descending order (kl_pairs).
+ * Returns the number of significant (k,l) pairs. If Schwarz screening is not
+ * applicable, all pairs are kept with q = 1.
+ */
+static int _block_pair_list(BlockPair *ij_pairs, BlockPair *kl_pairs,
+                            double *qjmax, CVHFOpt *vhfopt, int *shls_slice,
+                            int *block_iloc, int nblock_i, int *block_jloc, int nblock_j,
+                            int *block_kloc, int nblock_k, int *block_lloc, int nblock_l)
+{
+        int nblock_kl = nblock_k * nblock_l;
+        int i, j, n;
+        if (!_schwarz_screened(vhfopt, shls_slice)) {
+                for (j = 0; j < nblock_j; j++) {
+                        qjmax[j] = 1;
+                        for (i = 0; i < nblock_i; i++) {
+                                ij_pairs[j*nblock_i+i].q = 1;
+                                ij_pairs[j*nblock_i+i].id = i;
+                        }
+                }
+                for (n = 0; n < nblock_kl; n++) {
+                        kl_pairs[n].q = 1;
+                        kl_pairs[n].id = n;
+                }
+                return nblock_kl;
+        }
+
+        int nbas = vhfopt->nbas;
+        double cutoff = vhfopt->direct_scf_cutoff;
+        double *qij = malloc(sizeof(double) * MAX(nblock_i*nblock_j, nblock_kl));
+        _block_pair_qcond(qij, vhfopt->q_cond, nbas,
+                          block_iloc, nblock_i, block_jloc, nblock_j);
+        double qmax = 0;
+        for (j = 0; j < nblock_j; j++) {
+                qjmax[j] = 0;
+                for (i = 0; i < nblock_i; i++) {
+                        ij_pairs[j*nblock_i+i].q = qij[i*nblock_j+j];
+                        ij_pairs[j*nblock_i+i].id = i;
+                        qjmax[j] = MAX(qjmax[j], qij[i*nblock_j+j]);
+                }
+                qsort(ij_pairs+j*nblock_i, nblock_i, sizeof(BlockPair), _cmp_block_pair);
+                qmax = MAX(qmax, qjmax[j]);
+        }
+
+        double *qkl = qij;
+        _block_pair_qcond(qkl, vhfopt->q_cond, nbas,
+                          block_kloc, nblock_k, block_lloc, nblock_l);
+        int nkl = 0;
+        for (n = 0; n < nblock_kl; n++) {
+                if (qkl[n] * qmax > cutoff) {
+                        kl_pairs[nkl].q = qkl[n];
+                        kl_pairs[nkl].id = n;
+                        nkl++;
+                }
+        }
+        qsort(kl_pairs, nkl, sizeof(BlockPair), _cmp_block_pair);
+        free(qij);
+        return nkl;
+}
+
 void CVHFnr_direct_drv(int (*intor)(), void (*fdot)(), JKOperator **jkop,
                        double **dms, double **vjk, int n_dm, int ncomp,
                        int *shls_slice, int *ao_loc,
@@ -392,13 +505,26 @@ void CVHFnr_direct_drv(int (*intor)(), void (*fdot)(), JKOperator **jkop,
         uint32_t nblock_k = CVHFshls_block_partition(block_kloc, shls_slice+4, ao_loc, AO_BLOCK_SIZE);
         uint32_t nblock_l = CVHFshls_block_partition(block_lloc, shls_slice+6, ao_loc, AO_BLOCK_SIZE);
         uint32_t nblock_kl = nblock_k * nblock_l;
-        uint32_t nblock_jkl = nblock_j * nblock_kl;
         int nblock_max = MAX(nblock_i, nblock_j);
         nblock_max = MAX(nblock_max, nblock_k);
         nblock_max = MAX(nblock_max, nblock_l);
         // up to 1.6 GB per thread
         int size_limit = (200000000 - di*di*di*di*ncomp - cache_size) / n_dm;
 
+        // Loop over the significant block pairs only. The (k,l) pairs with
+        // large Schwarz bounds are distributed first for load balance.
+        BlockPair *ij_pairs = malloc(sizeof(BlockPair) * (nblock_i*nblock_j + nblock_kl));
+        BlockPair *kl_pairs = ij_pairs + nblock_i * nblock_j;
+        double *qjmax = malloc(sizeof(double) * (nblock_j + 1));
+        uint32_t nkl = _block_pair_list(ij_pairs, kl_pairs, qjmax, vhfopt, shls_slice,
+                                        block_iloc, nblock_i, block_jloc, nblock_j,
+                                        block_kloc, nblock_k, block_lloc, nblock_l);
+        uint32_t nblock_jkl = nblock_j * nkl;
+        double cutoff = 0;
+        if (_schwarz_screened(vhfopt, shls_slice)) {
+                cutoff = vhfopt->direct_scf_cutoff;
+        }
+
 #pragma omp parallel
 {
         int ioff = ao_loc[ish0];
@@ -415,9 +541,13 @@ void CVHFnr_direct_drv(int (*intor)(), void (*fdot)(), JKOperator **jkop,
         double *cache = buf + di*di*di*di*ncomp;
 #pragma omp for nowait schedule(dynamic, 1)
         for (blk_id = 0; blk_id < nblock_jkl; blk_id++) {
-                // TODO: add schwarz ineq conditioner
-                r = blk_id;
-                j = r / nblock_kl ; r = r % nblock_kl;
+                r = blk_id / nblock_j;
+                j = blk_id % nblock_j;
+                double q_kl = kl_pairs[r].q;
+                if (qjmax[j] * q_kl <= cutoff) {
+                        continue;
+                }
+                r = kl_pairs[r].id;
                 k = r / nblock_l  ; r = r % nblock_l;
                 l = r;
                 int j0 = ao_loc[block_jloc[j]];
@@ -438,7 +568,12 @@ void CVHFnr_direct_drv(int (*intor)(), void (*fdot)(), JKOperator **jkop,
                         pv->block_quartets[2] = k;
                         pv->block_quartets[3] = l;
                 }
-                for (i = 0; i < nblock_i; i++) {
+                BlockPair *pij = ij_pairs + j * nblock_i;
+                for (r = 0; r < nblock_i; r++) {
+                        if (pij[r].q * q_kl <= cutoff) {
+                                break;
+                        }
+                        i = pij[r].id;
                         int i0 = ao_loc[block_iloc[i]];
                         int i1 = ao_loc[block_iloc[i+1]];
                         for (n = 0; n < n_dm; n++) {
@@ -473,6 +608,142 @@ void CVHFnr_direct_drv(int (*intor)(), void (*fdot)(), JKOperator **jkop,
                 free(tile_dms[idm]);
         }
         free(block_iloc);
+        free(ij_pairs);
+        free(qjmax);
+}
+
+/*
+ * Batched version of CVHFnr_direct_drv for many molecules which share the
+ * same basis layout (the same shls_slice and ao_loc). The molecules are
+ * distributed over threads and each molecule is computed by one thread.
+ * This is more efficient than CVHFnr_direct_drv when the molecules are too
+ * small to saturate the threads.
+ *
+ * dms and vjk have nmol*n_dm entries, ordered as [imol*n_dm+idm].
+ * cintopts, vhfopts, atms, bass, envs have nmol entries. vhfopts can be NULL.
+ */
+void CVHFnr_direct_batch_drv(int (*intor)(), void (*fdot)(), JKOperator **jkop,
+                             double **dms, double **vjk, int n_dm, int ncomp,
+                             int nmol, int *shls_slice, int *ao_loc,
+                             CINTOpt **cintopts, CVHFOpt **vhfopts,
+                             int **atms, int natm, int **bass, int nbas,
+                             double **envs)
+{
+        size_t di = GTOmax_shell_dim(ao_loc, shls_slice, 4);
+        size_t cache_size = 0;
+        int imol;
+        for (imol = 0; imol < nmol; imol++) {
+                cache_size = MAX(cache_size, GTOmax_cache_size(
+                        intor, shls_slice, 4, atms[imol], natm, bass[imol], nbas,
+                        envs[imol]));
+        }
+        int ish0 = shls_slice[0];
+        int ish1 = shls_slice[1];
+        int jsh0 = shls_slice[2];
+        int jsh1 = shls_slice[3];
+        int ksh0 = shls_slice[4];
+        int ksh1 = shls_slice[5];
+        int lsh0 = shls_slice[6];
+        int lsh1 = shls_slice[7];
+        int nish = ish1 - ish0;
+        int njsh = jsh1 - jsh0;
+        int nksh = ksh1 - ksh0;
+        int nlsh = lsh1 - lsh0;
+        int *block_iloc = malloc(sizeof(int) * (nish + njsh + nksh + nlsh + 4));
+        int *block_jloc = block_iloc + nish + 1;
+        int *block_kloc = block_jloc + njsh + 1;
+        int *block_lloc = block_kloc + nksh + 1;
+        uint32_t nblock_i = CVHFshls_block_partition(block_iloc, shls_slice+0, ao_loc, AO_BLOCK_SIZE);
+        uint32_t nblock_j = CVHFshls_block_partition(block_jloc, shls_slice+2, ao_loc, AO_BLOCK_SIZE);
+        uint32_t nblock_k = CVHFshls_block_partition(block_kloc, shls_slice+4, ao_loc, AO_BLOCK_SIZE);
+        uint32_t nblock_l = CVHFshls_block_partition(block_lloc, shls_slice+6, ao_loc, AO_BLOCK_SIZE);
+        int nblock_max = MAX(nblock_i, nblock_j);
+        nblock_max = MAX(nblock_max, nblock_k);
+        nblock_max = MAX(nblock_max, nblock_l);
+        int size_limit = (200000000 - di*di*di*di*ncomp - cache_size) / n_dm;
+        int ioff = ao_loc[ish0];
+        int joff = ao_loc[jsh0];
+        int koff = ao_loc[ksh0];
+        int loff = ao_loc[lsh0];
+
+#pragma omp parallel
+{
+        int i, j, k, l, n;
+        double *tile_dms[n_dm];
+        JKArray *v_priv[n_dm];
+        for (n = 0; n < n_dm; n++) {
+                v_priv[n] = CVHFallocate_JKArray(jkop[n], shls_slice, ao_loc,
+                                                 ncomp, nblock_max, size_limit);
+        }
+        double *buf = malloc(sizeof(double) * (di*di*di*di*ncomp + di*di*2 + cache_size));
+        double *cache = buf + di*di*di*di*ncomp;
+#pragma omp for schedule(dynamic, 1)
+        for (imol = 0; imol < nmol; imol++) {
+                IntorEnvs envs1 = {natm, nbas, atms[imol], bass[imol], envs[imol],
+                        shls_slice, ao_loc, NULL, cintopts[imol], ncomp};
+                CVHFOpt *vhfopt = vhfopts[imol];
+                double **mol_dms = dms + imol * n_dm;
+                double **mol_vjk = vjk + imol * n_dm;
+                for (n = 0; n < n_dm; n++) {
+                        CVHFzero_out_vjk(mol_vjk[n], jkop[n], shls_slice, ao_loc, ncomp);
+                        tile_dms[n] = CVHFallocate_and_reorder_dm(jkop[n], mol_dms[n],
+                                                                  shls_slice, ao_loc);
+                }
+                for (j = 0; j < nblock_j; j++) {
+                int j0 = ao_loc[block_jloc[j]];
+                int j1 = ao_loc[block_jloc[j+1]];
+                for (k = 0; k < nblock_k; k++) {
+                int k0 = ao_loc[block_kloc[k]];
+                int k1 = ao_loc[block_kloc[k+1]];
+                for (l = 0; l < nblock_l; l++) {
+                        int l0 = ao_loc[block_lloc[l]];
+                        int l1 = ao_loc[block_lloc[l+1]];
+                        for (n = 0; n < n_dm; n++) {
+                                JKArray *pv = v_priv[n];
+                                pv->ao_off[1] = j0 - joff;
+                                pv->ao_off[2] = k0 - koff;
+                                pv->ao_off[3] = l0 - loff;
+                                pv->shape[1] = j1 - j0;
+                                pv->shape[2] = k1 - k0;
+                                pv->shape[3] = l1 - l0;
+                                pv->block_quartets[1] = j;
+                                pv->block_quartets[2] = k;
+                                pv->block_quartets[3] = l;
+                        }
+                        for (i = 0; i < nblock_i; i++) {
+                                int i0 = ao_loc[block_iloc[i]];
+                                int i1 = ao_loc[block_iloc[i+1]];
+                                for (n = 0; n < n_dm; n++) {
+                                        JKArray *pv = v_priv[n];
+                                        pv->ao_off[0] = i0 - ioff;
+                                        pv->shape[0] = i1 - i0;
+                                        pv->block_quartets[0] = i;
+                                }
+                                (*fdot)(intor, jkop, v_priv, tile_dms, buf, cache, n_dm,
+                                        block_iloc+i, block_jloc+j, block_kloc+k, block_lloc+l,
+                                        vhfopt, &envs1);
+                        }
+                        for (n = 0; n < n_dm; n++) {
+                                if (v_priv[n]->stack_size >= size_limit) {
+        (*jkop[n]->write_back)(mol_vjk[n], v_priv[n], shls_slice, ao_loc,
+                               block_iloc, block_jloc, block_kloc, block_lloc);
+                                }
+                        }
+                } } }
+                for (n = 0; n < n_dm; n++) {
+                        if (v_priv[n]->stack_size > 0) {
+        (*jkop[n]->write_back)(mol_vjk[n], v_priv[n], shls_slice, ao_loc,
+                               block_iloc, block_jloc, block_kloc, block_lloc);
+                        }
+                        free(tile_dms[n]);
+                }
+        }
+        for (n = 0; n < n_dm; n++) {
+                CVHFdeallocate_JKArray(v_priv[n]);
+        }
+        free(buf);
+}
+        free(block_iloc);
 }
 
 // Divide shells into subblocks with two cutting points specified in shls_lim.
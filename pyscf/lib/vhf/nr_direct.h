@@ -76,6 +76,12 @@ void CVHFnr_direct_drv(int (*intor)(), void (*fdot)(), JKOperator **jkop,
                        int *shls_slice, int *ao_loc,
                        CINTOpt *cintopt, CVHFOpt *vhfopt,
                        int *atm, int natm, int *bas, int nbas, double *env);
+void CVHFnr_direct_batch_drv(int (*intor)(), void (*fdot)(), JKOperator **jkop,
+                             double **dms, double **vjk, int n_dm, int ncomp,
+                             int nmol, int *shls_slice, int *ao_loc,
+                             CINTOpt **cintopts, CVHFOpt **vhfopts,
+                             int **atms, int natm, int **bass, int nbas,
+                             double **envs);
 
 JKArray *CVHFallocate_JKArray(JKOperator *op, int *shls_slice, int *ao_loc,
                               int ncomp, int nblock, int size_limit);
@@ -139,6 +139,27 @@ int CVHFnrs8_vj_prescreen(int *shls, CVHFOpt *opt, int *atm, int *bas, double *e
             || (4*qijkl*opt->dm_cond[l*n+k] > direct_scf_cutoff));
 }
 
+/*
+ * Screening for the near-field part of the Coulomb matrix. The integrals
+ * between the shell pairs of two well-separated boxes are skipped. Their
+ * contributions are computed with the multipole expansion.
+ */
+int CVHFnrs8_vj_cfmm_prescreen(int *shls, CVHFOpt *opt, int *atm, int *bas, double *env)
+{
+        if (opt == NULL) {
+                return 1; // no screen
+        }
+        CVHFCFMMOpt *cfmmopt = (CVHFCFMMOpt *)opt;
+        size_t n = opt->nbas;
+        int bij = cfmmopt->pair_box[shls[0]*n+shls[1]];
+        int bkl = cfmmopt->pair_box[shls[2]*n+shls[3]];
+        if (bij >= 0 && bkl >= 0 &&
+            !cfmmopt->box_near[(size_t)bij*cfmmopt->nbox+bkl]) {
+                return 0;
+        }
+        return CVHFnrs8_vj_prescreen(shls, opt, atm, bas, env);
+}
+
 int CVHFnrs8_vk_prescreen(int *shls, CVHFOpt *opt, int *atm, int *bas, double *env)
 {
         if (opt == NULL) {
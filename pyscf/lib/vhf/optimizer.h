@@ -32,6 +32,18 @@ typedef struct CVHFOpt_struct {
                       double **dms_cond, int n_dm, double *dm_atleast,
                       int *atm, int *bas, double *env);
 } CVHFOpt;
+
+/*
+ * Near-field screening of the continuous fast multipole method. Shell pairs
+ * are assigned to boxes (pair_box, -1 for the pairs which are not assigned).
+ * The integrals between two boxes are computed only if box_near is set.
+ */
+typedef struct {
+    CVHFOpt vhfopt;
+    int nbox;
+    int *pair_box;
+    int8_t *box_near;
+} CVHFCFMMOpt;
 #endif
 
 void CVHFinit_optimizer(CVHFOpt **opt, int *atm, int natm,
@@ -44,6 +56,7 @@ int CVHFnr_schwarz_cond(int *shls, CVHFOpt *opt, int *atm, int *bas, double *env
 int CVHFnrs8_prescreen(int *shls, CVHFOpt *opt, int *atm, int *bas, double *env);
 int CVHFnrs8_vj_prescreen(int *shls, CVHFOpt *opt, int *atm, int *bas, double *env);
 int CVHFnrs8_vk_prescreen(int *shls, CVHFOpt *opt, int *atm, int *bas, double *env);
+int CVHFnrs8_vj_cfmm_prescreen(int *shls, CVHFOpt *opt, int *atm, int *bas, double *env);
 int CVHFnrs8_prescreen_block(CVHFOpt *opt, int *ishls, int *jshls, int *kshls, int *lshls);
 int CVHFnrs8_vj_prescreen_block(CVHFOpt *opt, int *ishls, int *jshls, int *kshls, int *lshls);
 int CVHFnrs8_vk_prescreen_block(CVHFOpt *opt, int *ishls, int *jshls, int *kshls, int *lshls);
@@ -35,6 +35,7 @@ import warnings
 import tempfile
 import contextlib
 import itertools
+from functools import lru_cache
 import numpy
 import h5py
 import scipy.linalg
@@ -132,10 +133,21 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
     _prefer_ccdf = False
     # If True, force using density matrix-based K-build
     force_dm_kbuild = False
+    # A KptsExecutor (see pbc.scf.kpts_parallel) to distribute the k-pairs
+    # of the K-build over processes
+    kpts_executor = None
+    # Save only the k-pairs irreducible under the space group symmetry of
+    # kpts (a KPoints object). The CDERI tensors of the other k-pairs are
+    # rotated from the irreducible ones when they are loaded.
+    cderi_ksymm = getattr(__config__, 'pbc_df_df_GDF_cderi_ksymm', False)
+    # Hold the CDERI tensor in an in-memory HDF5 file if it is small and
+    # _cderi_to_save is not specified by a file name
+    cderi_incore = getattr(__config__, 'pbc_df_df_GDF_cderi_incore', True)
 
     _keys = {
         'blockdim', 'force_dm_kbuild', 'cell', 'kpts', 'kpts_band', 'eta',
         'mesh', 'exp_to_discard', 'exxdiv', 'auxcell', 'linear_dep_threshold',
+        'kpts_executor', 'cderi_ksymm', 'cderi_incore',
     }
 
     def __init__(self, cell, kpts=None):
@@ -172,7 +184,8 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
         self._rsh_df = {}  # Range separated Coulomb DF objects
 
     __getstate__, __setstate__ = lib.generate_pickle_methods(
-            excludes=('_cderi_to_save', '_cderi', '_rsh_df'), reset_state=True)
+            excludes=('_cderi_to_save', '_cderi', '_rsh_df', 'kpts_executor'),
+            reset_state=True)
 
     @property
     def auxbasis(self):
@@ -234,6 +247,8 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
         if self.mesh is not None:
             log.info('mesh = %s (%d PWs)', self.mesh, numpy.prod(self.mesh))
         log.info('exp_to_discard = %s', self.exp_to_discard)
+        if self.cderi_ksymm:
+            log.info('cderi_ksymm = %s', self.cderi_ksymm)
         if isinstance(self._cderi, str):
             log.info('_cderi = %s  where DF integrals are loaded (readonly).',
                      self._cderi)
@@ -271,6 +286,11 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
         if with_j3c and self._cderi_to_save is not None:
             if isinstance(self._cderi_to_save, str):
                 cderi = self._cderi_to_save
+            elif self._cderi_fits_in_memory():
+                cderi = lib.H5TmpFile(dir=lib.param.TMPDIR, driver='core',
+                                      backing_store=False)
+                os.unlink(cderi.filename)
+                logger.debug(self, 'CDERI tensor is held in memory')
             else:
                 cderi = self._cderi_to_save.name
             if isinstance(self._cderi, str):
@@ -287,6 +307,26 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
             t1 = logger.timer_debug1(self, 'j3c', *t1)
         return self
 
+    def _cderi_fits_in_memory(self):
+        '''Whether the CDERI tensor can be held in an in-memory HDF5 file'''
+        cell = self.cell
+        if (not self.cderi_incore or self._prefer_ccdf or cell.omega > 0 or
+            # Other subclasses may provide builders which require a file name
+            type(self)._make_j3c is not GDF._make_j3c):
+            return False
+        nkpts = len(self.kpts)
+        if self.kpts_band is not None:
+            nkpts += len(self.kpts_band)
+        if self._j_only or nkpts == 1:
+            nkpts_pair = nkpts
+        else:
+            nkpts_pair = nkpts ** 2
+        nao = cell.nao
+        naux = self.auxcell.nao
+        mem_now = lib.current_memory()[0]
+        size = nkpts_pair * naux * nao**2 * 16e-6
+        return size < (self.max_memory - mem_now) * .2
+
     def _make_j3c(self, cell=None, auxcell=None, kptij_lst=None, cderi_file=None):
         if cell is None: cell = self.cell
         if auxcell is None: auxcell = self.auxcell
@@ -310,8 +350,25 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
         dfbuilder.mesh = self.mesh
         dfbuilder.linear_dep_threshold = self.linear_dep_threshold
         j_only = self._j_only or len(kpts_union) == 1
+
+        kpair_map = kk_idx = None
+        if self.cderi_ksymm and kptij_lst is None and not j_only:
+            if (isinstance(self._kpts, KPoints) and self.kpts_band is None and
+                cell.dimension == 3 and not cell.cart):
+                kpair_map, kk_idx = _ksymm_kpair_map(self._kpts)
+                logger.info(self, 'Save %d irreducible k-pairs of %d k-pairs',
+                            len(kk_idx), len(kpair_map))
+                # The symmetric j2c^(-1/2) keeps the CDERI tensors of all
+                # k-pairs in the same form after rotation
+                dfbuilder.j2c_symmetric = True
+            else:
+                logger.warn(self, 'cderi_ksymm requires 3D systems, spherical '
+                            'GTOs and a KPoints object for kpts. It is ignored.')
+
         dfbuilder.make_j3c(cderi_file, j_only=j_only, dataname=self._dataname,
-                           kptij_lst=kptij_lst)
+                           kptij_lst=kptij_lst, kk_idx=kk_idx)
+        if kpair_map is not None:
+            _save_ksymm(cderi_file, self._dataname, self._kpts, auxcell, kpair_map)
 
     def cderi_array(self, label=None):
         '''
@@ -458,6 +515,8 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
     # post-HF methods.
     def get_jk(self, dm, hermi=1, kpts=None, kpts_band=None,
                with_j=True, with_k=True, omega=None, exxdiv=None):
+        '''kpts can be a KPoints object for symmetry-adapted density matrices
+        in the full BZ. The k-point symmetry is used in the K-build.'''
         if omega is not None and omega != 0:  # J/K for RSH functionals
             cell = self.cell
             # * AFT is computationally more efficient than GDF if the Coulomb
@@ -472,12 +531,17 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
                 mydf = aft.AFTDF(cell, self.kpts)
                 ke_cutoff = aft.estimate_ke_cutoff_for_omega(cell, omega)
                 mydf.mesh = cell.cutoff_to_mesh(ke_cutoff)
+                if isinstance(kpts, KPoints):
+                    kpts = kpts.kpts
             else:
                 mydf = self
             with mydf.range_coulomb(omega) as rsh_df:
                 return rsh_df.get_jk(dm, hermi, kpts, kpts_band, with_j, with_k,
                                      omega=None, exxdiv=exxdiv)
 
+        kpts_symm = None
+        if isinstance(kpts, KPoints):
+            kpts_symm, kpts = kpts, kpts.kpts
         kpts, is_single_kpt = _check_kpts(self, kpts)
         if is_single_kpt:
             return df_jk.get_jk(self, dm, hermi, kpts[0], kpts_band, with_j,
@@ -485,7 +549,10 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
 
         vj = vk = None
         if with_k:
-            vk = df_jk.get_k_kpts(self, dm, hermi, kpts, kpts_band, exxdiv)
+            if kpts_symm is None:
+                vk = df_jk.get_k_kpts(self, dm, hermi, kpts, kpts_band, exxdiv)
+            else:
+                vk = df_jk.get_k_kpts(self, dm, hermi, kpts_symm, kpts_band, exxdiv)
         if with_j:
             vj = df_jk.get_j_kpts(self, dm, hermi, kpts, kpts_band)
         return vj, vk
@@ -588,22 +655,27 @@ class GDF(lib.StreamObject, aft.AFTDFMixin):
             return naux
 
         # self._cderi['j3c/k_id/seg_id']
-        with h5py.File(self._cderi, 'r') as feri:
-            key = next(iter(feri[self._dataname].keys()))
-            dat = feri[f'{self._dataname}/{key}']
+        if isinstance(self._cderi, h5py.Group):
+            feri = self._cderi
+        else:
+            feri = h5py.File(self._cderi, 'r')
+        key = next(iter(feri[self._dataname].keys()))
+        dat = feri[f'{self._dataname}/{key}']
+        if isinstance(dat, h5py.Group):
+            naux = dat['0'].shape[0]
+        else:
+            naux = dat.shape[0]
+
+        if (cell.dimension == 2 and cell.low_dim_ft_type != 'inf_vacuum' and
+            f'{self._dataname}-' in feri):
+            key = next(iter(feri[f'{self._dataname}-'].keys()))
+            dat = feri[f'{self._dataname}-/{key}']
             if isinstance(dat, h5py.Group):
-                naux = dat['0'].shape[0]
+                naux += dat['0'].shape[0]
             else:
-                naux = dat.shape[0]
-
-            if (cell.dimension == 2 and cell.low_dim_ft_type != 'inf_vacuum' and
-                f'{self._dataname}-' in feri):
-                key = next(iter(feri[f'{self._dataname}-'].keys()))
-                dat = feri[f'{self._dataname}-/{key}']
-                if isinstance(dat, h5py.Group):
-                    naux += dat['0'].shape[0]
-                else:
-                    naux += dat.shape[0]
+                naux += dat.shape[0]
+        if feri is not self._cderi:
+            feri.close()
         return naux
 
     to_gpu = lib.to_gpu
@@ -656,6 +728,10 @@ class CDERIArray:
         else:
             raise NotImplementedError
 
+        self.ksymm = None
+        if f'{label}-ksymm' in data_group:
+            self.ksymm = _KsymmRotation(data_group[f'{label}-ksymm'], self.kpts)
+
     def __del__(self):
         if not self._data_is_h5obj:
             self.data_group.close()
@@ -711,7 +787,10 @@ class CDERIArray:
 
         kikj = ki * self.nkpts + kj
         kjki = kj * self.nkpts + ki
-        if self.aosym == 's1' or kikj == kjki:
+        if self.ksymm is not None and str(kikj) not in self.j3c:
+            return _KPair3CLoader(self.j3c, ki, kj, self.nkpts, self.aosym,
+                                  self.ksymm)[slices]
+        elif self.aosym == 's1' or kikj == kjki:
             dat = self.j3c[str(kikj)]
             nsegs = len(dat)
             out = _hstack_datasets([dat[str(i)] for i in range(nsegs)], slices)
@@ -763,7 +842,10 @@ class _load3c:
         self._aosym = None
 
     def __enter__(self):
-        self.feri = h5py.File(self.cderi, 'r')
+        if isinstance(self.cderi, h5py.Group):
+            self.feri = self.cderi
+        else:
+            self.feri = h5py.File(self.cderi, 'r')
         if self.label not in self.feri:
             # Return a size-0 array to skip the loop in sr_loop
             if self.ignore_key_error:
@@ -777,7 +859,8 @@ class _load3c:
             return self.getitem(*self.kpti_kptj)
 
     def __exit__(self, type, value, traceback):
-        self.feri.close()
+        if self.feri is not self.cderi:
+            self.feri.close()
 
     @property
     def kptij_lst(self):
@@ -824,12 +907,17 @@ class _load3c:
                 kj = kj[0]
 
             key = f'{self.label}/{ki * nkpts + kj}'
+            ksymm = None
             if key not in self.feri:
-                if self.ignore_key_error:
+                if f'{self.label}-ksymm' in self.feri:
+                    # Irreducible k-pairs only
+                    ksymm = _KsymmRotation(self.feri[f'{self.label}-ksymm'], kpts)
+                elif self.ignore_key_error:
                     return numpy.zeros(0)
                 else:
                     raise KeyError(f'Key {key} not found')
-            return _KPair3CLoader(self.feri[self.label], ki, kj, nkpts, self.aosym)
+            return _KPair3CLoader(self.feri[self.label], ki, kj, nkpts,
+                                  self.aosym, ksymm)
 
         else:  # data format version 1
             return _getitem(self.feri, self.label, (kpti, kptj), self.kptij_lst,
@@ -979,7 +1067,14 @@ def _hstack_datasets(data_to_stack, slices=numpy.s_[:]):
     return out
 
 class _KPair3CLoader:
-    def __init__(self, dat, ki, kj, nkpts, aosym):
+    def __init__(self, dat, ki, kj, nkpts, aosym, ksymm=None):
+        # If the k-pair is not saved, it is rotated from an irreducible k-pair
+        self.rotation = None
+        if ksymm is not None and str(ki * nkpts + kj) not in dat:
+            ki, kj, iop = ksymm.source(ki, kj)
+            self.rotation = (ksymm, ki, kj, iop)
+        self._rotated = None
+
         self.dat = dat
         self.kikj = ki * nkpts + kj
         self.kjki = kj * nkpts + ki
@@ -988,6 +1083,14 @@ class _KPair3CLoader:
         self.aosym = aosym
 
     def __getitem__(self, s):
+        if self.rotation is None:
+            return self._load(s)
+        if self._rotated is None:
+            ksymm, ki, kj, iop = self.rotation
+            self._rotated = ksymm.rotate(ki, kj, iop, self._load(()))
+        return self._rotated[s]
+
+    def _load(self, s):
         if self.aosym == 's1' or self.kikj == self.kjki:
             dat = self.dat[str(self.kikj)]
             out = _hstack_datasets([dat[str(i)] for i in range(self.nsegs)], s)
@@ -1024,6 +1127,121 @@ class _KPair3CLoader:
             nao = int((nao_pair * 2)**.5)
             return (naux, nao*nao)
 
+def _ksymm_kpair_map(kpts_symm):
+    '''The k-pairs irreducible under the spatial symmetry operations of
+    kpts_symm (KPoints object).
+
+    Returns:
+        kpair_map : (nkpts**2, 2) array
+            kpair_map[ki*nkpts+kj] = (kk, iop) means that k-pair (ki,kj) is
+            obtained by applying operation kpts_symm.ops[iop] to the
+            irreducible k-pair kk.
+        kk_idx : 1D array
+            The irreducible k-pairs. (kj,ki) is included for every (ki,kj)
+            so that the CDERI tensors can be saved in the s2 format.
+    '''
+    k2opk = kpts_symm.k2opk
+    nkpts = k2opk.shape[0]
+    ops = numpy.array([iop for iop in range(kpts_symm.nop)
+                       if (k2opk[:,iop] >= 0).all()])
+    iop_eye = [iop for iop in ops if kpts_symm.ops[iop].is_eye][0]
+    kpair_map = numpy.full((nkpts**2, 2), -1, dtype=numpy.int64)
+    kk_idx = []
+    for ki, kj in itertools.product(range(nkpts), range(nkpts)):
+        if kpair_map[ki*nkpts+kj,0] >= 0:
+            continue
+        for kk in {ki*nkpts+kj, kj*nkpts+ki}:
+            orbit = k2opk[kk//nkpts,ops] * nkpts + k2opk[kk%nkpts,ops]
+            orbit, idx = numpy.unique(orbit, return_index=True)
+            mask = kpair_map[orbit,0] < 0
+            kpair_map[orbit[mask],0] = kk
+            kpair_map[orbit[mask],1] = ops[idx[mask]]
+            kpair_map[kk] = (kk, iop_eye)
+            kk_idx.append(kk)
+    return kpair_map, numpy.sort(kk_idx)
+
+def _save_ksymm(cderi_file, dataname, kpts_symm, auxcell, kpair_map):
+    '''Save the information to rotate the irreducible k-pairs'''
+    cell = kpts_symm.cell
+    ops = numpy.array([numpy.vstack([op.rot, op.trans]) for op in kpts_symm.ops])
+    if isinstance(cderi_file, h5py.Group):
+        feri = cderi_file
+    else:
+        feri = h5py.File(cderi_file, 'a')
+    key = f'{dataname}-ksymm'
+    if key in feri:
+        del feri[key]
+    feri[f'{key}/kpair_map'] = kpair_map
+    feri[f'{key}/ops'] = ops.astype(numpy.double)
+    feri[f'{key}/cell'] = cell.dumps()
+    feri[f'{key}/auxcell'] = auxcell.dumps()
+    if feri is not cderi_file:
+        feri.close()
+
+class _KsymmRotation:
+    '''Rotate the CDERI tensor of an irreducible k-pair to the symmetry
+    related k-pairs. With the symmetric j2c^(-1/2)
+
+        L(g ki, g kj) = D_aux L(ki, kj) [R(ki) . R(kj)^dagger]
+
+    R and D_aux are the rotation matrices of AOs and auxiliary basis.
+    '''
+    def __init__(self, h5group, kpts):
+        self.kpair_map = h5group['kpair_map'][()]
+        self.cell, self.auxcell, self.ops, self.Dmats = _load_ksymm_ops(
+            h5group['cell'][()], h5group['auxcell'][()], h5group['ops'][()].tobytes())
+        self.kpts_scaled = self.cell.get_scaled_kpts(kpts)
+
+    def source(self, ki, kj):
+        '''The irreducible k-pair and the operation to generate (ki,kj)'''
+        nkpts = len(self.kpts_scaled)
+        kk, iop = self.kpair_map[ki * nkpts + kj]
+        return kk // nkpts, kk % nkpts, iop
+
+    def rotate(self, ki, kj, iop, cderi):
+        '''Apply operation iop to the CDERI tensor of k-pair (ki,kj)'''
+        from pyscf.pbc.symm.symmetry import _get_rotation_mat
+        cell = self.cell
+        auxcell = self.auxcell
+        op = self.ops[iop]
+        Dmats = self.Dmats[iop]
+        kpts_scaled = self.kpts_scaled
+        nao = cell.nao
+        naux = cderi.shape[0]
+        is_tril = cderi.shape[1] != nao**2
+        if is_tril:
+            cderi = lib.unpack_tril(cderi)
+        cderi = cderi.reshape(naux, nao, nao)
+
+        rot_i = _get_rotation_mat(cell, kpts_scaled[ki], cderi[0], op, Dmats)
+        rot_j = _get_rotation_mat(cell, kpts_scaled[kj], cderi[0], op, Dmats)
+        rot_aux = _get_rotation_mat(auxcell, kpts_scaled[kj] - kpts_scaled[ki],
+                                    cderi[:,0], op, Dmats)
+        out = lib.einsum('ij,Pjk,lk->Pil', rot_i, cderi, rot_j.conj())
+        out = lib.dot(rot_aux, out.reshape(naux, nao*nao))
+        if cderi.dtype == numpy.double:
+            out = out.real
+        if is_tril:
+            out = lib.pack_tril(out.reshape(naux, nao, nao))
+        return out
+
+@lru_cache(4)
+def _load_ksymm_ops(cell_str, auxcell_str, ops):
+    from pyscf.pbc.gto.cell import loads
+    from pyscf.pbc.symm.space_group import SPGElement
+    from pyscf.pbc.symm.symmetry import make_Dmats
+    if isinstance(cell_str, bytes):
+        cell_str = cell_str.decode()
+    if isinstance(auxcell_str, bytes):
+        auxcell_str = auxcell_str.decode()
+    cell = loads(cell_str)
+    auxcell = loads(auxcell_str)
+    ops = numpy.frombuffer(ops).reshape(-1,4,3)
+    ops = [SPGElement(op[:3].round().astype(int), op[3]) for op in ops]
+    l_max = max(cell._bas[:,gto.ANG_OF].max(), auxcell._bas[:,gto.ANG_OF].max())
+    Dmats = make_Dmats(cell, [op.a2r(cell).rot for op in ops], l_max)[0]
+    return cell, auxcell, ops, Dmats
+
 def _gaussian_int(cell):
     r'''Regular gaussian integral \int g(r) dr^3'''
     return ft_ao.ft_ao(cell, numpy.zeros((1,3)))[0].real
@@ -29,6 +29,8 @@ from pyscf import lib
 from pyscf.lib import logger, zdotNN, zdotCN, zdotNC
 from pyscf.pbc import tools
 from pyscf.pbc.lib.kpts_helper import is_zero, gamma_point, member, get_kconserv_ria
+from pyscf.pbc.lib.kpts import KPoints
+from pyscf.pbc.symm.symmetry import _get_rotation_mat
 from pyscf import __config__
 
 DM2MO_PREC = getattr(__config__, 'pbc_gto_df_df_jk_dm2mo_prec', 1e-10)
@@ -280,8 +282,18 @@ def get_j_kpts_kshift(mydf, dm_kpts, kshift, hermi=0, kpts=numpy.zeros((1,3)), k
 
 def get_k_kpts(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), kpts_band=None,
                exxdiv=None):
+    '''Exchange matrices for the density matrices of all k-points in kpts.
+
+    If kpts is a KPoints object, dm_kpts needs to be the symmetry-adapted
+    density matrices in the full BZ. The exchange matrices at kpts_band are
+    then evaluated with the k-pairs irreducible under the little co-group of
+    each band k-point.
+    '''
     cell = mydf.cell
     log = logger.Logger(mydf.stdout, mydf.verbose)
+    kpts_symm = None
+    if isinstance(kpts, KPoints):
+        kpts_symm, kpts = kpts, kpts.kpts
 
     if exxdiv is not None and exxdiv != 'ewald':
         log.warn('GDF does not support exxdiv %s. '
@@ -301,6 +313,67 @@ def get_k_kpts(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), kpts_band=None,
                  'df.j_only cannot be used with hybrid functional. DF integrals will be rebuilt.')
         mydf.build(j_only=False, kpts_band=kpts_band)
 
+    executor = getattr(mydf, 'kpts_executor', None)
+    if executor is None or executor.size == 1:
+        vkR, vkI = _get_k_kpairs(mydf, dm_kpts, hermi, kpts, kpts_band,
+                                 kpts_symm=kpts_symm)
+    elif executor.pickle_tasks and not isinstance(mydf._cderi, str):
+        log.debug('DF integrals are not saved in a file. '
+                  'K-pairs are not distributed over processes')
+        vkR, vkI = _get_k_kpairs(mydf, dm_kpts, hermi, kpts, kpts_band,
+                                 kpts_symm=kpts_symm)
+    else:
+        nworkers = executor.size
+        log.debug1('get_k_kpts: distribute k-pairs over %d workers', nworkers)
+        vkR, vkI = executor.map_sum(
+            _get_k_kpairs_task, [mydf] * nworkers, [mydf._cderi] * nworkers,
+            [dm_kpts] * nworkers, [hermi] * nworkers, [kpts] * nworkers,
+            [kpts_band] * nworkers, range(nworkers), [nworkers] * nworkers,
+            [kpts_symm] * nworkers)
+
+    dm_kpts = lib.asarray(dm_kpts, order='C')
+    dms = _format_dms(dm_kpts, kpts)
+    nkpts = len(kpts)
+    kpts_band, input_band = _format_kpts_band(kpts_band, kpts), kpts_band
+
+    if (gamma_point(kpts) and gamma_point(kpts_band) and
+        not numpy.iscomplexobj(dm_kpts)):
+        vk_kpts = vkR
+    else:
+        vk_kpts = vkR + vkI * 1j
+    vk_kpts *= 1./nkpts
+
+    if exxdiv == 'ewald' and cell.dimension != 0:
+        # Integrals are computed analytically in GDF and RSJK.
+        # Finite size correction for exx is not needed.
+        _ewald_exxdiv_for_G0(cell, kpts, dms, vk_kpts, kpts_band)
+
+    log.timer('get_k_kpts', *t0)
+
+    return _format_jks(vk_kpts, dm_kpts, input_band, kpts)
+
+def _get_k_kpairs_task(mydf, cderi, dm_kpts, hermi, kpts, kpts_band,
+                       owner, nowners, kpts_symm=None):
+    '''The k-pairs of get_k_kpts assigned to one worker'''
+    if mydf._cderi is None:
+        # _cderi is not pickled when mydf is sent to another process
+        mydf._cderi = cderi
+    return numpy.stack(_get_k_kpairs(mydf, dm_kpts, hermi, kpts, kpts_band,
+                                     (owner, nowners), kpts_symm))
+
+def _get_k_kpairs(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)),
+                  kpts_band=None, kpair_owner=None, kpts_symm=None):
+    '''Real and imaginary parts of the exchange matrices of get_k_kpts,
+    without the 1/nkpts normalization and the exxdiv correction.
+
+    kpair_owner = (owner, nowners) restricts the evaluation to the k-pairs
+    assigned to owner. K-pairs are assigned to owners round-robin.
+
+    kpts_symm (KPoints object) enables the k-point symmetry for band k-points.
+    '''
+    cell = mydf.cell
+    log = logger.Logger(mydf.stdout, mydf.verbose)
+
     mo_coeff = getattr(dm_kpts, 'mo_coeff', None)
     if mo_coeff is not None:
         mo_occ = dm_kpts.mo_occ
@@ -341,7 +414,7 @@ def get_k_kpts(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), kpts_band=None,
                            'Fall back to DM-based build.', skmoR[0,0].shape[1], nao)
                 skmoR = skmo2R = None
 
-    kpts_band, input_band = _format_kpts_band(kpts_band, kpts), kpts_band
+    kpts_band = _format_kpts_band(kpts_band, kpts)
     nband = len(kpts_band)
     vkR = numpy.zeros((nset,nband,nao,nao))
     vkI = numpy.zeros((nset,nband,nao,nao))
@@ -623,12 +696,42 @@ def get_k_kpts(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), kpts_band=None,
                 LpqR = LpqI = pLqR = pLqI = tmp1R = tmp1I = tmp2R = tmp2I = None
 
     t1 = (logger.process_clock(), logger.perf_counter())
+    if kpair_owner is not None:
+        owner, nowners = kpair_owner
+        kpair_count = [0]
+        make_kpt_owned = make_kpt
+        def make_kpt(*args):
+            if kpair_count[0] % nowners == owner:
+                make_kpt_owned(*args)
+            kpair_count[0] += 1
+
     if kpts_band is kpts:  # normal k-points HF/DFT
         for ki in range(nkpts):
             for kj in range(ki):
                 make_kpt(ki, kj, True)
             make_kpt(ki, ki, False)
             t1 = log.timer_debug1('get_k_kpts: make_kpt ki>=kj (%d,*)'%ki, *t1)
+    elif kpts_symm is not None:
+        # K(g ki, kj) = R_g K(ki, kj) R_g^dagger for the operations g of the
+        # little co-group of the band k-point kj. K(ki, kj) is computed for
+        # one k-point ki of each orbit of the little co-group.
+        for kj in range(nband):
+            idx = member(kpts_band[kj], kpts)
+            if len(idx) == 0:
+                for ki in range(nkpts):
+                    make_kpt(ki, kj, False)
+                continue
+
+            orbits = _little_cogroup_orbits(kpts_symm, idx[0])
+            log.debug2('get_k_kpts: band k-point %d, %d k-pairs', kj, len(orbits))
+            vk = numpy.zeros((nset,nao,nao), dtype=numpy.complex128)
+            for ki, ops in orbits:
+                vkR[:,kj] = vkI[:,kj] = 0
+                make_kpt(ki, kj, False)
+                vk += _rotate_k(kpts_symm, idx[0], ops, vkR[:,kj] + vkI[:,kj] * 1j)
+            vkR[:,kj] = vk.real
+            vkI[:,kj] = vk.imag
+            t1 = log.timer_debug1('get_k_kpts: make_kpt (*,%d)'%kj, *t1)
     else:
         idx_in_kpts = []
         for kpt in kpts_band:
@@ -662,22 +765,46 @@ def get_k_kpts(mydf, dm_kpts, hermi=1, kpts=numpy.zeros((1,3)), kpts_band=None,
     for tspan, tspanname in zip(tspans,tspannames):
         log.debug1('    CPU time for %s %10.2f sec, wall time %10.2f sec',
                    tspanname, *tspan)
+    return vkR, vkI
 
-    if (gamma_point(kpts) and gamma_point(kpts_band) and
-        not numpy.iscomplexobj(dm_kpts)):
-        vk_kpts = vkR
-    else:
-        vk_kpts = vkR + vkI * 1j
-    vk_kpts *= 1./nkpts
-
-    if exxdiv == 'ewald' and cell.dimension != 0:
-        # Integrals are computed analytically in GDF and RSJK.
-        # Finite size correction for exx is not needed.
-        _ewald_exxdiv_for_G0(cell, kpts, dms, vk_kpts, kpts_band)
-
-    log.timer('get_k_kpts', *t0)
+def _little_cogroup_orbits(kpts_symm, kj):
+    '''The orbits of the k-points under the little co-group of k-point kj.
+    Only the spatial operations which map the k-mesh onto itself are
+    considered.
 
-    return _format_jks(vk_kpts, dm_kpts, input_band, kpts)
+    Returns:
+        A list of (ki, ops) for each orbit. ki is a k-point of the orbit.
+        ops[n] is the index of the operation which maps ki to the n-th
+        k-point of the orbit.
+    '''
+    k2opk = kpts_symm.k2opk
+    nkpts = k2opk.shape[0]
+    ops = [iop for iop in range(kpts_symm.nop)
+           if k2opk[kj,iop] == kj and (k2opk[:,iop] >= 0).all()]
+    visited = numpy.zeros(nkpts, dtype=bool)
+    orbits = []
+    for ki in range(nkpts):
+        if not visited[ki]:
+            kis, idx = numpy.unique(k2opk[ki,ops], return_index=True)
+            visited[kis] = True
+            orbits.append((ki, [ops[i] for i in idx]))
+    return orbits
+
+def _rotate_k(kpts_symm, kj, ops, vk):
+    '''sum_g R_g vk R_g^dagger for the operations g of the little co-group
+    of k-point kj'''
+    cell = kpts_symm.cell
+    kpt_scaled = kpts_symm.kpts_scaled[kj]
+    out = numpy.zeros_like(vk)
+    for iop in ops:
+        op = kpts_symm.ops[iop]
+        if op.is_eye:
+            out += vk
+        else:
+            mat = _get_rotation_mat(cell, kpt_scaled, vk[0], op,
+                                    kpts_symm.Dmats[iop])
+            out += lib.einsum('pq,nqr,sr->nps', mat, vk, mat.conj())
+    return out
 
 def get_k_kpts_kshift(mydf, dm_kpts, kshift, hermi=0, kpts=numpy.zeros((1,3)), kpts_band=None,
                       exxdiv=None):
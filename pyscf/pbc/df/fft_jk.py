@@ -243,14 +243,18 @@ def get_k_kpts(mydf, dm_kpts, hermi=1, kpts=np.zeros((1,3)), kpts_band=None,
                     for k, occ in enumerate(mo_occ)]
         ao2_kpts = [np.dot(mo_coeff[k].T, ao) for k, ao in enumerate(ao2_kpts)]
 
+    #ao1_dtype = np.result_type(*ao1_kpts)
+    #ao2_dtype = np.result_type(*ao2_kpts)
+    vR_dm = np.empty((nset,nao,ngrids), dtype=vk_kpts.dtype)
+
+    # The pair densities of blksize rows are transformed in one batched FFT
+    # call. rho1, vG and vR are the intermediates of size blksize*naoj*ngrids
+    naoj = max(1, max(ao.shape[0] for ao in ao2_kpts))
     mem_now = lib.current_memory()[0]
     max_memory = mydf.max_memory - mem_now
-    blksize = int(min(nao, max(1, (max_memory-mem_now)*1e6/16/4/ngrids/nao)))
+    blksize = int(min(nao, max(1, max_memory*1e6/16/4/ngrids/naoj)))
     logger.debug1(mydf, 'fft_jk: get_k_kpts max_memory %s  blksize %d',
                   max_memory, blksize)
-    #ao1_dtype = np.result_type(*ao1_kpts)
-    #ao2_dtype = np.result_type(*ao2_kpts)
-    vR_dm = np.empty((nset,nao,ngrids), dtype=vk_kpts.dtype)
 
     t1 = (logger.process_clock(), logger.perf_counter())
     for k2, ao2T in enumerate(ao2_kpts):
@@ -72,6 +72,10 @@ class _RSGDFBuilder(Int3cBuilder):
     # decomposition (ED); otherwise, Cholesky decomposition (CD) is used
     # first, and ED is called only if CD fails.
     j2c_eig_always = False
+    # set True to use the symmetric orthogonalization
+    # j2c^(-1/2) = U s^(-1/2) U^dagger. The CDERI tensors then transform in
+    # the same way as the 3-center integrals under space group operations.
+    j2c_symmetric = False
     linear_dep_threshold = LINEAR_DEP_THR
 
     _keys = {
@@ -214,7 +218,9 @@ class _RSGDFBuilder(Int3cBuilder):
 
     def decompose_j2c(self, j2c):
         j2c = np.asarray(j2c)
-        if self.j2c_eig_always:
+        if self.j2c_symmetric:
+            return self.symmetric_decomposed_metric(j2c)
+        elif self.j2c_eig_always:
             return self.eigenvalue_decomposed_metric(j2c)
         else:
             return self.cholesky_decomposed_metric(j2c)
@@ -245,6 +251,28 @@ class _RSGDFBuilder(Int3cBuilder):
         j2ctag = 'ED'
         return j2c, j2c_negative, j2ctag
 
+    def symmetric_decomposed_metric(self, j2c):
+        cell = self.cell
+        j2c_negative = None
+        w, v = scipy.linalg.eigh(j2c)
+        if w[0] > 0:
+            # Positive definite metric. Keep all functions as the Cholesky
+            # decomposition does
+            mask = w > 0
+        else:
+            mask = w > self.linear_dep_threshold
+        logger.debug(self, 'cond = %.4g, drop %d bfns',
+                     w[-1]/w[0], w.size-np.count_nonzero(mask))
+        v1 = v[:,mask]
+        j2c = lib.dot(v1 / np.sqrt(w[mask]), v1.conj().T)
+        if cell.dimension == 2 and cell.low_dim_ft_type != 'inf_vacuum':
+            idx = np.where(w < -self.linear_dep_threshold)[0]
+            if len(idx) > 0:
+                v1 = v[:,idx]
+                j2c_negative = lib.dot(v1 / np.sqrt(-w[idx]), v1.conj().T)
+        j2ctag = 'ED'
+        return j2c, j2c_negative, j2ctag
+
     def get_2c2e(self, uniq_kpts):
         # j2c ~ (-kpt_ji | kpt_ji) => hermi=1
         cell = self.cell
@@ -369,18 +397,6 @@ class _RSGDFBuilder(Int3cBuilder):
             shls_slice :
                 Indicate the shell slices in the primitive cell
         '''
-        # The ideal way to hold the temporary integrals is to store them in the
-        # cderi_file and overwrite them inplace in the second pass.  The current
-        # HDF5 library does not have an efficient way to manage free space in
-        # overwriting.  It often leads to the cderi_file ~2 times larger than the
-        # necessary size.  For now, dumping the DF integral intermediates to a
-        # separated temporary file can avoid this issue.  The DF intermediates may
-        # be terribly huge. The temporary file should be placed in the same disk
-        # as cderi_file.
-        fswap = lib.H5TmpFile(dir=os.path.dirname(cderi_file), prefix='.outcore_auxe2_swap')
-        # Unlink swapfile to avoid trash files
-        os.unlink(fswap.filename)
-
         log = logger.new_logger(self)
         cell = self.cell
         rs_cell = self.rs_cell
@@ -444,6 +460,31 @@ class _RSGDFBuilder(Int3cBuilder):
             if merge_dd and kk_idx is None:
                 kpt_ij_iters = list(kk_adapted_iter(cell, kpts))
 
+        swap_size = len(kikj_idx) * nao_pair * naux * 16e-6
+        swap_incore = swap_size < (self.max_memory - lib.current_memory()[0]) * .2
+
+        # The ideal way to hold the temporary integrals is to store them in the
+        # cderi_file and overwrite them inplace in the second pass.  The current
+        # HDF5 library does not have an efficient way to manage free space in
+        # overwriting.  It often leads to the cderi_file ~2 times larger than the
+        # necessary size.  For now, dumping the DF integral intermediates to a
+        # separated temporary file can avoid this issue.  The DF intermediates may
+        # be terribly huge. The temporary file should be placed in the same disk
+        # as cderi_file.
+        if isinstance(cderi_file, h5py.Group):
+            swap_dir = lib.param.TMPDIR
+        else:
+            swap_dir = os.path.dirname(cderi_file)
+        if swap_incore:
+            # Small intermediates are held in memory
+            log.debug1('outcore_auxe2 swap (%.1f MB) in memory', swap_size)
+            fswap = lib.H5TmpFile(dir=swap_dir, prefix='.outcore_auxe2_swap',
+                                  driver='core', backing_store=False)
+        else:
+            fswap = lib.H5TmpFile(dir=swap_dir, prefix='.outcore_auxe2_swap')
+        # Unlink swapfile to avoid trash files
+        os.unlink(fswap.filename)
+
         for idx in kikj_idx:
             fswap.create_dataset(f'{dataname}R/{idx}', shape, 'f8')
             fswap.create_dataset(f'{dataname}I/{idx}', shape, 'f8')
@@ -468,6 +509,8 @@ class _RSGDFBuilder(Int3cBuilder):
         mem_now = lib.current_memory()[0]
         log.debug2('memory = %s', mem_now)
         max_memory = max(2000, self.max_memory-mem_now)
+        if swap_incore:
+            max_memory -= swap_size
 
         # split the 3-center tensor (nkpts_ij, i, j, aux) along shell i.
         # plus 1 to ensure the intermediates in libpbc do not overflow
@@ -887,7 +930,17 @@ class _RSGDFBuilder(Int3cBuilder):
                 yield -kpt, kpt_ji_idx, _conj_j2c(cd_j2c)
 
     def make_j3c(self, cderi_file, intor='int3c2e', aosym='s2', comp=None,
-                 j_only=False, dataname='j3c', shls_slice=None, kptij_lst=None):
+                 j_only=False, dataname='j3c', shls_slice=None, kptij_lst=None,
+                 kk_idx=None):
+        '''
+        Kwargs:
+            kptij_lst : (nkptij, 2, 3) array
+                The k-point pairs to evaluate.
+            kk_idx : 1D array of int
+                ki*nkpts+kj, the indices of the k-point pairs to evaluate. For
+                aosym='s2', the pairs must be closed under the swap of ki and
+                kj.
+        '''
         if self.rs_cell is None:
             self.build()
         log = logger.new_logger(self)
@@ -914,19 +967,22 @@ class _RSGDFBuilder(Int3cBuilder):
                 msg = f'some k-points in kptij_lst are not found in {self}.kpts'
                 raise RuntimeError(msg)
             kk_idx = ki_idx * nkpts + kj_idx
-        else:
-            kk_idx = None
+        elif kk_idx is not None:
+            kk_idx = np.asarray(kk_idx, dtype=np.int32)
 
-        if h5py.is_hdf5(cderi_file):
+        if isinstance(cderi_file, h5py.Group):
+            # An opened HDF5 file, e.g. the in-memory CDERI tensor of GDF
+            feri = cderi_file
+        elif h5py.is_hdf5(cderi_file):
             feri = lib.H5FileWrap(cderi_file, 'a')
-            if 'kpts' in feri:
-                del feri['kpts']
-                del feri['aosym']
-            if dataname in feri:
-                log.warn(f'Overwritting {dataname} in {cderi_file}.')
-                del feri[dataname]
         else:
             feri = lib.H5FileWrap(cderi_file, 'w')
+        if 'kpts' in feri:
+            del feri['kpts']
+            del feri['aosym']
+        if dataname in feri:
+            log.warn(f'Overwritting {dataname} in {cderi_file}.')
+            del feri[dataname]
         feri['kpts'] = kpts
         feri['aosym'] = aosym
 
@@ -1005,7 +1061,8 @@ class _RSGDFBuilder(Int3cBuilder):
                 in self.gen_uniq_kpts_groups(j_only, fswap, kk_idx=kk_idx):
             make_cderi(kpt, kpt_ij_idx, cd_j2c)
 
-        feri.close()
+        if feri is not cderi_file:
+            feri.close()
         cpu1 = log.timer('pass2: AFT int3c2e', *cpu1)
         return self
 
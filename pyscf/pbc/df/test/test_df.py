@@ -14,8 +14,10 @@
 
 import unittest
 import tempfile
+import itertools
 import numpy
 import numpy as np
+import h5py
 from pyscf import lib
 import pyscf.pbc
 from pyscf import ao2mo, gto
@@ -308,6 +310,58 @@ Li  P
                     ref = FFTDF(cell, kpts).get_eri(kpts[[i,j,k,l]])
                     self.assertAlmostEqual(abs(dat-ref).max(), 0, 2)
 
+    def test_cderi_ksymm(self):
+        cell = pgto.M(
+            a = np.eye(3) * 3,
+            atom = '''H 0 0 0; H 1.5 1.5 1.5''',
+            basis = [[0, [.5, 1]], [1, [.7, 1]]],
+            space_group_symmetry = True,
+        )
+        kpts = cell.make_kpts([2,2,2], space_group_symmetry=True)
+        auxbasis = [[0, [1, 1]], [0, [1.4, 1]], [1, [1.2, 1]], [2, [1.4, 1]]]
+        ref = df.GDF(cell, kpts.kpts).set(auxbasis=auxbasis).cderi_array()
+        mydf = df.GDF(cell, kpts).set(auxbasis=auxbasis, cderi_ksymm=True)
+        cderi = mydf.cderi_array()
+        self.assertTrue(len(cderi.j3c) < 64)
+
+        def load(cderi, ki, kj):
+            dat = cderi[ki,kj]
+            if dat.shape[1] != cell.nao**2:
+                dat = lib.unpack_tril(dat).reshape(len(dat), -1)
+            return dat
+        Lpq = {(ki, kj): load(cderi, ki, kj) for ki in range(8) for kj in range(8)}
+        Lpq_ref = {(ki, kj): load(ref, ki, kj) for ki in range(8) for kj in range(8)}
+        # The decompositions of the metric are different. Compare the ERIs
+        # (ki,kj|kk,kl) of all momentum-conserving k-points
+        kconserv = get_kconserv(cell, kpts.kpts)
+        for ki, kj, kk in itertools.product(range(8), repeat=3):
+            kl = kconserv[ki,kj,kk]
+            eri = Lpq[ki,kj].T.dot(Lpq[kk,kl])
+            eri_ref = Lpq_ref[ki,kj].T.dot(Lpq_ref[kk,kl])
+            self.assertAlmostEqual(abs(eri - eri_ref).max(), 0, 9)
+
+    def test_cderi_incore(self):
+        cell = pgto.M(a=np.eye(3)*3, atom='He 0 0 0; He 1.5 1.5 1.5',
+                      basis=[[0, [.5, 1]], [1, [.7, 1]]])
+        kpts = cell.make_kpts([2,1,1])
+        auxbasis = [[0, [1, 1]], [1, [1.2, 1]], [2, [1.4, 1]]]
+        mydf = df.GDF(cell, kpts).set(auxbasis=auxbasis).build()
+        self.assertTrue(isinstance(mydf._cderi, h5py.File))
+        self.assertEqual(mydf._cderi.driver, 'core')
+
+        ref = df.GDF(cell, kpts).set(auxbasis=auxbasis, cderi_incore=False).build()
+        self.assertTrue(isinstance(ref._cderi, str))
+        self.assertEqual(mydf.get_naoaux(), ref.get_naoaux())
+        cderi, cderi_ref = mydf.cderi_array(), ref.cderi_array()
+        for ki, kj in itertools.product(range(len(kpts)), repeat=2):
+            self.assertAlmostEqual(abs(cderi[ki,kj] - cderi_ref[ki,kj]).max(), 0, 12)
+
+        dm = pscf.KRHF(cell, kpts).get_init_guess()
+        vj, vk = mydf.get_jk(dm, kpts=kpts)
+        vj_ref, vk_ref = ref.get_jk(dm, kpts=kpts)
+        self.assertAlmostEqual(abs(vj - vj_ref).max(), 0, 12)
+        self.assertAlmostEqual(abs(vk - vk_ref).max(), 0, 12)
+
 if __name__ == '__main__':
     print("Full Tests for df")
     unittest.main()
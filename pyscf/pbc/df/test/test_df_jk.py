@@ -322,6 +322,30 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(lib.fp(vk[6]), (0.92184754518871648-0.012035727588110348j), 6)
         self.assertAlmostEqual(lib.fp(vk[7]), (0.8518483148628242 +0.010084767506077213j), 6)
 
+    def test_k_kpts_ksymm(self):
+        cell = pgto.Cell()
+        cell.atom = 'Si 0. 0. 0.; Si 1.3467560987 1.3467560987 1.3467560987'
+        cell.a = [[0., 2.6935121974, 2.6935121974],
+                  [2.6935121974, 0., 2.6935121974],
+                  [2.6935121974, 2.6935121974, 0.]]
+        cell.basis = 'gth-szv'
+        cell.pseudo = 'gth-pade'
+        cell.space_group_symmetry = True
+        cell.build()
+        kpts = cell.make_kpts([2,2,2], space_group_symmetry=True,
+                              time_reversal_symmetry=True)
+        mf = pscf.KRHF(cell, kpts).density_fit()
+        dm = kpts.transform_dm(mf.get_init_guess())
+        mydf = mf.with_df
+        ref = df_jk.get_k_kpts(mydf, dm, 1, kpts.kpts, kpts.kpts_ibz)
+        vk = df_jk.get_k_kpts(mydf, dm, 1, kpts, kpts.kpts_ibz)
+        self.assertAlmostEqual(abs(vk - ref).max(), 0, 8)
+
+        kpts_band = kpts.kpts[[3,5,6]]
+        ref = df_jk.get_k_kpts(mydf, dm, 1, kpts.kpts, kpts_band)
+        vk = df_jk.get_k_kpts(mydf, dm, 1, kpts, kpts_band)
+        self.assertAlmostEqual(abs(vk - ref).max(), 0, 8)
+
 
 if __name__ == '__main__':
     print("Full Tests for df_jk")
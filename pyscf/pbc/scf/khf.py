@@ -750,6 +750,10 @@ class KSCF(pbchf.SCF):
         from pyscf.pbc.scf import newton_ah
         return newton_ah.newton(self)
 
+    def kpts_parallel(self, nproc=None, comm=None):
+        from pyscf.pbc.scf import kpts_parallel
+        return kpts_parallel.kpts_parallel(self, nproc, comm)
+
     def sfx2c1e(self):
         from pyscf.pbc.x2c import sfx2c1e
         return sfx2c1e.sfx2c1e(self)
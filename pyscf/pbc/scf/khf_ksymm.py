@@ -128,6 +128,12 @@ def ksymm_scf_common_init(kmf, cell, kpts, use_ao_symmetry=True):
     return kmf
 
 
+def _ksymm_jk(with_df):
+    '''Whether the J/K builder takes the KPoints object to exploit the k-point
+    symmetry'''
+    from pyscf.pbc.df import df, mdf
+    return isinstance(with_df, df.GDF) and not isinstance(with_df, mdf.MDF)
+
 class KsymAdaptedKSCF(khf.KSCF):
     """
     KRHF with k-point symmetry
@@ -247,6 +253,9 @@ class KsymAdaptedKSCF(khf.KSCF):
         cpu0 = (logger.process_clock(), logger.perf_counter())
         if self.rsjk:
             raise NotImplementedError('rsjk with k-points symmetry')
+        elif _ksymm_jk(self.with_df):
+            vj, vk = self.with_df.get_jk(dm_kpts, hermi, kpts, kpts_band,
+                                         with_j, with_k, omega, exxdiv=self.exxdiv)
         else:
             vj, vk = self.with_df.get_jk(dm_kpts, hermi, kpts.kpts, kpts_band,
                                          with_j, with_k, omega, exxdiv=self.exxdiv)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# Copyright 2014-2024 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+Distribute the k-point loops of KSCF methods over processes
+
+The diagonalization of the Fock matrices, the construction of the density
+matrices and the k-pair loops of the GDF exchange matrix
+(pbc.df.df_jk.get_k_kpts) are distributed over the workers of a
+KptsExecutor. The workers are the processes of a local process pool or the
+ranks of an MPI communicator (requires mpi4py).
+
+The occupation numbers (including the Fermi level search of smearing) only
+need the orbital energies of all k-points. They are evaluated on every
+process.
+
+Examples::
+
+    from pyscf.pbc import gto, scf
+    from pyscf.pbc.scf import kpts_parallel
+    if __name__ == '__main__':
+        cell = gto.M(...)
+        mf = scf.KRHF(cell, cell.make_kpts([4,4,4])).density_fit()
+        mf = kpts_parallel.kpts_parallel(mf, nproc=4)
+        mf.kernel()
+
+The local process pool starts new Python interpreters which import the main
+module of the input script. The main module needs the guard
+``if __name__ == '__main__'``.
+
+With MPI, every rank runs the same input script
+(mpirun -n 4 python input.py) and the communicator is passed to the driver::
+
+    from mpi4py import MPI
+    mf = kpts_parallel.kpts_parallel(mf, comm=MPI.COMM_WORLD)
+'''
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+from pyscf import lib
+from pyscf.lib import logger
+from pyscf.pbc.scf import khf
+
+
+class KptsExecutor:
+    '''Evaluate the tasks of k-point loops in the current process'''
+
+    size = 1
+    rank = 0
+    # Whether the arguments of tasks are sent to other processes by pickle
+    pickle_tasks = False
+
+    def map(self, fn, *iterables):
+        '''Evaluate fn for the arguments in iterables. Returns a list of the
+        results in the order of the arguments.'''
+        return list(map(fn, *iterables))
+
+    def map_sum(self, fn, *iterables):
+        '''Sum over the results (ndarrays) of fn for the arguments in
+        iterables'''
+        out = 0
+        for r in self.map(fn, *iterables):
+            out += r
+        return out
+
+    def shutdown(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.shutdown()
+
+class ProcessPoolKptsExecutor(KptsExecutor):
+    '''Evaluate the tasks of k-point loops in a pool of local processes.
+
+    Attributes:
+        size : int
+            Number of processes. Default is the number of CPUs.
+        threads_per_proc : int
+            Number of OpenMP threads in each process. By default, the threads
+            of the current process are evenly divided among the processes.
+    '''
+
+    pickle_tasks = True
+
+    def __init__(self, nproc=None, threads_per_proc=None):
+        if nproc is None:
+            nproc = os.cpu_count()
+        if threads_per_proc is None:
+            threads_per_proc = max(1, lib.num_threads() // nproc)
+        self.size = nproc
+        self.threads_per_proc = threads_per_proc
+        self._pool = None
+
+    def map(self, fn, *iterables):
+        if self._pool is None:
+            # The OpenMP runtime is not safe in processes forked from a parent
+            # which has used OpenMP. Workers are started from fresh interpreters.
+            self._pool = ProcessPoolExecutor(
+                self.size, mp_context=multiprocessing.get_context('spawn'),
+                initializer=lib.num_threads, initargs=(self.threads_per_proc,))
+        return list(self._pool.map(fn, *iterables))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+class MPIKptsExecutor(KptsExecutor):
+    '''Evaluate the tasks of k-point loops on the ranks of an MPI
+    communicator. All ranks call map with the same arguments. The tasks are
+    assigned to ranks round-robin and the results are gathered on all ranks.
+    '''
+    def __init__(self, comm=None):
+        if comm is None:
+            from mpi4py import MPI
+            comm = MPI.COMM_WORLD
+        self.comm = comm
+        self.size = comm.Get_size()
+        self.rank = comm.Get_rank()
+
+    def map(self, fn, *iterables):
+        tasks = list(zip(*iterables))
+        results = [None] * len(tasks)
+        local = [fn(*args) for args in tasks[self.rank::self.size]]
+        for rank, res in enumerate(self.comm.allgather(local)):
+            results[rank::self.size] = res
+        return results
+
+    def map_sum(self, fn, *iterables):
+        tasks = list(zip(*iterables))
+        out = 0
+        for args in tasks[self.rank::self.size]:
+            out += fn(*args)
+        return self.comm.allreduce(out)
+
+
+def _map_kpts(executor, fn, *args_kpts):
+    '''Evaluate fn for chunks of k-points. Each argument in args_kpts is a
+    list over k-points. fn returns a list over the k-points of a chunk.'''
+    nkpts = len(args_kpts[0])
+    chunks = [c for c in numpy.array_split(numpy.arange(nkpts), executor.size)
+              if c.size > 0]
+    tasks = [[[a[k] for k in c] for c in chunks] for a in args_kpts]
+    return [x for res in executor.map(fn, *tasks) for x in res]
+
+def _eig_kpts(h_kpts, s_kpts):
+    from pyscf.scf.hf import eig
+    return [eig(h, s) for h, s in zip(h_kpts, s_kpts)]
+
+def _make_rdm1_kpts(mo_coeff_kpts, mo_occ_kpts):
+    dm_kpts = []
+    for c, occ in zip(mo_coeff_kpts, mo_occ_kpts):
+        mocc = c[:,occ>0]
+        dm_kpts.append((mocc*occ[occ>0]).dot(mocc.conj().T))
+    return dm_kpts
+
+def kpts_parallel(mf, nproc=None, comm=None):
+    '''Distribute the k-point loops of a KSCF object over processes.
+
+    Args:
+        mf : KSCF object
+
+    Kwargs:
+        nproc : int
+            Number of processes of the local process pool. Default is the
+            number of CPUs.
+        comm : MPI communicator
+            If specified, k-points are distributed over the ranks of comm.
+    '''
+    assert isinstance(mf, khf.KSCF)
+    if comm is not None:
+        executor = MPIKptsExecutor(comm)
+    elif nproc == 1:
+        executor = KptsExecutor()
+    else:
+        executor = ProcessPoolKptsExecutor(nproc)
+
+    if isinstance(mf, _KptsParallelSCF):
+        mf.kpts_executor.shutdown()
+        mf.kpts_executor = executor
+        return mf
+    return lib.set_class(_KptsParallelSCF(mf, executor),
+                         (_KptsParallelSCF, mf.__class__))
+
+class _KptsParallelSCF:
+
+    __name_mixin__ = 'KptsParallel'
+
+    _keys = {'kpts_executor'}
+
+    def __init__(self, mf, executor):
+        self.__dict__.update(mf.__dict__)
+        self.kpts_executor = executor
+
+    def undo_kpts_parallel(self):
+        obj = lib.view(self, lib.drop_class(self.__class__, _KptsParallelSCF))
+        del obj.kpts_executor
+        return obj
+
+    def dump_flags(self, verbose=None):
+        super().dump_flags(verbose)
+        logger.info(self, 'k-point loops distributed over %d workers (%s)',
+                    self.kpts_executor.size, self.kpts_executor.__class__.__name__)
+        return self
+
+    def _distributable(self):
+        # Eigen solvers other than the default one (e.g. those to remove linear
+        # dependency) are not sent to workers. Symmetry adapted and ROHF
+        # methods have their own treatments of the k-point loops.
+        from pyscf.scf import hf as mol_hf
+        from pyscf.pbc.scf import khf_ksymm, krohf
+        return (self.kpts_executor.size > 1 and
+                getattr(self._eigh, '__func__', None) is mol_hf.SCF._eigh and
+                not isinstance(self, (khf_ksymm.KsymAdaptedKSCF, krohf.KROHF)))
+
+    def get_jk(self, cell=None, dm_kpts=None, hermi=1, kpts=None, kpts_band=None,
+               with_j=True, with_k=True, omega=None, **kwargs):
+        with_df = getattr(self, 'with_df', None)
+        if not hasattr(with_df, 'kpts_executor'):
+            return super().get_jk(cell, dm_kpts, hermi, kpts, kpts_band,
+                                  with_j, with_k, omega, **kwargs)
+        # with_df may be shared with other SCF objects. The executor is
+        # attached to it only within this call.
+        with lib.temporary_env(with_df, kpts_executor=self.kpts_executor):
+            return super().get_jk(cell, dm_kpts, hermi, kpts, kpts_band,
+                                  with_j, with_k, omega, **kwargs)
+
+    def eig(self, h_kpts, s_kpts):
+        if not self._distributable():
+            return super().eig(h_kpts, s_kpts)
+
+        executor = self.kpts_executor
+        if self.istype('KUHF'):
+            nkpts = len(s_kpts)
+            res = _map_kpts(executor, _eig_kpts,
+                            list(h_kpts[0]) + list(h_kpts[1]), list(s_kpts) * 2)
+            e, c = [x[0] for x in res], [x[1] for x in res]
+            return (e[:nkpts], e[nkpts:]), (c[:nkpts], c[nkpts:])
+        else:
+            res = _map_kpts(executor, _eig_kpts, list(h_kpts), list(s_kpts))
+            return [x[0] for x in res], [x[1] for x in res]
+
+    def make_rdm1(self, mo_coeff_kpts=None, mo_occ_kpts=None, **kwargs):
+        if mo_coeff_kpts is None: mo_coeff_kpts = self.mo_coeff
+        if mo_occ_kpts is None: mo_occ_kpts = self.mo_occ
+        if not self._distributable():
+            return super().make_rdm1(mo_coeff_kpts, mo_occ_kpts, **kwargs)
+
+        executor = self.kpts_executor
+        if self.istype('KUHF'):
+            nkpts = len(mo_occ_kpts[0])
+            dm = _map_kpts(executor, _make_rdm1_kpts,
+                           list(mo_coeff_kpts[0]) + list(mo_coeff_kpts[1]),
+                           list(mo_occ_kpts[0]) + list(mo_occ_kpts[1]))
+            nao = dm[0].shape[0]
+            dm = lib.asarray(dm).reshape(2,nkpts,nao,nao)
+        else:
+            dm = _map_kpts(executor, _make_rdm1_kpts,
+                           list(mo_coeff_kpts), list(mo_occ_kpts))
+        return lib.tag_array(dm, mo_coeff=mo_coeff_kpts, mo_occ=mo_occ_kpts)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# Copyright 2014-2024 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+import numpy
+from pyscf.pbc import gto as pbcgto
+from pyscf.pbc import scf as pscf
+from pyscf.pbc.df import df_jk
+from pyscf.pbc.scf import kpts_parallel
+
+def setUpModule():
+    global cell, kpts
+    cell = pbcgto.Cell()
+    cell.atom = '''
+    H 0 0 0
+    H 1 1 1
+    '''
+    cell.basis = '631g'
+    cell.a = numpy.eye(3) * 3.5
+    cell.verbose = 5
+    cell.output = '/dev/null'
+    cell.build()
+    kpts = cell.make_kpts([2,2,1])
+
+def tearDownModule():
+    global cell
+    cell.stdout.close()
+    del cell
+
+class SerialExecutor(kpts_parallel.KptsExecutor):
+    '''Emulates multiple workers in the current process'''
+    def __init__(self, size):
+        self.size = size
+        self.ntasks = 0
+
+    def map(self, fn, *iterables):
+        res = super().map(fn, *iterables)
+        self.ntasks += len(res)
+        return res
+
+class KnownValues(unittest.TestCase):
+    def test_get_k_kpairs(self):
+        mf = pscf.KRHF(cell, kpts).density_fit()
+        mydf = mf.with_df
+        dm = mf.get_init_guess()
+        ref = df_jk.get_k_kpts(mydf, dm, 1, kpts)
+        mydf.kpts_executor = SerialExecutor(3)
+        vk = df_jk.get_k_kpts(mydf, dm, 1, kpts)
+        self.assertAlmostEqual(abs(vk - ref).max(), 0, 12)
+
+        kpts_band = numpy.vstack([kpts[1:3], cell.make_kpts([3,1,1])])
+        vk = df_jk.get_k_kpts(mydf, dm, 1, kpts, kpts_band)
+        mydf.kpts_executor = None
+        ref = df_jk.get_k_kpts(mydf, dm, 1, kpts, kpts_band)
+        self.assertAlmostEqual(abs(vk - ref).max(), 0, 12)
+
+    def test_kuhf(self):
+        mf = pscf.KUHF(cell, kpts).density_fit()
+        e_ref = mf.kernel()
+        mf = kpts_parallel.kpts_parallel(mf)
+        mf.kpts_executor = executor = SerialExecutor(3)
+        e_tot = mf.kernel()
+        self.assertAlmostEqual(e_tot, e_ref, 9)
+        self.assertTrue(executor.ntasks > 0)
+        # The with_df object shared with other SCF objects is not changed
+        self.assertTrue(mf.with_df.kpts_executor is None)
+
+        mf = mf.undo_kpts_parallel()
+        self.assertEqual(mf.__class__.__name__, 'KUHF')
+
+    def test_process_pool(self):
+        mf = pscf.KRHF(cell, kpts).density_fit()
+        e_ref = mf.kernel()
+        mf = mf.kpts_parallel(nproc=2)
+        # The workers load the CDERI tensor from the file
+        mf.with_df.cderi_incore = False
+        mf.with_df.reset()
+        with mf.kpts_executor:
+            e_tot = mf.kernel()
+        self.assertAlmostEqual(e_tot, e_ref, 9)
+
+if __name__ == '__main__':
+    print("Full Tests for k-point parallel KSCF")
+    unittest.main()
@@ -13,6 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import json
+import atexit
+import tempfile
 import warnings
 import ctypes
 import numpy as np
@@ -26,6 +30,12 @@ from pyscf.pbc.lib.kpts_helper import intersection
 from pyscf import __config__
 
 FFT_ENGINE = getattr(__config__, 'pbc_tools_pbc_fft_engine', 'NUMPY+BLAS')
+# Settings of the PYFFTW engine. FFTW wisdom is saved in the file PYFFTW_WISDOM
+# and reused in the next run
+PYFFTW_WISDOM = getattr(__config__, 'pbc_tools_pbc_pyfftw_wisdom', None)
+PYFFTW_PLANNER_EFFORT = getattr(__config__, 'pbc_tools_pbc_pyfftw_planner_effort',
+                                'FFTW_MEASURE')
+PYFFTW_MAX_PLANS = getattr(__config__, 'pbc_tools_pbc_pyfftw_max_plans', 16)
 
 def _fftn_blas(f, mesh):
     assert f.ndim == 4
@@ -67,17 +77,96 @@ def _ifftn_blas(g, mesh):
         f = lib.dot(f.reshape(mz,-1).T, expRGz, 1./mz, c=out1.reshape(-1,mz))
     return out.reshape(n, *mesh)
 
-nproc = lib.num_threads()
+# The FFT engines which can be selected by set_fft_engine. Each entry is a
+# function that returns a pair of functions (fftn, ifftn). Both transform a
+# batch of 3D arrays of shape (n, nx, ny, nz) along the last three axes, with
+# the same normalization convention as numpy.fft.
+FFT_ENGINES = {}
 
-def _fftn_wrapper(a):  # noqa
-    return scipy.fft.fftn(a, axes=(1,2,3), workers=nproc)
+def register_fft_engine(name, fftn, ifftn):
+    '''Register an FFT engine for the functions fft and ifft.
 
-def _ifftn_wrapper(a):  # noqa
-    return scipy.fft.ifftn(a, axes=(1,2,3), workers=nproc)
+    Args:
+        name : str
+            The name of the engine (case insensitive)
+        fftn, ifftn : callable
+            Functions to transform an array of shape (n, nx, ny, nz) along
+            the last three axes.
+    '''
+    FFT_ENGINES[name.upper()] = lambda: (fftn, ifftn)
+
+def set_fft_engine(name):
+    '''Select the FFT engine for the functions fft and ifft.
+
+    Returns:
+        The name of the previous engine.
+
+    Examples:
 
-if FFT_ENGINE == 'FFTW':
+    >>> from pyscf.pbc.tools import pbc
+    >>> pbc.set_fft_engine('SCIPY')
+    '''
+    global _fftn_wrapper, _ifftn_wrapper, _fft_engine
+    name = name.upper()
+    if name not in FFT_ENGINES:
+        raise KeyError(f'FFT engine {name} not found. '
+                       f'Available engines: {list(FFT_ENGINES.keys())}')
+    _fftn_wrapper, _ifftn_wrapper = FFT_ENGINES[name]()
+    previous, _fft_engine = _fft_engine, name
+    return previous
+
+def get_fft_engine():
+    '''The name of the FFT engine used by the functions fft and ifft'''
+    return _fft_engine
+
+def _numpy_engine():
+    def fftn(a):
+        return np.fft.fftn(a, axes=(1,2,3))
+    def ifftn(a):
+        return np.fft.ifftn(a, axes=(1,2,3))
+    return fftn, ifftn
+
+def _scipy_engine():
+    import scipy.fft
+    def fftn(a):
+        return scipy.fft.fftn(a, axes=(1,2,3), workers=lib.num_threads())
+    def ifftn(a):
+        return scipy.fft.ifftn(a, axes=(1,2,3), workers=lib.num_threads())
+    return fftn, ifftn
+
+def _blas_engine():
+    def fftn(a):
+        return _fftn_blas(a, a.shape[1:])
+    def ifftn(a):
+        return _ifftn_blas(a, a.shape[1:])
+    return fftn, ifftn
+
+_EXCLUDE = [17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79,
+            83, 89, 97,101,103,107,109,113,127,131,137,139,149,151,157,163,
+            167,173,179,181,191,193,197,199,211,223,227,229,233,239,241,251,
+            257,263,269,271,277,281,283,293]
+_EXCLUDE = set(_EXCLUDE + [n*2 for n in _EXCLUDE[:30]] + [n*3 for n in _EXCLUDE[:20]])
+
+def _numpy_blas_engine():
+    '''scipy.fft, or the BLAS DFT for the meshes of large prime factors'''
+    scipy_fftn, scipy_ifftn = _scipy_engine()
+    def fftn(a):
+        mesh = a.shape[1:]
+        if mesh[0] in _EXCLUDE and mesh[1] in _EXCLUDE and mesh[2] in _EXCLUDE:
+            return _fftn_blas(a, mesh)
+        else:
+            return scipy_fftn(a)
+    def ifftn(a):
+        mesh = a.shape[1:]
+        if mesh[0] in _EXCLUDE and mesh[1] in _EXCLUDE and mesh[2] in _EXCLUDE:
+            return _ifftn_blas(a, mesh)
+        else:
+            return scipy_ifftn(a)
+    return fftn, ifftn
+
+def _fftw_engine():
     try:
-        libfft = lib.load_library('libfft')
+        libfft = lib.load_library('libfft', eager=True)
     except OSError:
         raise RuntimeError("Failed to load libfft")
 
@@ -106,52 +195,82 @@ if FFT_ENGINE == 'FFTW':
                ctypes.c_int(rank))
         return out
 
-    def _fftn_wrapper(a):  # noqa
+    def fftn(a):
         mesh = a.shape[1:]
         return _complex_fftn_fftw(a, mesh, 'fft')
-    def _ifftn_wrapper(a):  # noqa
+    def ifftn(a):
         mesh = a.shape[1:]
         return _complex_fftn_fftw(a, mesh, 'ifft')
+    return fftn, ifftn
 
-elif FFT_ENGINE == 'PYFFTW':
+def _pyfftw_engine():
+    '''pyFFTW plans for the batched transforms. The plans are kept for each
+    array shape and number of threads. FFTW wisdom is loaded from and saved
+    to the file PYFFTW_WISDOM if it is specified.
+    '''
     # Note: pyfftw is likely slower than scipy.fft in multi-threading environments
-    try:
-        import pyfftw
-        pyfftw.config.PLANNER_EFFORT = 'FFTW_MEASURE'
-        pyfftw.interfaces.cache.enable()
-        def _fftn_wrapper(a):  # noqa
-            return pyfftw.interfaces.numpy_fft.fftn(a, axes=(1,2,3), threads=nproc)
-        def _ifftn_wrapper(a):  # noqa
-            return pyfftw.interfaces.numpy_fft.ifftn(a, axes=(1,2,3), threads=nproc)
-    except ImportError:
-        print('PyFFTW not installed. SciPy fft module will be used.')
-
-elif FFT_ENGINE == 'NUMPY+BLAS':
-    _EXCLUDE = [17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79,
-                83, 89, 97,101,103,107,109,113,127,131,137,139,149,151,157,163,
-                167,173,179,181,191,193,197,199,211,223,227,229,233,239,241,251,
-                257,263,269,271,277,281,283,293]
-    _EXCLUDE = set(_EXCLUDE + [n*2 for n in _EXCLUDE[:30]] + [n*3 for n in _EXCLUDE[:20]])
-    def _fftn_wrapper(a):  # noqa
-        mesh = a.shape[1:]
-        if mesh[0] in _EXCLUDE and mesh[1] in _EXCLUDE and mesh[2] in _EXCLUDE:
-            return _fftn_blas(a, mesh)
-        else:
-            return scipy.fft.fftn(a, axes=(1,2,3), workers=nproc)
-    def _ifftn_wrapper(a):  # noqa
-        mesh = a.shape[1:]
-        if mesh[0] in _EXCLUDE and mesh[1] in _EXCLUDE and mesh[2] in _EXCLUDE:
-            return _ifftn_blas(a, mesh)
-        else:
-            return scipy.fft.ifftn(a, axes=(1,2,3), workers=nproc)
-
-elif FFT_ENGINE == 'BLAS':
-    def _fftn_wrapper(a):  # noqa
-        mesh = a.shape[1:]
-        return _fftn_blas(a, mesh)
-    def _ifftn_wrapper(a):  # noqa
-        mesh = a.shape[1:]
-        return _ifftn_blas(a, mesh)
+    import pyfftw
+    if PYFFTW_WISDOM and os.path.isfile(PYFFTW_WISDOM):
+        with open(PYFFTW_WISDOM, 'r') as f:
+            pyfftw.import_wisdom([w.encode() for w in json.load(f)])
+
+    plans = {}
+    def get_plan(a, builder):
+        nthreads = lib.num_threads()
+        key = (a.shape, builder.__name__, nthreads)
+        plan = plans.get(key)
+        if plan is None:
+            if len(plans) >= PYFFTW_MAX_PLANS:
+                del plans[next(iter(plans))]
+            buf = pyfftw.empty_aligned(a.shape, dtype=np.complex128)
+            plan = plans[key] = builder(
+                buf, axes=(1,2,3), threads=nthreads,
+                planner_effort=PYFFTW_PLANNER_EFFORT, avoid_copy=False)
+            if PYFFTW_WISDOM:
+                # Wisdom is saved once when the program exits. unregister
+                # avoids multiple registrations from different engines.
+                atexit.unregister(_save_pyfftw_wisdom)
+                atexit.register(_save_pyfftw_wisdom, PYFFTW_WISDOM)
+        return plan
+
+    def fftn(a):
+        plan = get_plan(a, pyfftw.builders.fftn)
+        # The output array is owned by the plan and overwritten in the next call
+        return plan(a).copy()
+    def ifftn(a):
+        plan = get_plan(a, pyfftw.builders.ifftn)
+        return plan(a).copy()
+    return fftn, ifftn
+
+def _save_pyfftw_wisdom(filename):
+    '''Write the FFTW wisdom to filename. The file is replaced atomically
+    so that concurrent runs never read a partially written file.'''
+    import pyfftw
+    wisdom = [w.decode() for w in pyfftw.export_wisdom()]
+    with tempfile.NamedTemporaryFile(
+            'w', dir=os.path.dirname(os.path.abspath(filename)),
+            prefix='.pyfftw_wisdom', delete=False) as f:
+        json.dump(wisdom, f)
+    os.replace(f.name, filename)
+
+FFT_ENGINES.update({
+    'NUMPY': _numpy_engine,
+    'SCIPY': _scipy_engine,
+    'BLAS': _blas_engine,
+    'NUMPY+BLAS': _numpy_blas_engine,
+    'FFTW': _fftw_engine,
+    'PYFFTW': _pyfftw_engine,
+})
+
+_fft_engine = None
+try:
+    set_fft_engine(FFT_ENGINE)
+except ImportError:
+    print('PyFFTW not installed. SciPy fft module will be used.')
+    set_fft_engine('SCIPY')
+except KeyError as e:
+    warnings.warn(f'{e}. SciPy fft module will be used.')
+    set_fft_engine('SCIPY')
 
 
 def fft(f, mesh):
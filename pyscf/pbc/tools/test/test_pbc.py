@@ -13,6 +13,8 @@
 # limitations under the License.
 
 import unittest
+import tempfile
+import json
 import numpy
 import numpy as np
 from pyscf import gto
@@ -22,6 +24,10 @@ from pyscf.pbc.scf import khf
 from pyscf.pbc.df import fft
 from pyscf.pbc.tools.k2gamma import translation_vectors_for_kmesh
 from pyscf import lib
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
 
 
 class KnownValues(unittest.TestCase):
@@ -247,6 +253,76 @@ C  15.16687337 15.16687337 15.16687337
         v = tools.ifft(a, [8,n,8]).ravel()
         self.assertAlmostEqual(abs(ref-v).max(), 0, 10)
 
+    def test_fft_engines(self):
+        n = 31
+        a = numpy.random.random([3,n,n,8]) + numpy.random.random([3,n,n,8]) * 1j
+        ref = numpy.fft.fftn(a, axes=(1,2,3)).reshape(3,-1)
+        ref1 = numpy.fft.ifftn(a, axes=(1,2,3)).reshape(3,-1)
+        engine = tools.get_fft_engine()
+        try:
+            for name in ['NUMPY', 'SCIPY', 'BLAS', 'NUMPY+BLAS']:
+                tools.set_fft_engine(name)
+                self.assertEqual(tools.get_fft_engine(), name)
+                v = tools.fft(a.reshape(3,-1), [n,n,8])
+                self.assertAlmostEqual(abs(ref-v).max(), 0, 10)
+                v = tools.ifft(a.reshape(3,-1), [n,n,8])
+                self.assertAlmostEqual(abs(ref1-v).max(), 0, 10)
+
+            calls = []
+            def fftn(a):
+                calls.append(a.shape)
+                return numpy.fft.fftn(a, axes=(1,2,3))
+            def ifftn(a):
+                return numpy.fft.ifftn(a, axes=(1,2,3))
+            tools.register_fft_engine('test', fftn, ifftn)
+            self.assertEqual(tools.set_fft_engine('test'), 'NUMPY+BLAS')
+            v = tools.fft(a, [n,n,8])
+            self.assertAlmostEqual(abs(ref-v).max(), 0, 10)
+            self.assertEqual(calls, [(3,n,n,8)])
+            self.assertRaises(KeyError, tools.set_fft_engine, 'not-exist')
+        finally:
+            tools.set_fft_engine(engine)
+            tools.FFT_ENGINES.pop('TEST', None)
+
+    def test_unknown_fft_engine_config(self):
+        import importlib
+        import warnings
+        from pyscf import __config__
+        from pyscf.pbc.tools import pbc
+        try:
+            with lib.temporary_env(__config__, pbc_tools_pbc_fft_engine='not-exist'):
+                with warnings.catch_warnings(record=True) as w:
+                    warnings.simplefilter('always')
+                    importlib.reload(pbc)
+            self.assertEqual(pbc.get_fft_engine(), 'SCIPY')
+            self.assertTrue(any('not-exist' in str(x.message).lower() for x in w))
+        finally:
+            importlib.reload(pbc)
+
+    @unittest.skipIf(pyfftw is None, "pyfftw library not found.")
+    def test_pyfftw_engine(self):
+        from pyscf.pbc.tools import pbc
+        n = 15
+        a = numpy.random.random([3,n,n,8]) + numpy.random.random([3,n,n,8]) * 1j
+        ref = numpy.fft.fftn(a, axes=(1,2,3)).reshape(3,-1)
+        ref1 = numpy.fft.ifftn(a, axes=(1,2,3)).reshape(3,-1)
+        engine = tools.get_fft_engine()
+        try:
+            tools.set_fft_engine('PYFFTW')
+            for i in range(2):
+                v = tools.fft(a.reshape(3,-1), [n,n,8])
+                self.assertAlmostEqual(abs(ref-v).max(), 0, 10)
+                v = tools.ifft(a.reshape(3,-1), [n,n,8])
+                self.assertAlmostEqual(abs(ref1-v).max(), 0, 10)
+        finally:
+            tools.set_fft_engine(engine)
+
+        with tempfile.NamedTemporaryFile() as f:
+            pbc._save_pyfftw_wisdom(f.name)
+            with open(f.name, 'r') as f1:
+                wisdom = json.load(f1)
+        self.assertEqual(len(wisdom), len(pyfftw.export_wisdom()))
+
     def test_mesh_to_cutoff(self):
         a = numpy.array([
             [0.  , 3.37, 3.37],
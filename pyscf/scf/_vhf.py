@@ -13,18 +13,82 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import sys
+import glob
+import hashlib
+import tempfile
 import ctypes
 import _ctypes
 import numpy
 from pyscf import lib
 from pyscf import gto
 from pyscf.gto.moleintor import make_cintopt, make_loc, ascint3
+from pyscf import __config__
+
+# Directory of the persistent cache for the Schwarz screening tensor q_cond.
+# The cache is disabled when it is not specified.
+Q_COND_CACHE_DIR = getattr(__config__, 'scf_vhf_q_cond_cache_dir', None)
+# Maximum number of q_cond tensors kept in the cache directory. The least
+# recently used entries are removed when the limit is exceeded.
+Q_COND_CACHE_SIZE = getattr(__config__, 'scf_vhf_q_cond_cache_size', 16)
 
 libcvhf = lib.load_library('libcvhf')
 def _fpointer(name):
     return ctypes.c_void_p(_ctypes.dlsym(libcvhf._handle, name))
 
+def q_cond_cache_key(mol, intor, qcondname, direct_scf_tol):
+    '''Content hash of the molecular integral environment which determines
+    the q_cond tensor.
+    '''
+    key = hashlib.sha1()
+    for arr in (mol._atm, mol._bas, mol._env):
+        key.update(numpy.ascontiguousarray(arr).tobytes())
+    key.update(('%s:%s:%r' % (intor, qcondname, direct_scf_tol)).encode())
+    return key.hexdigest()
+
+def load_q_cond(key, cache_dir=None):
+    '''Read q_cond from the persistent cache. Return None if not found.'''
+    if cache_dir is None: cache_dir = Q_COND_CACHE_DIR
+    if not cache_dir:
+        return None
+    path = os.path.join(cache_dir, key + '.npy')
+    try:
+        q_cond = numpy.load(path)
+    except (OSError, ValueError):
+        return None
+    try:
+        # Update the timestamp for LRU eviction
+        os.utime(path)
+    except OSError:
+        pass
+    return q_cond
+
+def save_q_cond(key, q_cond, cache_dir=None, max_entries=None):
+    '''Store q_cond in the persistent cache and evict the least recently
+    used entries.
+    '''
+    if cache_dir is None: cache_dir = Q_COND_CACHE_DIR
+    if max_entries is None: max_entries = Q_COND_CACHE_SIZE
+    if not cache_dir:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file then rename, so that concurrent jobs never
+        # read a partially written entry.
+        fd, tmpname = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+        with os.fdopen(fd, 'wb') as f:
+            numpy.save(f, q_cond)
+        os.replace(tmpname, os.path.join(cache_dir, key + '.npy'))
+
+        entries = glob.glob(os.path.join(cache_dir, '*.npy'))
+        if len(entries) > max_entries:
+            entries.sort(key=os.path.getmtime)
+            for path in entries[:len(entries)-max_entries]:
+                os.remove(path)
+    except OSError:
+        pass
+
 class VHFOpt:
     def __init__(self, mol, intor=None,
                  prescreen='CVHFnoscreen', qcondname=None, dmcondname=None):
@@ -196,11 +260,24 @@ class _VHFOpt:
         else:
             fqcond = getattr(libcvhf, qcondname)
         nbas = mol.nbas
-        q_cond = numpy.empty((nbas, nbas))
-        with mol.with_integral_screen(self.direct_scf_tol**2):
-            fqcond(getattr(libcvhf, intor), cintopt, q_cond.ctypes,
-                   ao_loc.ctypes, mol._atm.ctypes, ctypes.c_int(mol.natm),
-                   mol._bas.ctypes, ctypes.c_int(nbas), mol._env.ctypes)
+
+        q_cond = None
+        cache_key = None
+        if Q_COND_CACHE_DIR and isinstance(qcondname, str):
+            cache_key = q_cond_cache_key(mol, intor, qcondname,
+                                         self.direct_scf_tol)
+            q_cond = load_q_cond(cache_key)
+            if q_cond is not None and q_cond.shape != (nbas, nbas):
+                q_cond = None
+
+        if q_cond is None:
+            q_cond = numpy.empty((nbas, nbas))
+            with mol.with_integral_screen(self.direct_scf_tol**2):
+                fqcond(getattr(libcvhf, intor), cintopt, q_cond.ctypes,
+                       ao_loc.ctypes, mol._atm.ctypes, ctypes.c_int(mol.natm),
+                       mol._bas.ctypes, ctypes.c_int(nbas), mol._env.ctypes)
+            if cache_key is not None:
+                save_q_cond(cache_key, q_cond)
 
         self.q_cond = q_cond
         self._qcondname = qcondname
@@ -309,6 +386,45 @@ class _CVHFOpt(ctypes.Structure):
                 ('fprescreen', ctypes.c_void_p),
                 ('r_vkscreen', ctypes.c_void_p)]
 
+class _CVHFCFMMOpt(ctypes.Structure):
+    __slots__ = []
+    _fields_ = _CVHFOpt._fields_ + [
+        ('nbox', ctypes.c_int),
+        ('pair_box', ctypes.c_void_p),
+        ('box_near', ctypes.c_void_p)]
+
+class CFMMOpt(_VHFOpt):
+    '''Screening optimizer for the near-field Coulomb matrix of CFMM. The
+    integrals between the shell pairs of two boxes are evaluated only if
+    box_near[box_ij,box_kl] is set. pair_box assigns shell pairs to boxes
+    (-1 for the pairs not assigned to any box).
+    '''
+    def __init__(self, mol, intor=None, prescreen='CVHFnrs8_vj_cfmm_prescreen',
+                 qcondname=None, dmcondname=None, direct_scf_tol=1e-14):
+        _VHFOpt.__init__(self, mol, intor, prescreen, None, dmcondname,
+                         direct_scf_tol)
+        cvhfopt = self._this
+        self._this = _CVHFCFMMOpt()
+        for key, _ in _CVHFOpt._fields_:
+            setattr(self._this, key, getattr(cvhfopt, key))
+        self._pair_box = None
+        self._box_near = None
+        if qcondname is not None and intor is not None:
+            self.init_cvhf_direct(mol, intor, qcondname)
+
+    def set_boxes(self, pair_box, box_near):
+        nbas = self.mol.nbas
+        pair_box = numpy.asarray(pair_box, dtype=numpy.int32, order='C')
+        box_near = numpy.asarray(box_near, dtype=numpy.int8, order='C')
+        nbox = box_near.shape[0]
+        assert pair_box.shape == (nbas, nbas)
+        assert box_near.shape == (nbox, nbox)
+        self._pair_box = pair_box
+        self._box_near = box_near
+        self._this.nbox = nbox
+        self._this.pair_box = pair_box.ctypes.data_as(ctypes.c_void_p)
+        self._this.box_near = box_near.ctypes.data_as(ctypes.c_void_p)
+
 ################################################
 # for general DM
 # hermi = 0 : arbitrary
@@ -463,6 +579,111 @@ def direct(dms, atm, bas, env, vhfopt=None, hermi=0, cart=False,
         vk = vk.reshape(dms_shape)
     return vj, vk
 
+def direct_batch(dms, atms, bass, envs, vhfopts=None, hermi=0, cart=False,
+                 with_j=True, with_k=True):
+    '''J and K matrices for a batch of molecules which share the same basis
+    layout, i.e. the same shells in the same order (e.g. the same molecule at
+    different geometries). The molecules are computed in one C driver and
+    distributed over threads, one molecule per thread.
+
+    Args:
+        dms : ndarray
+            Density matrices of shape (nmol,nao,nao) or (nmol,n_dm,nao,nao)
+        atms, bass, envs : lists
+            The _atm, _bas and _env of each molecule
+
+    Kwargs:
+        vhfopts : list of _VHFOpt
+            Screening optimizers of each molecule. No screening if not given.
+
+    Returns:
+        vj, vk with the same shape as dms
+    '''
+    nmol = len(atms)
+    assert len(bass) == nmol and len(envs) == nmol
+    dms = numpy.asarray(dms, order='C', dtype=numpy.double)
+    dms_shape = dms.shape
+    assert dms_shape[0] == nmol
+    nao = dms_shape[-1]
+    dms = dms.reshape(nmol,-1,nao,nao)
+    n_dm = dms.shape[1]
+
+    atms = [numpy.asarray(atm, dtype=numpy.int32, order='C') for atm in atms]
+    bass = [numpy.asarray(bas, dtype=numpy.int32, order='C') for bas in bass]
+    envs = [numpy.asarray(env, dtype=numpy.double, order='C') for env in envs]
+    natm, nbas = atms[0].shape[0], bass[0].shape[0]
+    layout = bass[0][:,[gto.ATOM_OF, gto.ANG_OF, gto.NPRIM_OF, gto.NCTR_OF]]
+    for atm, bas in zip(atms, bass):
+        if (atm.shape[0] != natm or bas.shape[0] != nbas or
+            not numpy.array_equal(bas[:,[gto.ATOM_OF, gto.ANG_OF, gto.NPRIM_OF,
+                                         gto.NCTR_OF]], layout)):
+            raise ValueError('Molecules do not share the same basis layout')
+
+    if cart:
+        intor = 'int2e_cart'
+    else:
+        intor = 'int2e_sph'
+    if vhfopts is None:
+        cvhfopts = (ctypes.c_void_p*nmol)()
+        cintopts = [make_cintopt(atm, bas, env, intor)
+                    for atm, bas, env in zip(atms, bass, envs)]
+    else:
+        assert len(vhfopts) == nmol
+        for opt, dm, atm, bas, env in zip(vhfopts, dms, atms, bass, envs):
+            opt.set_dm(dm, atm, bas, env)
+        intor = vhfopts[0]._intor
+        cvhfopts = (ctypes.c_void_p*nmol)(
+            *[ctypes.addressof(opt._this) for opt in vhfopts])
+        cintopts = [opt._cintopt for opt in vhfopts]
+
+    jkscripts = []
+    if with_j:
+        jkscripts.append('ji->s2kl')
+    if with_k:
+        if hermi == 1:
+            jkscripts.append('li->s2kj')
+        else:
+            jkscripts.append('li->s1kj')
+    n_jk = len(jkscripts)
+    if n_jk == 0:
+        return None, None
+
+    ao_loc = make_loc(bass[0], intor)
+    out = numpy.empty((n_jk, nmol, n_dm, nao, nao))
+    fjk = (ctypes.c_void_p*(n_jk*n_dm))(
+        *[_fpointer('CVHFnrs8_%s_%s' % tuple(x.split('->')))
+          for x in jkscripts for i in range(n_dm)])
+    dmsptr = (ctypes.c_void_p*(nmol*n_jk*n_dm))(
+        *[dm.ctypes.data for dm_mol in dms for x in range(n_jk) for dm in dm_mol])
+    vjkptr = (ctypes.c_void_p*(nmol*n_jk*n_dm))(
+        *[v.ctypes.data for v_mol in out.transpose(1,0,2,3,4)
+          for v_jk in v_mol for v in v_jk])
+    shls_slice = (ctypes.c_int*8)(*([0, nbas] * 4))
+    c_cintopts = (ctypes.c_void_p*nmol)(*[opt.value for opt in cintopts])
+    c_atms = (ctypes.c_void_p*nmol)(*[atm.ctypes.data for atm in atms])
+    c_bass = (ctypes.c_void_p*nmol)(*[bas.ctypes.data for bas in bass])
+    c_envs = (ctypes.c_void_p*nmol)(*[env.ctypes.data for env in envs])
+    libcvhf.CVHFnr_direct_batch_drv(
+        getattr(libcvhf, intor), getattr(libcvhf, 'CVHFdot_nrs8'), fjk,
+        dmsptr, vjkptr, ctypes.c_int(n_jk*n_dm), ctypes.c_int(1),
+        ctypes.c_int(nmol), shls_slice, ao_loc.ctypes.data_as(ctypes.c_void_p),
+        c_cintopts, cvhfopts, c_atms, ctypes.c_int(natm),
+        c_bass, ctypes.c_int(nbas), c_envs)
+
+    vj = vk = None
+    if with_j:
+        vj = out[0]
+        for v in vj.reshape(-1,nao,nao):
+            lib.hermi_triu(v, 1, inplace=True)
+        vj = vj.reshape(dms_shape)
+    if with_k:
+        vk = out[n_jk-1]
+        if hermi != 0:
+            for v in vk.reshape(-1,nao,nao):
+                lib.hermi_triu(v, hermi, inplace=True)
+        vk = vk.reshape(dms_shape)
+    return vj, vk
+
 # call all fjk for each dm. The return has the shape
 # [len(jkdescript),len(dms),ncomp,nao,nao]
 # jkdescript: 'ij->s1kl', 'kl->s2ij', ...
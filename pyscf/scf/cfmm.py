@@ -0,0 +1,433 @@
+#!/usr/bin/env python
+# Copyright 2014-2024 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Continuous fast multipole method (CFMM) for the Coulomb matrix
+
+The shell pairs (charge distributions) are assigned to cubic boxes based on
+their centers. The Coulomb interactions between two well-separated boxes are
+evaluated with the multipole expansion of the box charges. Exact integrals are
+computed for the near-field shell pairs only.
+
+Ref:
+C. A. White, B. G. Johnson, P. M. W. Gill, M. Head-Gordon,
+Chem. Phys. Lett. 230, 8 (1994)
+'''
+
+import numpy
+from pyscf import lib
+from pyscf import gto
+from pyscf.lib import logger
+from pyscf.scf import _vhf
+from pyscf import __config__
+
+# Order of the multipole expansion
+ORDER = getattr(__config__, 'scf_cfmm_CFMM_order', 4)
+# Two boxes are well separated if the distance between their centers is
+# larger than ws * (r1 + r2), r1 and r2 being the radii of the spheres which
+# enclose the charge distributions of the two boxes.
+WS = getattr(__config__, 'scf_cfmm_CFMM_ws', 1.5)
+# Edge length (in Bohr) of the boxes
+BOX_SIZE = getattr(__config__, 'scf_cfmm_CFMM_box_size', 4.5)
+
+def cfmm(mf, with_cfmm=None):
+    '''For the given SCF object, update the J matrix constructor with the
+    continuous fast multipole method. K matrix is computed with the exact
+    integrals.
+
+    Examples:
+
+    >>> mol = gto.M(atom=[('H', (0, 0, i*1.4)) for i in range(60)], verbose=0)
+    >>> mf = scf.RHF(mol).cfmm().run()
+    '''
+    from pyscf import scf
+    assert isinstance(mf, scf.hf.SCF)
+
+    if with_cfmm is None:
+        with_cfmm = CFMM(mf.mol)
+        with_cfmm.direct_scf_tol = mf.direct_scf_tol
+        with_cfmm.stdout = mf.stdout
+        with_cfmm.verbose = mf.verbose
+
+    if isinstance(mf, _CFMMSCF):
+        mf = mf.copy()
+        mf.with_cfmm = with_cfmm
+        return mf
+
+    cfmm_mf = _CFMMSCF(mf, with_cfmm)
+    return lib.set_class(cfmm_mf, (_CFMMSCF, mf.__class__))
+
+class _CFMMSCF:
+    '''
+    SCF class with the CFMM Coulomb matrix
+
+    Attributes:
+        with_cfmm : CFMM object
+            Set mf.with_cfmm = None to switch off CFMM.
+    '''
+
+    __name_mixin__ = 'CFMM'
+
+    _keys = {'with_cfmm'}
+
+    def __init__(self, mf, with_cfmm=None):
+        self.__dict__.update(mf.__dict__)
+        self._eri = None
+        self.with_cfmm = with_cfmm
+
+    def undo_cfmm(self):
+        '''Remove the CFMM Mixin'''
+        obj = lib.view(self, lib.drop_class(self.__class__, _CFMMSCF))
+        del obj.with_cfmm
+        return obj
+
+    def dump_flags(self, verbose=None):
+        super().dump_flags(verbose)
+        if self.with_cfmm:
+            self.with_cfmm.dump_flags(verbose)
+        return self
+
+    def reset(self, mol=None):
+        if self.with_cfmm:
+            self.with_cfmm.reset(mol)
+        return super().reset(mol)
+
+    def get_jk(self, mol=None, dm=None, hermi=1, with_j=True, with_k=True,
+               omega=None):
+        if mol is None: mol = self.mol
+        if dm is None: dm = self.make_rdm1()
+        if not self.with_cfmm or not with_j or omega:
+            return super().get_jk(mol, dm, hermi, with_j, with_k, omega)
+
+        cpu0 = (logger.process_clock(), logger.perf_counter())
+        if self.with_cfmm.mol is not mol:
+            self.with_cfmm.reset(mol)
+        vj = self.with_cfmm.get_j(dm, hermi)
+        logger.timer(self, 'vj (CFMM)', *cpu0)
+        vk = None
+        if with_k:
+            vk = super().get_jk(mol, dm, hermi, False, True, omega)[1]
+        return vj, vk
+
+def _cart_powers(order):
+    '''Exponents (t,u,v) of the Cartesian monomials x^t y^u z^v up to the
+    given order'''
+    powers = []
+    for n in range(order+1):
+        for t in reversed(range(n+1)):
+            for u in reversed(range(n-t+1)):
+                powers.append((t, u, n-t-u))
+    return powers
+
+def _coulomb_tensor(r, order):
+    '''Derivatives d^{t+u+v}/dx^t dy^u dz^v 1/|r| for all the monomials of
+    _cart_powers(order), using the McMurchie-Davidson recursion.'''
+    r = numpy.asarray(r)
+    x, y, z = r.T
+    rinv2 = 1. / numpy.einsum('px,px->p', r, r)
+    rinv = numpy.sqrt(rinv2)
+    # R^{(n)}_{000} = (-1)^n (2n-1)!! / r^{2n+1}
+    r000 = [rinv]
+    for n in range(1, order+1):
+        r000.append(r000[-1] * rinv2 * -(2*n-1))
+
+    cache = {}
+    def rtuv(t, u, v, n):
+        key = (t, u, v, n)
+        if key in cache:
+            return cache[key]
+        if t > 0:
+            val = x * rtuv(t-1, u, v, n+1)
+            if t > 1:
+                val += (t-1) * rtuv(t-2, u, v, n+1)
+        elif u > 0:
+            val = y * rtuv(t, u-1, v, n+1)
+            if u > 1:
+                val += (u-1) * rtuv(t, u-2, v, n+1)
+        elif v > 0:
+            val = z * rtuv(t, u, v-1, n+1)
+            if v > 1:
+                val += (v-1) * rtuv(t, u, v-2, n+1)
+        else:
+            val = r000[n]
+        cache[key] = val
+        return val
+
+    return numpy.array([rtuv(t, u, v, 0) for t, u, v in _cart_powers(order)]).T
+
+def _shell_pair_extents(mol, pairs, tol):
+    '''Centers and radii of the spheres which enclose the charge distributions
+    of the shell pairs. The radius is the distance beyond which the primitive
+    Gaussian products are smaller than tol.'''
+    bas_coords = mol.atom_coords()[mol._bas[:,gto.ATOM_OF]]
+    nprim = mol._bas[:,gto.NPRIM_OF]
+    ptr_exp = mol._bas[:,gto.PTR_EXP]
+    max_prim = nprim.max()
+    # Pad the exponents with the last (the most diffuse) exponent of each shell
+    idx = ptr_exp[:,None] + numpy.minimum(numpy.arange(max_prim), nprim[:,None]-1)
+    exps = mol._env[idx]
+    ish, jsh = pairs
+    ri = bas_coords[ish]
+    rj = bas_coords[jsh]
+    rr = numpy.einsum('px,px->p', ri-rj, ri-rj)
+    log_tol = -numpy.log(tol)
+
+    ai = exps[ish].min(axis=1)
+    aj = exps[jsh].min(axis=1)
+    centers = (ai[:,None] * ri + aj[:,None] * rj) / (ai + aj)[:,None]
+    radii = numpy.zeros(len(ish))
+    for p in range(max_prim):
+        ai = exps[ish,p]
+        for q in range(max_prim):
+            aj = exps[jsh,q]
+            aij = ai + aj
+            rc = (ai[:,None] * ri + aj[:,None] * rj) / aij[:,None]
+            ext = numpy.sqrt(numpy.maximum(log_tol - ai*aj/aij*rr, 0) / aij)
+            dr = numpy.linalg.norm(rc - centers, axis=1)
+            radii = numpy.maximum(radii, dr + ext)
+    return centers, radii
+
+
+class CFMM(lib.StreamObject):
+    '''Continuous fast multipole method for the Coulomb matrix
+
+    Attributes:
+        order : int
+            Order of the multipole expansion (up to 4). Default is 4.
+        ws : float
+            Well-separatedness criterion. The multipole expansion is applied
+            to two boxes if the distance between the box centers is larger
+            than ws * (r1 + r2), r1 and r2 being the radii of the spheres
+            which enclose the charge distributions of the two boxes. Larger
+            ws leads to more accurate but more expensive J matrix.
+        box_size : float
+            Edge length (in Bohr) of the boxes.
+        direct_scf_tol : float
+            The threshold for the Schwarz screening of the near-field
+            integrals and the extents of the charge distributions.
+    '''
+
+    order = ORDER
+    ws = WS
+    box_size = BOX_SIZE
+    direct_scf_tol = getattr(__config__, 'scf_hf_SCF_direct_scf_tol', 1e-13)
+
+    _keys = {
+        'mol', 'stdout', 'verbose', 'order', 'ws', 'box_size',
+        'direct_scf_tol', 'nbox', 'near_field_ratio',
+    }
+
+    def __init__(self, mol):
+        self.mol = mol
+        self.stdout = mol.stdout
+        self.verbose = mol.verbose
+
+##################################################
+# don't modify the following attributes, they are not input options
+        self.nbox = None
+        # Fraction of the significant shell pair interactions which are
+        # computed with exact integrals
+        self.near_field_ratio = None
+        self._vhfopt = None
+        self._aoidx = None
+        self._moments = None
+        self._col_box = None
+        self._far_pairs = None
+        self._far_tensor = None
+
+    def dump_flags(self, verbose=None):
+        log = logger.new_logger(self, verbose)
+        log.info('******** %s ********', self.__class__)
+        log.info('order = %d', self.order)
+        log.info('ws = %g', self.ws)
+        log.info('box_size = %g', self.box_size)
+        return self
+
+    def reset(self, mol=None):
+        if mol is not None:
+            self.mol = mol
+        self.nbox = None
+        self.near_field_ratio = None
+        self._vhfopt = None
+        self._aoidx = None
+        self._moments = None
+        self._col_box = None
+        self._far_pairs = None
+        self._far_tensor = None
+        return self
+
+    def build(self):
+        if not 0 <= self.order <= 4:
+            raise ValueError('CFMM order %s not supported' % self.order)
+        log = logger.new_logger(self)
+        cpu0 = (logger.process_clock(), logger.perf_counter())
+        mol = self.mol
+        nbas = mol.nbas
+        vhfopt = _vhf.CFMMOpt(mol, 'int2e', 'CVHFnrs8_vj_cfmm_prescreen',
+                              'CVHFnr_int2e_q_cond', 'CVHFnr_dm_cond',
+                              self.direct_scf_tol)
+        q_cond = vhfopt.q_cond
+        # Shell pairs which may contribute to the Coulomb matrix
+        ish, jsh = numpy.where(q_cond * q_cond.max() > self.direct_scf_tol)
+        centers, radii = _shell_pair_extents(mol, (ish, jsh), self.direct_scf_tol)
+
+        box_size = self.box_size
+        idx = numpy.floor(centers / box_size).astype(int)
+        boxes, pair_box = numpy.unique(idx, axis=0, return_inverse=True)
+        pair_box = pair_box.ravel()
+        nbox = len(boxes)
+        box_centers = (boxes + .5) * box_size
+        box_radii = numpy.zeros(nbox)
+        numpy.maximum.at(box_radii, pair_box, radii +
+                         numpy.linalg.norm(centers - box_centers[pair_box], axis=1))
+        rr = numpy.linalg.norm(box_centers[:,None] - box_centers, axis=2)
+        box_near = rr <= self.ws * (box_radii[:,None] + box_radii)
+
+        pair_box_mat = numpy.full((nbas, nbas), -1, dtype=numpy.int32)
+        pair_box_mat[ish, jsh] = pair_box
+        vhfopt.set_boxes(pair_box_mat, box_near)
+        self._vhfopt = vhfopt
+        self.nbox = nbox
+        npair_box = numpy.bincount(pair_box, minlength=nbox)
+        self.near_field_ratio = (npair_box.dot(box_near).dot(npair_box) /
+                                 float(len(pair_box))**2)
+
+        # Multipole integrals of the AO pairs of each box
+        ao_loc = mol.ao_loc
+        powers = _cart_powers(self.order)
+        comp_idx = []
+        for t, u, v in powers:
+            n = t + u + v
+            xyz = [0] * t + [1] * u + [2] * v
+            comp_idx.append(sum(x * 3**(n-1-k) for k, x in enumerate(xyz)))
+        intors = ['int1e_ovlp', 'int1e_r', 'int1e_rr', 'int1e_rrr', 'int1e_rrrr']
+        nao = mol.nao
+        aoidx = []
+        moments = []
+        col_box = []
+        for box_id in range(nbox):
+            mask = pair_box == box_id
+            bi = ish[mask]
+            bj = jsh[mask]
+            i0, i1 = bi.min(), bi.max() + 1
+            j0, j1 = bj.min(), bj.max() + 1
+            p0, p1 = ao_loc[i0], ao_loc[i1]
+            q0, q1 = ao_loc[j0], ao_loc[j1]
+            ao_mask = numpy.zeros((p1-p0, q1-q0), dtype=bool)
+            for i, j in zip(bi, bj):
+                ao_mask[ao_loc[i]-p0:ao_loc[i+1]-p0, ao_loc[j]-q0:ao_loc[j+1]-q0] = True
+            ip, iq = numpy.where(ao_mask)
+            ints = []
+            with mol.with_common_orig(box_centers[box_id]):
+                for n in range(self.order+1):
+                    s = mol.intor(intors[n], comp=3**n,
+                                  shls_slice=(i0, i1, j0, j1)).reshape(-1, p1-p0, q1-q0)
+                    ints.append(s[:,ip,iq])
+            ints = numpy.vstack(ints)
+            n0 = 0
+            sel = []
+            for n in range(self.order+1):
+                sel.extend([n0 + c for (t, u, v), c in zip(powers, comp_idx)
+                            if t+u+v == n])
+                n0 += 3**n
+            moments.append(ints[sel])
+            aoidx.append((ip + p0) * nao + iq + q0)
+            col_box.append(numpy.full(ip.size, box_id))
+        self._aoidx = numpy.hstack(aoidx)
+        self._moments = numpy.hstack(moments)
+        self._col_box = numpy.hstack(col_box)
+
+        # Interaction tensors between the well-separated boxes
+        tgt, src = numpy.where(~box_near)
+        self._far_pairs = (tgt, src)
+        if tgt.size > 0:
+            self._far_tensor = _coulomb_tensor(box_centers[tgt] - box_centers[src],
+                                               self.order)
+        else:
+            self._far_tensor = numpy.zeros((0, len(powers)))
+
+        log.debug('CFMM nbox = %d, near-field shell pair interactions %.3g',
+                  nbox, self.near_field_ratio)
+        log.timer('CFMM build', *cpu0)
+        return self
+
+    def _m2l_coefficients(self):
+        '''Index and coefficients of the interaction between the multipoles a
+        of a target box and the multipoles b of a source box
+        T[a+b] (-1)^|b| / (a! b!)'''
+        from math import factorial
+        powers = _cart_powers(self.order)
+        index = {p: i for i, p in enumerate(powers)}
+        a_idx, b_idx, t_idx, coef = [], [], [], []
+        for ia, a in enumerate(powers):
+            for ib, b in enumerate(powers):
+                if sum(a) + sum(b) > self.order:
+                    continue
+                ab = (a[0]+b[0], a[1]+b[1], a[2]+b[2])
+                fac = 1.
+                for x in a + b:
+                    fac *= factorial(x)
+                a_idx.append(ia)
+                b_idx.append(ib)
+                t_idx.append(index[ab])
+                coef.append((-1)**sum(b) / fac)
+        return (numpy.array(a_idx), numpy.array(b_idx), numpy.array(t_idx),
+                numpy.array(coef))
+
+    def get_j(self, dm, hermi=1):
+        '''Coulomb matrix of the given density matrices. The near-field part
+        is computed with exact integrals, the far-field part with the
+        multipole expansion.'''
+        if self._vhfopt is None:
+            self.build()
+        dm = numpy.asarray(dm)
+        if dm.dtype == numpy.complex128:
+            return self.get_j(dm.real, hermi) + self.get_j(dm.imag, hermi) * 1j
+
+        mol = self.mol
+        dms = dm.reshape(-1, mol.nao, mol.nao)
+        vj = _vhf.direct(dms, mol._atm, mol._bas, mol._env, self._vhfopt,
+                         hermi, mol.cart, with_j=True, with_k=False)[0]
+        vj = vj.reshape(dms.shape)
+        vj += self._far_field(dms)
+        return vj.reshape(dm.shape)
+
+    def _far_field(self, dms):
+        nbox = self.nbox
+        ints = self._moments
+        nmono = ints.shape[0]
+        tgt, src = self._far_pairs
+        a_idx, b_idx, t_idx, coef = self._m2l_coefficients()
+        # One-hot map from the (a,b) components to the target multipoles a
+        a_map = numpy.zeros((a_idx.size, nmono))
+        a_map[numpy.arange(a_idx.size), a_idx] = 1
+
+        vj = numpy.zeros_like(dms)
+        for i, dm in enumerate(dms):
+            rho = ints * dm.ravel()[self._aoidx]
+            multipoles = numpy.zeros((nbox, nmono))
+            for k in range(nmono):
+                multipoles[:,k] = numpy.bincount(self._col_box, rho[k], minlength=nbox)
+
+            local = numpy.zeros((nbox, nmono))
+            blksize = max(1, int(2e7 / a_idx.size))
+            for p0, p1 in lib.prange(0, tgt.size, blksize):
+                w = self._far_tensor[p0:p1,t_idx] * coef
+                w *= multipoles[src[p0:p1]][:,b_idx]
+                numpy.add.at(local, tgt[p0:p1], w.dot(a_map))
+
+            vj.reshape(len(dms), -1)[i,self._aoidx] = numpy.einsum(
+                'kp,pk->p', ints, local[self._col_box])
+        return vj
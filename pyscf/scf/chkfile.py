@@ -19,7 +19,7 @@
 import h5py
 from pyscf.lib import H5FileWrap
 from pyscf.lib.chkfile import load_chkfile_key, load
-from pyscf.lib.chkfile import dump_chkfile_key, dump, save
+from pyscf.lib.chkfile import dump_chkfile_key, dump, save, flush
 from pyscf.lib.chkfile import load_mol, save_mol
 
 def load_scf(chkfile):
@@ -28,6 +28,7 @@ def load_scf(chkfile):
 def dump_scf(mol, chkfile, e_tot, mo_energy, mo_coeff, mo_occ,
              overwrite_mol=True):
     '''save temporary results'''
+    flush(chkfile)
     if h5py.is_hdf5(chkfile) and not overwrite_mol:
         with H5FileWrap(chkfile, 'a') as fh5:
             if 'mol' not in fh5:
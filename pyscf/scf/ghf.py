@@ -474,8 +474,8 @@ employing the updated GWH rule from doi:10.1021/ja00480a005.''')
             vj, vk = self.get_jk(mol, dm, hermi)
             vhf = vj - vk
         else:
-            ddm = numpy.asarray(dm) - numpy.asarray(dm_last)
-            vj, vk = self.get_jk(mol, ddm, hermi)
+            vj, vk, vhf_last = hf.get_jk_incremental(self, mol, dm, dm_last,
+                                                     vhf_last, hermi)
             vhf = vj - vk + numpy.asarray(vhf_last)
         return vhf
 
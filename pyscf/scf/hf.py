@@ -198,7 +198,7 @@ Keyword argument "init_dm" is replaced by "dm0"''')
             scf_conv = True
 
         if dump_chk and mf.chkfile:
-            mf.dump_chk(locals())
+            _dump_chk(mf, locals())
 
         if callable(callback):
             callback(locals())
@@ -235,13 +235,25 @@ Keyword argument "init_dm" is replaced by "dm0"''')
         logger.info(mf, 'Extra cycle  E= %.15g  delta_E= %4.3g  |g|= %4.3g  |ddm|= %4.3g',
                     e_tot, e_tot-last_hf_e, norm_gorb, norm_ddm)
         if dump_chk and mf.chkfile:
-            mf.dump_chk(locals())
+            _dump_chk(mf, locals())
 
+    if dump_chk and mf.chkfile:
+        chkfile.flush(mf.chkfile)
     logger.timer(mf, 'scf_cycle', *cput0)
     # A post-processing hook before return
     mf.post_kernel(locals())
     return scf_conv, e_tot, mo_energy, mo_coeff, mo_occ
 
+def _dump_chk(mf, envs):
+    '''Save the SCF intermediates. If mf.chkfile_async is set, the chkfile
+    is written in a background thread. Only the last pending checkpoint is
+    written if the previous one has not been started.'''
+    if getattr(mf, 'chkfile_async', False):
+        lib.chkfile.submit((mf.chkfile, 'scf'), mf.dump_chk, dict(envs),
+                           min_interval=mf.chkfile_min_interval)
+    else:
+        mf.dump_chk(envs)
+
 
 def energy_elec(mf, dm=None, h1e=None, vhf=None):
     r'''Electronic part of Hartree-Fock energy, for given core hamiltonian and
@@ -1075,6 +1087,95 @@ def get_veff(mol, dm, dm_last=None, vhf_last=None, hermi=1, vhfopt=None):
         vj, vk = get_jk(mol, ddm, hermi, vhfopt)
         return vj - vk * .5 + numpy.asarray(vhf_last)
 
+def get_jk_incremental(mf, mol, dm, dm_last=0, vhf_last=0, hermi=1):
+    '''J and K matrices of the density increment dm - dm_last for the
+    incremental Fock build of direct SCF.
+
+    When :attr:`mf.direct_scf_loose_tol` is set, the integral screening
+    threshold is loosened in early iterations. It is reduced along with the
+    change of density matrix and switches to :attr:`mf.direct_scf_tol` once
+    the density change drops below sqrt(conv_tol). The potential is rebuilt
+    from the full density every :attr:`mf.direct_scf_rebuild_cycle`
+    iterations and when the threshold switches to direct_scf_tol, to bound
+    the errors accumulated in the increments. Statistics of each build are
+    recorded in mf.scf_summary['direct_scf_stats'].
+
+    Returns:
+        vj, vk and the reference potential which vj and vk should be added to.
+        The reference potential is 0 if J and K are built with the full
+        density matrix.
+    '''
+    dm = numpy.asarray(dm)
+    dm_last = numpy.asarray(dm_last)
+    loose_tol = mf.direct_scf_loose_tol
+    rebuild_cycle = mf.direct_scf_rebuild_cycle
+    if not loose_tol and not rebuild_cycle:
+        vj, vk = mf.get_jk(mol, dm - dm_last, hermi)
+        return vj, vk, vhf_last
+
+    tight_tol = mf.direct_scf_tol
+    stats = mf.scf_summary.get('direct_scf_stats')
+    if stats is None or dm_last.ndim == 0:
+        # A new SCF iteration series starts from the initial guess
+        stats = mf.scf_summary['direct_scf_stats'] = []
+
+    ddm = dm - dm_last
+    tol = tight_tol
+    if loose_tol and loose_tol > tight_tol:
+        ddm_max = abs(ddm).max()
+        if ddm_max > numpy.sqrt(mf.conv_tol):
+            tol = min(loose_tol, max(tight_tol, loose_tol * ddm_max))
+
+    full_build = dm_last.ndim == 0 or len(stats) == 0
+    if not full_build:
+        ncycle = 0
+        loose_since_rebuild = False
+        for s in reversed(stats):
+            if s['full_build']:
+                loose_since_rebuild = loose_since_rebuild or s['tol'] > tight_tol
+                break
+            ncycle += 1
+            loose_since_rebuild = loose_since_rebuild or s['tol'] > tight_tol
+        if rebuild_cycle and ncycle + 1 >= rebuild_cycle:
+            full_build = True
+        elif tol == tight_tol and loose_since_rebuild:
+            full_build = True
+    if full_build:
+        ddm = dm
+        vhf_last = 0
+
+    vhfopt = mf._opt.get(None)
+    if vhfopt is None and mf.direct_scf:
+        vhfopt = mf._opt[None] = mf.init_direct_scf(mol)
+    if vhfopt is None:
+        vj, vk = mf.get_jk(mol, ddm, hermi)
+        skipped = 0.
+    else:
+        with lib.temporary_env(vhfopt, direct_scf_tol=tol):
+            vj, vk = mf.get_jk(mol, ddm, hermi)
+        skipped = _estimate_screened_quartets(vhfopt, tol)
+
+    stats.append({'tol': float(tol), 'full_build': full_build, 'skipped': float(skipped)})
+    logger.debug(mf, 'Incremental Fock build: direct_scf_tol = %g full_build = %s '
+                 'screened shell quartets ~ %.1f%%', tol, full_build, skipped*100)
+    return vj, vk, vhf_last
+
+def _estimate_screened_quartets(vhfopt, tol):
+    '''An estimation of the fraction of shell quartets skipped by the
+    Schwarz and density screening q_ij * q_kl * max(dm_cond) < tol'''
+    q_cond = getattr(vhfopt, 'q_cond', None)
+    dm_cond = getattr(vhfopt, 'dm_cond', None)
+    if q_cond is None or dm_cond is None or q_cond.ndim != 2:
+        return 0.
+    dmax = dm_cond.max() * 4
+    if dmax == 0:
+        return 1.
+    q = numpy.sort(q_cond[numpy.tril_indices(q_cond.shape[0])])
+    with numpy.errstate(divide='ignore'):
+        q_kl_min = tol / (dmax * q)
+    nkept = q.size - numpy.searchsorted(q, q_kl_min, side='right')
+    return 1. - nkept.sum() / q.size**2
+
 def get_fock(mf, h1e=None, s1e=None, vhf=None, dm=None, cycle=-1, diis=None,
              diis_start_cycle=None, level_shift_factor=None, damp_factor=None,
              fock_last=None):
@@ -1603,6 +1704,14 @@ class SCF(lib.StreamObject):
         chkfile : str
             checkpoint file to save MOs, orbital energies etc.  Writing to
             chkfile can be disabled if this attribute is set to None or False.
+        chkfile_async : bool
+            Whether to write chkfile in a background thread during the SCF
+            iterations. The pending writes are finished when the SCF kernel
+            returns.  Default is False.
+        chkfile_min_interval : float
+            Minimal time (in seconds) between two asynchronous writes of
+            chkfile. Intermediate results produced within the interval are
+            not written.  Default is 0.
         conv_tol : float
             converge threshold.  Default is 1e-9
         conv_tol_grad : float
@@ -1642,6 +1751,14 @@ class SCF(lib.StreamObject):
             Direct SCF is used by default.
         direct_scf_tol : float
             Direct SCF cutoff threshold.  Default is 1e-13.
+        direct_scf_loose_tol : float
+            If specified, the incremental Fock build in direct SCF starts with
+            this (loose) cutoff threshold. The threshold is tightened as the
+            density matrix converges and switches to direct_scf_tol near
+            convergence.  Default is None.
+        direct_scf_rebuild_cycle : int
+            Rebuild the Fock matrix from the full density matrix every N
+            iterations in direct SCF.  Default is 0 (never rebuild).
         callback : function(envs_dict) => None
             callback function takes one dict as the argument which is
             generated by the builtin function :func:`locals`, so that the
@@ -1699,7 +1816,11 @@ class SCF(lib.StreamObject):
     level_shift = getattr(__config__, 'scf_hf_SCF_level_shift', 0)
     direct_scf = getattr(__config__, 'scf_hf_SCF_direct_scf', True)
     direct_scf_tol = getattr(__config__, 'scf_hf_SCF_direct_scf_tol', 1e-13)
+    direct_scf_loose_tol = getattr(__config__, 'scf_hf_SCF_direct_scf_loose_tol', None)
+    direct_scf_rebuild_cycle = getattr(__config__, 'scf_hf_SCF_direct_scf_rebuild_cycle', 0)
     conv_check = getattr(__config__, 'scf_hf_SCF_conv_check', True)
+    chkfile_async = getattr(__config__, 'scf_hf_SCF_chkfile_async', False)
+    chkfile_min_interval = getattr(__config__, 'scf_hf_SCF_chkfile_min_interval', 0)
 
     callback = None
 
@@ -1707,7 +1828,9 @@ class SCF(lib.StreamObject):
         'conv_tol', 'conv_tol_grad', 'conv_tol_cpscf', 'max_cycle', 'init_guess',
         'sap_basis', 'DIIS', 'diis', 'diis_space', 'diis_damp', 'diis_start_cycle',
         'diis_file', 'diis_space_rollback', 'damp', 'level_shift',
-        'direct_scf', 'direct_scf_tol', 'conv_check', 'callback',
+        'direct_scf', 'direct_scf_tol', 'direct_scf_loose_tol',
+        'direct_scf_rebuild_cycle', 'conv_check', 'callback',
+        'chkfile_async', 'chkfile_min_interval',
         'mol', 'chkfile', 'mo_energy', 'mo_coeff', 'mo_occ',
         'e_tot', 'converged', 'cycles', 'scf_summary', 'opt',
         'disp', 'disp_with_3body',
@@ -1808,6 +1931,9 @@ class SCF(lib.StreamObject):
             log.info('direct_scf_tol = %g', self.direct_scf_tol)
         if self.chkfile:
             log.info('chkfile to save SCF result = %s', self.chkfile)
+            if self.chkfile_async:
+                log.info('chkfile_async = %s  chkfile_min_interval = %g s',
+                         self.chkfile_async, self.chkfile_min_interval)
         log.info('max_memory %d MB (current use %d MB)',
                  self.max_memory, lib.current_memory()[0])
         return self
@@ -2034,6 +2160,8 @@ This is the Gaussian fit version as described in doi:10.1063/5.0004046.''')
 
     def _finalize(self):
         '''Hook for dumping results and clearing up the object.'''
+        if self.chkfile:
+            chkfile.flush(self.chkfile)
         if self.converged:
             logger.note(self, 'converged SCF energy = %.15g', self.e_tot)
         else:
@@ -2094,8 +2222,8 @@ This is the Gaussian fit version as described in doi:10.1063/5.0004046.''')
         if mol is None: mol = self.mol
         if dm is None: dm = self.make_rdm1()
         if self.direct_scf:
-            ddm = numpy.asarray(dm) - dm_last
-            vj, vk = self.get_jk(mol, ddm, hermi=hermi)
+            vj, vk, vhf_last = get_jk_incremental(self, mol, dm, dm_last,
+                                                  vhf_last, hermi)
             return vhf_last + vj - vk * .5
         else:
             vj, vk = self.get_jk(mol, dm, hermi=hermi)
@@ -2159,6 +2287,11 @@ This is the Gaussian fit version as described in doi:10.1063/5.0004046.''')
                 'incorrect nuclear gradients, TDDFT and other methods.')
         return pyscf.df.df_jk.density_fit(self, auxbasis, with_df, only_dfj)
 
+    def cfmm(self, with_cfmm=None):
+        '''Compute the Coulomb matrix with the continuous fast multipole method'''
+        from pyscf.scf import cfmm
+        return cfmm.cfmm(self, with_cfmm)
+
     def multigrid_numint(self, margin=None, mesh=None):
         '''Apply the MultiGrid algorithm for XC numerical integartion.
 
@@ -2428,8 +2561,8 @@ class RHF(SCF):
             vj, vk = self.get_jk(mol, dm, hermi)
             vhf = vj - vk * .5
         else:
-            ddm = numpy.asarray(dm) - numpy.asarray(dm_last)
-            vj, vk = self.get_jk(mol, ddm, hermi)
+            vj, vk, vhf_last = get_jk_incremental(self, mol, dm, dm_last,
+                                                  vhf_last, hermi)
             vhf = vj - vk * .5
             vhf += numpy.asarray(vhf_last)
         return vhf
@@ -190,6 +190,49 @@ def get_jk(mols, dms, scripts=['ijkl,ji->kl'], intor='int2e_sph',
 
 jk_build = get_jk
 
+def get_jk_batch(mols, dms, hermi=1, with_j=True, with_k=True,
+                 direct_scf_tol=1e-13, vhfopts=None):
+    '''J and K matrices for many molecules which share the same basis layout
+    (the same atoms and basis sets in the same order, e.g. conformers or
+    geometries of a scan). All molecules are evaluated in one C-level loop
+    which distributes the molecules over threads. This is efficient for a
+    large number of small molecules which cannot saturate the threads
+    individually.
+
+    Args:
+        mols : a list of :class:`Mole` objects
+
+        dms : ndarray
+            Density matrices of shape (nmol,nao,nao) or (nmol,n_dm,nao,nao)
+
+    Kwargs:
+        direct_scf_tol : float
+            Cutoff for Schwarz and density screening. If None, integral
+            screening is not applied.
+        vhfopts : a list of _VHFOpt objects
+            Precomputed screening optimizers for each molecule. They can be
+            reused in the following calls for the same molecules.
+
+    Returns:
+        vj, vk with the same shape as dms
+
+    Examples:
+
+    >>> mols = [gto.M(atom=f'H 0 0 0; H 0 0 {r}', basis='ccpvdz') for r in (.7, .8, .9)]
+    >>> dms = [scf.RHF(m).get_init_guess() for m in mols]
+    >>> vj, vk = get_jk_batch(mols, dms)
+    >>> vj.shape
+    (3, 10, 10)
+    '''
+    mol = mols[0]
+    if vhfopts is None and direct_scf_tol is not None:
+        vhfopts = [_vhf._VHFOpt(m, 'int2e', 'CVHFnrs8_prescreen',
+                                'CVHFnr_int2e_q_cond', 'CVHFnr_dm_cond',
+                                direct_scf_tol) for m in mols]
+    return _vhf.direct_batch(dms, [m._atm for m in mols], [m._bas for m in mols],
+                             [m._env for m in mols], vhfopts, hermi, mol.cart,
+                             with_j, with_k)
+
 
 if __name__ == '__main__':
     mol = gto.M(atom='H 0 -.5 0; H 0 .5 0', basis='cc-pvdz')
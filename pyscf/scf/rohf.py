@@ -484,8 +484,8 @@ This is the Gaussian fit version as described in doi:10.1063/5.0004046.''')
             vj, vk = self.get_jk(mol, dm, hermi)
             vhf = vj[0] + vj[1] - vk
         else:
-            ddm = dm - numpy.asarray(dm_last)
-            vj, vk = self.get_jk(mol, ddm, hermi)
+            vj, vk, vhf_last = hf.get_jk_incremental(self, mol, dm, dm_last,
+                                                     vhf_last, hermi)
             vhf = vj[0] + vj[1] - vk
             vhf += numpy.asarray(vhf_last)
         return vhf
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# Copyright 2014-2024 The PySCF Developers. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import numpy
+from pyscf import gto
+from pyscf import scf
+from pyscf.scf import cfmm
+
+def setUpModule():
+    global mol
+    mol = gto.M(atom=[('H', (0, 0, i*1.4)) for i in range(40)], unit='Bohr',
+                basis='631g', verbose=5, output='/dev/null')
+
+def tearDownModule():
+    global mol
+    mol.stdout.close()
+    del mol
+
+class KnownValues(unittest.TestCase):
+    def test_coulomb_tensor(self):
+        x, y, z = r = numpy.array([1.2, -.4, 2.1])
+        rn = numpy.linalg.norm(r)
+        t = cfmm._coulomb_tensor(r[None], 4)[0]
+        powers = cfmm._cart_powers(4)
+        self.assertAlmostEqual(t[powers.index((0,0,0))], 1/rn, 12)
+        self.assertAlmostEqual(t[powers.index((1,0,0))], -x/rn**3, 12)
+        self.assertAlmostEqual(t[powers.index((0,2,0))], 3*y**2/rn**5-1/rn**3, 12)
+        self.assertAlmostEqual(t[powers.index((1,1,1))], -15*x*y*z/rn**7, 12)
+        self.assertAlmostEqual(t[powers.index((0,0,4))],
+                               105*z**4/rn**9 - 90*z**2/rn**7 + 9/rn**5, 12)
+
+    def test_get_j(self):
+        dm = scf.RHF(mol).get_init_guess()
+        vj_ref = scf.hf.get_jk(mol, dm, with_k=False)[0]
+        with_cfmm = cfmm.CFMM(mol).build()
+        self.assertTrue(with_cfmm.near_field_ratio < 1)
+        vj = with_cfmm.get_j(dm)
+        self.assertAlmostEqual(abs(vj - vj_ref).max(), 0, 5)
+
+        with_cfmm.order = 2
+        with_cfmm.build()
+        self.assertAlmostEqual(abs(with_cfmm.get_j(dm) - vj_ref).max(), 0, 3)
+
+    def test_scf(self):
+        e_ref = scf.RHF(mol).kernel()
+        mf = scf.RHF(mol).cfmm()
+        self.assertAlmostEqual(mf.kernel(), e_ref, 6)
+        self.assertTrue(isinstance(mf, cfmm._CFMMSCF))
+        self.assertFalse(isinstance(mf.undo_cfmm(), cfmm._CFMMSCF))
+
+
+if __name__ == "__main__":
+    print("Full Tests for CFMM Coulomb matrix")
+    unittest.main()
@@ -109,6 +109,28 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(abs(vj1-vj0).max(), 0, 9)
         self.assertAlmostEqual(lib.fp(vj0), 28.36214139459754, 6)
 
+    def test_get_jk_batch(self):
+        mols = [mol.set_geom_(mol.atom_coords()*(1+.02*i), unit='Bohr', inplace=False)
+                for i in range(5)]
+        nao = mol.nao
+        numpy.random.seed(2)
+        dms = numpy.random.random((5,2,nao,nao)) - .5
+        dms = dms + dms.transpose(0,1,3,2)
+        vj, vk = jk.get_jk_batch(mols, dms)
+        self.assertEqual(vj.shape, dms.shape)
+        for i, m in enumerate(mols):
+            vj0, vk0 = scf.hf.get_jk(m, dms[i])
+            self.assertAlmostEqual(abs(vj[i] - vj0).max(), 0, 9)
+            self.assertAlmostEqual(abs(vk[i] - vk0).max(), 0, 9)
+
+        vj, vk = jk.get_jk_batch(mols, dms[:,0], hermi=0, direct_scf_tol=None)
+        vj0, vk0 = scf.hf.get_jk(mols[3], dms[3,0], hermi=0)
+        self.assertAlmostEqual(abs(vj[3] - vj0).max(), 0, 12)
+        self.assertAlmostEqual(abs(vk[3] - vk0).max(), 0, 12)
+
+        vk = jk.get_jk_batch(mols, dms[:,0], with_j=False)[1]
+        self.assertAlmostEqual(abs(vk[3] - vk0).max(), 0, 9)
+
     def test_vk_s8(self):
         mol = gto.M(atom='H 0 -.5 0; H 0 .5 0; H 1.1 0.2 0.2; H 0.6 0.5 0.4',
                     basis='cc-pvdz')
@@ -137,6 +159,20 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(abs(vk2-vk[2]).max(), 0, 12)
         self.assertAlmostEqual(abs(vk3-vk[3]).max(), 0, 12)
 
+    def test_direct_block_pair_screening(self):
+        # Far separated molecules. Most AO block pairs are screened out
+        mol = gto.M(atom=[['H', (0, 0, 6.*i)] for i in range(72)], basis='631g')
+        numpy.random.seed(2)
+        nao = mol.nao
+        dm = numpy.random.random((nao,nao)) - .5
+        dm = dm + dm.T
+        vhfopt = scf._vhf._VHFOpt(mol, 'int2e', 'CVHFnrs8_prescreen',
+                                  'CVHFnr_int2e_q_cond', 'CVHFnr_dm_cond', 1e-13)
+        vj, vk = scf.hf.get_jk(mol, dm, hermi=1, vhfopt=vhfopt)
+        vj0, vk0 = scf.hf.get_jk(mol, dm, hermi=1, vhfopt=None)
+        self.assertAlmostEqual(abs(vj - vj0).max(), 0, 9)
+        self.assertAlmostEqual(abs(vk - vk0).max(), 0, 9)
+
 
 def get_vk_s4(mol, dm):
     ao_loc = mol.ao_loc_nr()
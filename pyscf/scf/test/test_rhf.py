@@ -741,6 +741,15 @@ H     0    0.757    0.587'''
         mf1 = scf.RHF(mol).update(mf.chkfile)
         self.assertAlmostEqual(mf1.e_tot, mf.e_tot, 12)
 
+    def test_chkfile_async(self):
+        mf1 = scf.RHF(mol)
+        mf1.chkfile_async = True
+        mf1.chkfile_min_interval = 10
+        mf1.kernel()
+        mf2 = scf.RHF(mol).update(mf1.chkfile)
+        self.assertAlmostEqual(mf2.e_tot, mf1.e_tot, 12)
+        self.assertAlmostEqual(abs(mf2.mo_coeff - mf1.mo_coeff).max(), 0, 12)
+
     def test_mute_chkfile(self):
         # To ensure "mf.chkfile = None" does not affect post-SCF calculations
         mol = gto.M(atom='he', basis='6-311g', verbose=0)
@@ -927,6 +936,28 @@ H     0    0.757    0.587'''
         self.assertAlmostEqual(abs(vk1 - vk2).max(), 0, 12)
         self.assertAlmostEqual(lib.fp(vk1), -12.365527167710301, 12)
 
+    def test_incremental_fock_adaptive_tol(self):
+        mf1 = scf.RHF(mol)
+        mf1.max_memory = 0
+        mf1.conv_tol = 1e-10
+        mf1.direct_scf_loose_tol = 1e-8
+        mf1.direct_scf_rebuild_cycle = 5
+        e1 = mf1.kernel()
+        self.assertAlmostEqual(e1, mf.e_tot, 9)
+
+        stats = mf1.scf_summary['direct_scf_stats']
+        self.assertTrue(stats[0]['full_build'])
+        self.assertAlmostEqual(stats[0]['tol'], 1e-8, 14)
+        self.assertAlmostEqual(stats[-1]['tol'], mf1.direct_scf_tol, 14)
+        tol = [s['tol'] for s in stats]
+        self.assertTrue(all(tol[i] >= tol[i+1] for i in range(len(tol)-1)))
+        # A full rebuild when the threshold switches to direct_scf_tol
+        i = tol.index(mf1.direct_scf_tol)
+        self.assertTrue(stats[i]['full_build'])
+        # Periodic full rebuild
+        for i in range(len(stats)-4):
+            self.assertTrue(any(s['full_build'] for s in stats[i:i+5]))
+
     def test_get_vj_lr(self):
         numpy.random.seed(1)
         nao = mol.nao
@@ -197,6 +197,33 @@ class KnownValues(unittest.TestCase):
         self.assertAlmostEqual(abs(ref - vjk).max(), 0, 12)
         self.assertAlmostEqual(lib.fp(vjk), 25.317344717490613, 12)
 
+    def test_q_cond_cache(self):
+        import tempfile
+        import glob
+        ref = _vhf._VHFOpt(mol, 'int2e', 'CVHFnrs8_prescreen',
+                           'CVHFnr_int2e_q_cond', 'CVHFnr_dm_cond', 1e-13)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with lib.temporary_env(_vhf, Q_COND_CACHE_DIR=cache_dir,
+                                   Q_COND_CACHE_SIZE=1):
+                opt = _vhf._VHFOpt(mol, 'int2e', 'CVHFnrs8_prescreen',
+                                   'CVHFnr_int2e_q_cond', 'CVHFnr_dm_cond', 1e-13)
+                self.assertEqual(len(glob.glob(cache_dir+'/*.npy')), 1)
+                key = _vhf.q_cond_cache_key(mol, 'int2e_sph', 'CVHFnr_int2e_q_cond', 1e-13)
+                cached = _vhf.load_q_cond(key)
+                self.assertAlmostEqual(abs(cached - ref.q_cond).max(), 0, 14)
+
+                cached[:] = 1.
+                _vhf.save_q_cond(key, cached)
+                opt = _vhf._VHFOpt(mol, 'int2e', 'CVHFnrs8_prescreen',
+                                   'CVHFnr_int2e_q_cond', 'CVHFnr_dm_cond', 1e-13)
+                self.assertAlmostEqual(abs(opt.q_cond - 1).max(), 0, 14)
+
+                # LRU eviction
+                opt = _vhf._VHFOpt(mol, 'int2e', 'CVHFnrs8_prescreen',
+                                   'CVHFnr_int2e_q_cond', 'CVHFnr_dm_cond', 1e-12)
+                self.assertEqual(len(glob.glob(cache_dir+'/*.npy')), 1)
+                self.assertTrue(_vhf.load_q_cond(key) is None)
+
 MIN_CUTOFF = 1e-44
 libcvhf = _vhf.libcvhf
 
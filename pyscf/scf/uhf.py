@@ -992,8 +992,8 @@ This is the Gaussian fit version as described in doi:10.1063/5.0004046.''')
             dm_last = numpy.asarray(dm_last)
             dm = numpy.asarray(dm)
             assert dm_last.ndim == 0 or dm_last.ndim == dm.ndim
-            ddm = dm - dm_last
-            vj, vk = self.get_jk(mol, ddm, hermi)
+            vj, vk, vhf_last = hf.get_jk_incremental(self, mol, dm, dm_last,
+                                                     vhf_last, hermi)
             vhf = vj[0] + vj[1] - vk
             vhf += numpy.asarray(vhf_last)
         return vhf
@@ -253,7 +253,7 @@ def smd_radii(alpha):
 import ctypes
 from pyscf.lib import load_library
 try:
-    libsolvent = load_library('libsolvent')
+    libsolvent = load_library('libsolvent', eager=True)
 except (IOError, NameError):
     libsolvent = None
 
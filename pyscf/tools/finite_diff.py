@@ -21,10 +21,17 @@ import numpy as np
 from pyscf import gto
 from pyscf import lib
 from pyscf.lib import logger
+from pyscf.lib import param
+from pyscf.gto.mole import is_au
 from pyscf.grad.rhf import GradientsBase
 from pyscf.hessian.rhf import HessianBase
+from pyscf import __config__
 
-def kernel(method, displacement=1e-2):
+NPROC = getattr(__config__, 'tools_finite_diff_nproc', 1)
+SYMMETRY = getattr(__config__, 'tools_finite_diff_symmetry', False)
+
+def kernel(method, displacement=1e-2, nproc=NPROC, nthreads=None,
+           symmetry=SYMMETRY):
     '''
     Evaluate gradients or Hessians for a given method using finite difference approximation.
 
@@ -35,6 +42,19 @@ def kernel(method, displacement=1e-2):
     Kwargs:
         displacement:
             The small change for finite difference calculations. Default is 1e-2.
+        nproc:
+            Number of processes to evaluate the displaced geometries. If set
+            to None, one process for each available thread. Default is 1.
+        nthreads:
+            Number of OpenMP threads in each process. By default, the
+            available threads are evenly divided among the processes.
+        symmetry:
+            Whether to skip the displacements of the atoms which are
+            equivalent by point group symmetry. This assumes that the
+            Hamiltonian has the point group symmetry of the nuclear
+            framework, which does not hold e.g. for QM/MM, external fields,
+            solvent models or broken-symmetry UHF solutions. Default is
+            False.
 
     Returns:
         An (n, 3) array for gradients or (n, n, 3, 3) array for hessian,
@@ -69,17 +89,47 @@ def kernel(method, displacement=1e-2):
         if isinstance(method, GradientsBase):
             method.base = method.base.copy()
 
+    ops = []
+    if symmetry and isinstance(mol, gto.Mole):
+        ops = _symm_ops(mol)
+    atm_uniq, atm_map = _symm_unique_atoms(natm, ops)
+    if len(atm_uniq) < natm:
+        logger.info(mol, 'Displace %d symmetry-unique atoms %s',
+                    len(atm_uniq), atm_uniq)
+
+    displaced = []
+    for i in atm_uniq:
+        for x in range(3):
+            for step in (displacement, -displacement):
+                atom_coords = original_coords.copy()
+                atom_coords[i,x] += step
+                displaced.append(atom_coords)
+
     if scan is not None:
-        def evaluate(r):
-            mol.set_geom_(r, unit='Bohr')
-            if scan:
-                if isinstance(method, GradientsBase):
-                    res = scan(mol)[1]
-                else:
-                    res = scan(mol)
-                if not scan.converged:
+        if isinstance(method, GradientsBase):
+            ref_method = scan.base
+        else:
+            ref_method = scan
+        if getattr(ref_method, 'mo_coeff', None) is None:
+            # Converge the reference geometry first. Every displaced geometry
+            # starts from the reference results.
+            scan(mol)
+
+        if is_au(mol.unit):
+            unit = 1.
+        elif isinstance(mol.unit, str):
+            unit = 1./param.BOHR
+        else:
+            unit = 1./mol.unit
+        pool = lib.ScannerPool(scan, nproc, nthreads)
+        pool.warm_start = 'initial'
+        def evaluate_all():
+            for k, res in enumerate(pool.imap([r / unit for r in displaced])):
+                if not pool.converged[k]:
                     raise RuntimeError('{scan} not converged')
-                return res
+                if isinstance(method, GradientsBase):
+                    res = res[1]
+                yield res
     else:
         logger.info(mol, '{method}.scanner not found. '
                     'Initial guess may not be utilized among different geometries')
@@ -97,27 +147,83 @@ def kernel(method, displacement=1e-2):
                     raise RuntimeError('{method} not converged')
                 res = method.kernel()
             return res
+        def evaluate_all():
+            for r in displaced:
+                yield evaluate(r)
 
     try:
-        atom_coords = original_coords.copy()
-        for i in range(natm):
+        results = evaluate_all()
+        for i in atm_uniq:
             for x in range(3):
-                atom_coords[i,x] += displacement
-                e1 = evaluate(atom_coords)
-                atom_coords[i,x] -= 2*displacement
-                e2 = evaluate(atom_coords)
+                e1 = next(results)
+                e2 = next(results)
                 de[i,x] = (e1 - e2) / (2*displacement)
-                atom_coords[i,x] = original_coords[i,x]
     finally:
         mol.set_geom_(original_coords, unit='Bohr')
 
+    # Derivatives of the symmetry-equivalent atoms
+    for j, (i, rot, perm) in atm_map.items():
+        if isinstance(method, GradientsBase):
+            de[j][:,perm] = np.einsum('xy,xkz,zw->ykw', rot, de[i], rot)
+        else:
+            de[j] = de[i].dot(rot)
+
     if isinstance(method, GradientsBase):
         # Hessian is stored as (N,N,3,3)
         de = de.transpose(0,2,1,3)
     return de
 
+def _symm_ops(mol):
+    '''Point group operations of the molecule in the frame of the input
+    geometry. Each operation is given as (rot, perm): the position r (a row
+    vector relative to the symmetry center) of atom a is mapped to the
+    position of atom perm[a] by r.dot(rot).'''
+    from pyscf import symm
+    from pyscf.symm.param import OPERATOR_TABLE
+    try:
+        gpname, orig, axes = symm.detect_symm(mol._atom, mol._basis)
+        gpname, axes = symm.as_subgroup(gpname, axes)
+    except symm.PointGroupSymmetryError:
+        return []
+    if gpname == 'Dooh':
+        gpname = 'D2h'
+    elif gpname == 'Coov':
+        gpname = 'C2v'
+    if gpname == 'C1':
+        return []
+
+    coords = mol.atom_coords() - orig
+    symbols = [mol.atom_symbol(i) for i in range(mol.natm)]
+    opdic = symm.symm_ops(gpname)
+    ops = []
+    for op in OPERATOR_TABLE[gpname]:
+        rot = axes.T.dot(np.dot(opdic[op], axes))
+        dist = np.linalg.norm(coords.dot(rot)[:,None] - coords, axis=2)
+        perm = dist.argmin(axis=1)
+        if (dist[np.arange(mol.natm),perm].max() > symm.geom.TOLERANCE or
+                any(symbols[i] != symbols[j] for i, j in enumerate(perm))):
+            return []
+        ops.append((rot, perm))
+    return ops
+
+def _symm_unique_atoms(natm, ops):
+    '''Symmetry-unique atoms and, for each of the other atoms j, the tuple
+    (i, rot, perm) of the unique atom i and the operation which maps i to j.'''
+    atm_uniq = []
+    atm_map = {}
+    for i in range(natm):
+        if i in atm_map:
+            continue
+        atm_uniq.append(i)
+        for rot, perm in ops:
+            j = perm[i]
+            if j != i and j not in atm_map:
+                atm_map[j] = (i, rot, perm)
+    return atm_uniq, atm_map
+
 class Gradients(GradientsBase):
     displacement = 1e-2
+    nproc = NPROC
 
     def __init__(self, method):
         assert isinstance(method, lib.StreamObject)
@@ -129,7 +235,7 @@ class Gradients(GradientsBase):
         self.de = None
 
     def kernel(self):
-        self.de = kernel(self.base, self.displacement)
+        self.de = kernel(self.base, self.displacement, self.nproc)
         return self.de
 
     def as_scanner(self):
@@ -156,6 +262,7 @@ class GradScanner(lib.GradScanner):
 
 class Hessian(HessianBase):
     displacement = 1e-2
+    nproc = NPROC
 
     def __init__(self, method):
         assert isinstance(method, lib.StreamObject)
@@ -168,7 +275,7 @@ class Hessian(HessianBase):
         self.de = None
 
     def kernel(self):
-        self.de = kernel(self._method, self.displacement)
+        self.de = kernel(self._method, self.displacement, self.nproc)
         return self.de
 
     def as_scanner(self):
@@ -109,6 +109,18 @@ class KnownValues(unittest.TestCase):
         assert abs(g - ref).max() < 1e-4
         assert abs(e - e_ref) < 1e-9
 
+    def test_symmetry_and_nproc(self):
+        mol = pyscf.M(atom='N 0 0 .1; H .94 0 -.28; H -.47 .814 -.28; H -.47 -.814 -.28',
+                      basis='631g', verbose=0)
+        self.assertEqual(len(finite_diff._symm_ops(mol)), 2)
+        ref = finite_diff.kernel(mol.RHF(), .5e-2)
+        dat = finite_diff.kernel(mol.RHF(), .5e-2, nproc=2, symmetry=True)
+        assert abs(dat - ref).max() < 1e-8
+        ref = finite_diff.kernel(mol.RHF().Gradients(), .5e-2)
+        dat = finite_diff.kernel(mol.RHF().Gradients(), .5e-2, nproc=2,
+                                 nthreads=2, symmetry=True)
+        assert abs(dat - ref).max() < 1e-7
+
 if __name__ == "__main__":
     print("Full Tests for finite_diff")
     unittest.main()